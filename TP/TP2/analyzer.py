@@ -0,0 +1,84 @@
+"""
+Resource analyzer (himpunan stopword dan konfigurasi stemmer) yang disimpan
+bersama index, supaya proses yang berumur pendek (CLI, worker server) tidak
+perlu meng-import NLTK dan membaca corpus stopword-nya setiap kali start.
+
+Format file analyzer.bin (versi 1):
+
+    MAGIC (8 byte) | panjang config (u32) | config (JSON) |
+    banyaknya stopword (u32) | stopword terurut, UTF-8, dipisah b'\\0'
+
+config berisi nama stemmer yang dipakai saat indexing (saat ini hanya
+'porter2'), sehingga query selalu di-stem dengan stemmer yang sama.
+"""
+import json
+import os
+import struct
+
+MAGIC = b'IRANLZ01'
+U32 = struct.Struct('<I')
+
+DEFAULT_CONFIG = {'stemmer': 'porter2'}
+
+def analyzer_file_path(path):
+    return os.path.join(path, 'analyzer.bin')
+
+def default_stopwords():
+    """Stopword bahasa Inggris dari NLTK; NLTK baru di-import di sini"""
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('english'))
+
+def make_stemmer(config=DEFAULT_CONFIG):
+    """Stemmer baru sesuai config (Porter2Stemmer menyimpan state, sehingga jangan dibagi antar thread)"""
+    if config['stemmer'] != 'porter2':
+        raise ValueError("stemmer {!r} tidak dikenal".format(config['stemmer']))
+    from porter2stemmer import Porter2Stemmer
+    return Porter2Stemmer()
+
+def save_analyzer(path, stopwords, config=DEFAULT_CONFIG):
+    """Simpan stopwords dan config ke <path>/analyzer.bin (ditulis ke file sementara lalu di-rename)"""
+    encoded_config = json.dumps(config, sort_keys=True).encode('utf-8')
+    words = sorted(stopwords)
+    file_path = analyzer_file_path(path)
+    with open(file_path + '.tmp', 'wb') as f:
+        f.write(MAGIC + U32.pack(len(encoded_config)) + encoded_config + U32.pack(len(words)))
+        f.write('\0'.join(words).encode('utf-8'))
+    os.replace(file_path + '.tmp', file_path)
+
+def load_analyzer(path):
+    """
+    (frozenset stopwords, config) dari <path>/analyzer.bin, atau None jika
+    index tidak menyimpan resource analyzer (index lama).
+    """
+    try:
+        with open(analyzer_file_path(path), 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("bukan file analyzer: {}".format(analyzer_file_path(path)))
+    offset = len(MAGIC)
+    (config_length,) = U32.unpack_from(data, offset)
+    offset += U32.size
+    config = json.loads(data[offset:offset + config_length])
+    offset += config_length
+    (n_words,) = U32.unpack_from(data, offset)
+    offset += U32.size
+    words = data[offset:].decode('utf-8').split('\0') if n_words else []
+    if len(words) != n_words:
+        raise ValueError("file analyzer rusak: {}".format(analyzer_file_path(path)))
+    return frozenset(words), config
+
+
+if __name__ == '__main__':
+
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        assert load_analyzer(tmp_dir) is None, "index tanpa analyzer.bin harus menghasilkan None"
+        save_analyzer(tmp_dir, {'the', 'a', 'of', "don't"})
+        stopwords, config = load_analyzer(tmp_dir)
+        assert stopwords == {'the', 'a', 'of', "don't"} and config == DEFAULT_CONFIG, "analyzer.bin salah"
+        save_analyzer(tmp_dir, set())
+        assert load_analyzer(tmp_dir)[0] == frozenset(), "stopword kosong salah"
+        assert make_stemmer(config).stem('running') == 'run', "stemmer salah"
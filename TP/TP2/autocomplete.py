@@ -0,0 +1,175 @@
+import array
+import bisect
+import heapq
+import os
+import pickle
+
+from index import InvertedIndexReader
+
+# Karakter terbesar di unicode, dipakai untuk mencari batas atas range prefix
+MAX_CHAR = chr(0x10FFFF)
+
+class QueryAutocomplete:
+    """
+    Query auto-completion (QAC) di atas lexicon.
+
+    Kandidat completion disimpan sebagai sorted array of strings, sehingga
+    semua kandidat dengan prefix p berada pada range [lo, hi) yang bisa
+    dicari dengan binary search. Untuk setiap node trie (prefix) yang
+    memiliki lebih dari top_k kandidat, top_k completion terbaiknya sudah
+    dihitung saat build; prefix dengan kandidat <= top_k cukup diurutkan
+    langsung dari range-nya. Dengan begitu complete(prefix, k) tidak pernah
+    menelusuri subtree.
+
+    Attributes
+    ----------
+    candidates: List[str]
+        kandidat completion terurut secara leksikografis
+    weights: array('d')
+        bobot setiap kandidat (df term, ditambah frekuensi di query log)
+    top_k: int
+        banyaknya completion yang di-precompute per node
+    precomputed: Dictionary prefix -> array('L')
+        index kandidat terbaik (terurut dari bobot tertinggi) untuk prefix
+        yang memiliki lebih dari top_k kandidat
+    """
+    def __init__(self, weighted_candidates, top_k=10):
+        """
+        Parameters
+        ----------
+        weighted_candidates: Dict[str, float]
+            kandidat completion dan bobotnya
+        top_k: int
+            banyaknya completion yang di-precompute per prefix
+        """
+        self.top_k = top_k
+        self.candidates = sorted(weighted_candidates)
+        self.weights = array.array('d', [weighted_candidates[c] for c in self.candidates])
+        self.precomputed = {}
+        self.__precompute()
+
+    def __rank_key(self, i):
+        # Bobot tertinggi dulu, jika sama urut leksikografis
+        return (-self.weights[i], self.candidates[i])
+
+    def __precompute(self):
+        """
+        Hitung top_k untuk setiap prefix secara bottom-up dengan satu stack
+        (DFS implisit atas trie yang terbentuk dari sorted array). Top-k dari
+        sebuah node adalah merge top-k anak-anaknya dan kandidat yang berakhir
+        tepat di node tersebut.
+        """
+        # Setiap elemen stack: [prefix, list index kandidat terbaik, banyak kandidat]
+        stack = [['', [], 0]]
+
+        def close_node():
+            prefix, best, count = stack.pop()
+            if count > self.top_k:
+                self.precomputed[prefix] = array.array('L', best)
+            parent = stack[-1]
+            parent[1] = heapq.nsmallest(self.top_k, parent[1] + best, key=self.__rank_key)
+            parent[2] += count
+
+        for i, candidate in enumerate(self.candidates):
+            # Tutup node yang bukan prefix dari kandidat ini
+            while not candidate.startswith(stack[-1][0]):
+                close_node()
+            for length in range(len(stack[-1][0]) + 1, len(candidate) + 1):
+                stack.append([candidate[:length], [], 0])
+            node = stack[-1]
+            node[1] = heapq.nsmallest(self.top_k, node[1] + [i], key=self.__rank_key)
+            node[2] += 1
+
+        while len(stack) > 1:
+            close_node()
+        if stack[0][2] > self.top_k:
+            self.precomputed[''] = array.array('L', stack[0][1])
+
+    def complete(self, prefix, k=10):
+        """
+        Kembalikan maksimum k completion terbaik untuk prefix.
+
+        Returns
+        -------
+        List[Tuple[str, float]]
+            pasangan (completion, bobot) terurut dari bobot tertinggi
+        """
+        prefix = prefix.lower()
+        best = self.precomputed.get(prefix)
+        if best is not None and k <= self.top_k:
+            return [(self.candidates[i], self.weights[i]) for i in best[:k]]
+
+        lo = bisect.bisect_left(self.candidates, prefix)
+        hi = bisect.bisect_left(self.candidates, prefix + MAX_CHAR, lo)
+        # Sampai di sini range berisi <= top_k kandidat, kecuali k > top_k
+        best = heapq.nsmallest(k, range(lo, hi), key=self.__rank_key)
+        return [(self.candidates[i], self.weights[i]) for i in best]
+
+    @staticmethod
+    def file_path(index_name, path):
+        return os.path.join(path, index_name + '.qac')
+
+    def save(self, index_name, path):
+        with open(QueryAutocomplete.file_path(index_name, path), 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(index_name, path):
+        with open(QueryAutocomplete.file_path(index_name, path), 'rb') as f:
+            return pickle.load(f)
+
+
+def build_autocomplete(index_name, postings_encoding, path, term_id_map, query_log=None,
+                       query_log_weight=1.0, top_k=10, source_indices=None):
+    """
+    Membangun QueryAutocomplete dari lexicon sebuah index. Bobot setiap term
+    adalah document frequency-nya (dari postings_dict). Jika query_log
+    diberikan (iterable of query strings), setiap query juga menjadi kandidat
+    dan bobotnya ditambah query_log_weight untuk setiap kemunculannya.
+
+    Untuk index yang di-shard, source_indices berisi nama index setiap shard
+    dan document frequency dijumlahkan dari semua shard.
+
+    Returns
+    -------
+    QueryAutocomplete
+        yang juga sudah disimpan ke <index_name>.qac
+    """
+    weighted_candidates = {}
+    for source_index in source_indices or [index_name]:
+        with InvertedIndexReader(source_index, postings_encoding, path=path) as reader:
+            for term_id, (_, n_postings, _) in reader.postings_dict.items():
+                term = term_id_map[term_id]
+                weighted_candidates[term] = weighted_candidates.get(term, 0.0) + n_postings
+
+    for query in query_log or []:
+        query = ' '.join(query.lower().split())
+        if query:
+            weighted_candidates[query] = weighted_candidates.get(query, 0.0) + query_log_weight
+
+    qac = QueryAutocomplete(weighted_candidates, top_k)
+    qac.save(index_name, path)
+    return qac
+
+
+if __name__ == '__main__':
+
+    import random
+    import string
+
+    qac = QueryAutocomplete({'quantum': 50, 'quark': 70, 'quasar': 10, 'qubit': 30,
+                             'cosmolog': 40, 'continuum': 20, 'cosmic': 40, 'q': 1}, top_k=2)
+    assert qac.complete('qu', 2) == [('quark', 70), ('quantum', 50)], "completion salah"
+    assert qac.complete('qua', 3) == [('quark', 70), ('quantum', 50), ('quasar', 10)], "completion salah"
+    assert qac.complete('cos', 5) == [('cosmic', 40), ('cosmolog', 40)], "completion salah"
+    assert qac.complete('Q', 1) == [('quark', 70)], "completion salah"
+    assert qac.complete('x', 5) == [], "completion salah"
+    assert 'qu' in qac.precomputed and 'cos' not in qac.precomputed, "precompute salah"
+
+    random.seed(0)
+    words = {''.join(random.choices('abc', k=random.randint(1, 6))): random.randint(1, 100) for _ in range(300)}
+    qac = QueryAutocomplete(words, top_k=5)
+    for prefix in ['', 'a', 'ab', 'bca', 'cc']:
+        brute = sorted((w for w in words if w.startswith(prefix)), key=lambda w: (-words[w], w))
+        for k in [1, 5, 8]:
+            assert [c for c, _ in qac.complete(prefix, k)] == brute[:k], "completion salah"
@@ -0,0 +1,288 @@
+"""
+Kumpulan benchmark untuk index yang sudah dibangun dengan BSBIIndex.
+
+Contoh:
+    python benchmark.py autocomplete index_vb
+    python benchmark.py spelling index_vb
+    python benchmark.py postings index_eliasgamma --encoding eliasgamma --policy lfu
+    python benchmark.py coldstart index_vb --query "quantum AND gravity" --budget-ms 300
+    python benchmark.py reorder index_vb --method minhash
+"""
+import argparse
+import array
+import itertools
+import json
+import os
+import pickle
+import random
+import string
+import subprocess
+import sys
+import time
+
+from compression import ENCODINGS
+from segment import Segment, segment_file_path
+from util import percentile
+
+def latency_summary(samples_ns):
+    """Ringkasan latency (dalam mikrodetik) dari list durasi dalam nanodetik"""
+    samples_us = [sample / 1000 for sample in samples_ns]
+    return {'n': len(samples_us),
+            'p50_us': percentile(samples_us, 50),
+            'p95_us': percentile(samples_us, 95),
+            'p99_us': percentile(samples_us, 99),
+            'max_us': max(samples_us, default=0.0)}
+
+def load_term_id_map(output_path, index_name='main_index'):
+    path = segment_file_path(index_name, output_path)
+    if os.path.exists(path):
+        return Segment(path).term_map
+    with open(os.path.join(output_path, 'terms.dict'), 'rb') as f:
+        return pickle.load(f)
+
+def benchmark_autocomplete(qac, k=10, max_length=3, alphabet=string.ascii_lowercase + string.digits, repeat=3):
+    """
+    Ukur latency QueryAutocomplete.complete(prefix, k) untuk semua prefix
+    dengan panjang 1 sampai max_length yang dibentuk dari alphabet.
+    """
+    prefixes = [''.join(chars) for length in range(1, max_length + 1)
+                for chars in itertools.product(alphabet, repeat=length)]
+    samples = []
+    for _ in range(repeat):
+        for prefix in prefixes:
+            start = time.perf_counter_ns()
+            qac.complete(prefix, k)
+            samples.append(time.perf_counter_ns() - start)
+    summary = latency_summary(samples)
+    summary['prefixes'] = len(prefixes)
+    return summary
+
+def run_autocomplete(args):
+    from autocomplete import QueryAutocomplete, build_autocomplete
+    try:
+        qac = QueryAutocomplete.load(args.index_name, args.output_path)
+    except FileNotFoundError:
+        start = time.perf_counter()
+        qac = build_autocomplete(args.index_name, ENCODINGS[args.encoding], args.output_path,
+                                 load_term_id_map(args.output_path, args.index_name))
+        print("build: {:.2f} s".format(time.perf_counter() - start))
+    print(benchmark_autocomplete(qac, k=args.k))
+
+def misspell(term, n_edits, rng, alphabet=string.ascii_lowercase):
+    """Buat salah ketik dari term dengan n_edits operasi insert/delete/substitute"""
+    chars = list(term)
+    for _ in range(n_edits):
+        operation = rng.choice(['insert', 'delete', 'substitute'] if chars else ['insert'])
+        position = rng.randrange(len(chars) + (operation == 'insert'))
+        if operation == 'insert':
+            chars.insert(position, rng.choice(alphabet))
+        elif operation == 'delete':
+            chars.pop(position)
+        else:
+            chars[position] = rng.choice(alphabet)
+    return ''.join(chars)
+
+def benchmark_spelling(corrector, k=1, n_queries=2000, seed=0):
+    """
+    Ukur latency SpellingCorrector.candidates(term, k) untuk salah ketik
+    (1-2 edit) dari term yang diambil acak dari lexicon
+    """
+    rng = random.Random(seed)
+    terms = rng.sample(corrector.terms, min(n_queries, len(corrector.terms)))
+    queries = [misspell(term, rng.randint(1, 2), rng) for term in terms]
+    samples = []
+    recovered = 0
+    for term, query in zip(terms, queries):
+        start = time.perf_counter_ns()
+        candidates = corrector.candidates(query, k)
+        samples.append(time.perf_counter_ns() - start)
+        recovered += any(candidate == term for candidate, _, _ in candidates)
+    summary = latency_summary(samples)
+    summary['recovered'] = recovered / max(1, len(queries))
+    return summary
+
+def run_spelling(args):
+    from spelling import SpellingCorrector, build_spelling_corrector
+    try:
+        corrector = SpellingCorrector.load(args.index_name, args.output_path)
+    except FileNotFoundError:
+        start = time.perf_counter()
+        corrector = build_spelling_corrector(args.index_name, ENCODINGS[args.encoding], args.output_path,
+                                             load_term_id_map(args.output_path, args.index_name))
+        print("build: {:.2f} s".format(time.perf_counter() - start))
+    print("lexicon: {} terms, {} deletes".format(len(corrector.terms), len(corrector.delete_index)))
+    print(benchmark_spelling(corrector, k=args.k))
+
+def zipf_term_sample(postings_dict, n_queries, seed=0, s=1.0):
+    """
+    Sampel termID dengan distribusi Zipf terhadap ranking df, meniru query
+    log yang sangat repetitif: term ber-df besar paling sering dicari.
+    """
+    rng = random.Random(seed)
+    ranked = sorted(postings_dict, key=lambda term: -postings_dict[term][1])
+    weights = [1 / (rank + 1) ** s for rank in range(len(ranked))]
+    return rng.choices(ranked, weights=weights, k=n_queries)
+
+def benchmark_postings(reader, terms):
+    """Latency get_postings_list untuk setiap term di terms secara berurutan"""
+    samples = []
+    for term in terms:
+        start = time.perf_counter_ns()
+        reader.get_postings_list(term)
+        samples.append(time.perf_counter_ns() - start)
+    summary = latency_summary(samples)
+    summary['total_s'] = sum(samples) / 1e9
+    return summary
+
+def run_postings(args):
+    from cache import PostingsCache
+    from index import InvertedIndexReader
+    encoding = ENCODINGS[args.encoding]
+    with InvertedIndexReader(args.index_name, encoding, path=args.output_path) as reader:
+        terms = zipf_term_sample(reader.postings_dict, args.n_queries)
+        print("tanpa cache:", benchmark_postings(reader, terms))
+    postings_cache = PostingsCache(args.max_mb * 1024 * 1024, args.policy, args.min_df)
+    with InvertedIndexReader(args.index_name, encoding, path=args.output_path,
+                             postings_cache=postings_cache) as reader:
+        print("dengan cache:", benchmark_postings(reader, terms))
+    print(postings_cache.stats())
+
+def load_all_postings(output_path, encoding, index_name='main_index'):
+    """
+    dict termID -> postings list (array) dari merged index, atau gabungan
+    semua intermediate index jika merged index tidak ada
+    """
+    from index import InvertedIndexReader
+    index_names = [index_name]
+    if not os.path.exists(os.path.join(output_path, index_name + '.index')):
+        index_names = sorted(filename[:-len('.index')] for filename in os.listdir(output_path)
+                             if filename.startswith('intermediate_index_') and filename.endswith('.index'))
+    postings_lists = {}
+    for name in index_names:
+        with InvertedIndexReader(name, encoding, path=output_path) as reader:
+            for term, postings in reader:
+                postings_lists.setdefault(term, array.array('I')).extend(postings)
+    for term, postings in postings_lists.items():
+        postings_lists[term] = array.array('I', sorted(postings))
+    return postings_lists
+
+def benchmark_codec(postings_lists, encoding, repeat=3):
+    """Byte per posting dan kecepatan decode (juta postings per detik, terbaik dari repeat kali) semua postings list dengan encoding"""
+    encoded = [encoding.encode(list(postings)) for postings in postings_lists.values()]
+    n_postings = sum(len(postings) for postings in postings_lists.values())
+    elapsed = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for encoded_postings_list in encoded:
+            encoding.decode(encoded_postings_list)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return {'bytes_per_posting': sum(map(len, encoded)) / max(1, n_postings),
+            'decode_mpostings_per_s': n_postings / elapsed / 1e6 if elapsed else 0.0}
+
+def run_reorder(args):
+    from reorder import compute_order, new_doc_ids
+    postings_lists = load_all_postings(args.output_path, ENCODINGS[args.encoding], args.index_name)
+    n_docs = max((postings[-1] for postings in postings_lists.values() if postings), default=0)
+    print("{} terms, {} docs, {} postings".format(len(postings_lists), n_docs,
+                                                  sum(len(postings) for postings in postings_lists.values())))
+    codecs = [name for name in ENCODINGS if name != 'standard']
+    before = {name: benchmark_codec(postings_lists, ENCODINGS[name]) for name in codecs}
+    start = time.perf_counter()
+    order = compute_order({term: postings for term, postings in postings_lists.items() if len(postings) > 1},
+                          n_docs, args.method)
+    print("{}: {:.1f} s".format(args.method, time.perf_counter() - start))
+    new_ids = new_doc_ids(order)
+    reordered = {term: array.array('I', sorted(new_ids[doc_id] for doc_id in postings))
+                 for term, postings in postings_lists.items()}
+    print("{:<12}{:>22}{:>22}".format('codec', 'bytes/posting', 'decode (M postings/s)'))
+    for name in codecs:
+        after = benchmark_codec(reordered, ENCODINGS[name])
+        print("{:<12}{:>10.3f} -> {:<9.3f}{:>10.2f} -> {:<9.2f}".format(
+            name, before[name]['bytes_per_posting'], after['bytes_per_posting'],
+            before[name]['decode_mpostings_per_s'], after['decode_mpostings_per_s']))
+
+# Dijalankan di process baru: waktu import bsbi dan query pertama (termasuk load index)
+COLDSTART_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+from bsbi import BSBIIndex
+from compression import ENCODINGS
+imported = time.perf_counter()
+index = BSBIIndex(None, sys.argv[1], ENCODINGS[sys.argv[2]], sys.argv[3])
+n_results = len(index.boolean_retrieve(sys.argv[4]))
+done = time.perf_counter()
+print(json.dumps({'import_s': imported - start, 'first_query_s': done - imported,
+                  'n_results': n_results, 'modules': [name for name in sys.argv[5:] if name in sys.modules]}))
+'''
+
+# Dependency berat yang tidak boleh ikut ter-import hanya untuk menjawab query
+HEAVY_MODULES = ['nltk', 'tqdm', 'concurrent.futures']
+
+def benchmark_coldstart(output_path, encoding, index_name, query, repeat=5):
+    """
+    Ukur cold start (import bsbi + query pertama) di process Python baru
+    sebanyak repeat kali. Waktu start interpreter sendiri tidak dihitung.
+    """
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', COLDSTART_SCRIPT, output_path, encoding, index_name, query]
+                                + HEAVY_MODULES, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    samples_ns = [(run['import_s'] + run['first_query_s']) * 1e9 for run in runs]
+    summary = latency_summary(samples_ns)
+    summary['import_p50_ms'] = percentile([run['import_s'] * 1000 for run in runs], 50)
+    summary['first_query_p50_ms'] = percentile([run['first_query_s'] * 1000 for run in runs], 50)
+    summary['n_results'] = runs[0]['n_results']
+    summary['heavy_modules'] = sorted({name for run in runs for name in run['modules']})
+    return summary
+
+def run_coldstart(args):
+    summary = benchmark_coldstart(os.path.abspath(args.output_path), args.encoding, args.index_name,
+                                  args.query, args.repeat)
+    print(summary)
+    total_ms = summary['p50_us'] / 1000
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print("cold start {:.1f} ms melebihi budget {} ms".format(total_ms, args.budget_ms))
+        sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    autocomplete_parser = subparsers.add_parser('autocomplete', help='p99 latency completion prefix 1-3 karakter')
+    autocomplete_parser.add_argument('-k', type=int, default=10)
+    autocomplete_parser.set_defaults(run=run_autocomplete)
+
+    spelling_parser = subparsers.add_parser('spelling', help='latency koreksi ejaan untuk salah ketik 1-2 edit')
+    spelling_parser.add_argument('-k', type=int, default=1)
+    spelling_parser.set_defaults(run=run_spelling)
+
+    postings_parser = subparsers.add_parser('postings', help='latency get_postings_list dengan dan tanpa PostingsCache')
+    postings_parser.add_argument('--n-queries', type=int, default=20000)
+    postings_parser.add_argument('--max-mb', type=int, default=16)
+    postings_parser.add_argument('--policy', choices=['lru', 'lfu'], default='lru')
+    postings_parser.add_argument('--min-df', type=int, default=0)
+    postings_parser.set_defaults(run=run_postings)
+
+    coldstart_parser = subparsers.add_parser('coldstart', help='waktu import + query pertama di process baru')
+    coldstart_parser.add_argument('--query', default='quantum AND gravity')
+    coldstart_parser.add_argument('--repeat', type=int, default=5)
+    coldstart_parser.add_argument('--budget-ms', type=float, default=None,
+                                  help='exit code 1 jika p50 cold start melebihi budget ini')
+    coldstart_parser.set_defaults(run=run_coldstart)
+
+    reorder_parser = subparsers.add_parser('reorder', help='ukuran dan kecepatan decode per codec sebelum/sesudah reassignment docID')
+    reorder_parser.add_argument('--method', choices=['bisection', 'minhash'], default='bisection')
+    reorder_parser.set_defaults(run=run_reorder)
+
+    for subparser in subparsers.choices.values():
+        subparser.add_argument('output_path', help='directory index, misal index_vb')
+        subparser.add_argument('--encoding', choices=ENCODINGS, default='vb')
+        subparser.add_argument('--index-name', default='main_index')
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,31 @@
 import os
 import pickle
+import bisect
 import contextlib
 import heapq
+import itertools
 import time
+from array import array
+from collections import Counter, deque
 
+from analyzer import DEFAULT_CONFIG, default_stopwords, load_analyzer, make_stemmer, save_analyzer
 from index import InvertedIndexReader, InvertedIndexWriter
-from util import IdMap, QueryParser, sort_diff_list, sort_intersect_list, sort_union_list
+from util import IdMap, QueryParser, SearchResult, canonicalize_tree, postfix_to_tree, sort_diff_list, sort_intersect_list, sort_union_list
+from util import diff_iter, intersect_iter, union_iter, union_with_tf_iter
+from doctable import DocTableFile, doc_table_file_path, write_doc_table
 from compression import StandardPostings, VBEPostings, Simple8bPostings, EliasGammaPostings
-
-from nltk.corpus import stopwords
+from wand import ScoreIndex, WANDRetriever, build_score_index
+from autocomplete import QueryAutocomplete, build_autocomplete
+from spelling import SpellingCorrector, build_spelling_corrector, surface_forms
+from cache import PostingsCache, QueryResultCache
+from metrics import metrics
+from pipeline import Pipeline
+from segment import Segment, segment_file_path, write_segment
+from sources import DirectorySource
+from merge import merge_part, term_ranges
+from daat import compile_postfix, iter_docs, term_cursor
+from reorder import compute_order, load_postings_lists, new_doc_ids, reassign_doc_ids
+from shard import build_shard, evaluate_on_shard, init_shard_worker, load_shards, might_match, save_shards, shards_file_path
 
 import gc
 
@@ -16,11 +33,66 @@ import gc
 # nltk.download('punkt')
 # nltk.download('stopwords')
 
-""" 
-Ingat untuk install tqdm terlebih dahulu
-pip intall tqdm
-"""
-from tqdm import tqdm
+# NLTK (stopwords), tqdm, dan concurrent.futures baru di-import ketika benar-benar
+# dipakai, supaya proses yang hanya menjawab query (CLI, worker server) cepat start;
+# stopwords dan konfigurasi stemmer untuk query dibaca dari analyzer.bin milik index.
+
+# (BSBIIndex, stopwords, konfigurasi stemmer) milik worker process analisis, dibuat oleh init_analysis_worker()
+analysis_worker = None
+
+def init_analysis_worker(en_stopwords, config):
+    global analysis_worker
+    analysis_worker = (BSBIIndex(None, None, None), en_stopwords, config)
+
+def analyze_in_worker(text):
+    # Porter2Stemmer menyimpan state (r1, r2) antar pemanggilan stem(...),
+    # sehingga setiap dokumen memakai stemmer baru supaya hasilnya tidak
+    # bergantung pada dokumen lain yang kebetulan diproses worker yang sama
+    index, en_stopwords, config = analysis_worker
+    surface_counts = Counter()
+    return index.analyze(text, make_stemmer(config), en_stopwords, surface_counts), surface_counts
+
+def timed_documents(documents):
+    """(nama, text) dari documents, dengan waktu baca dicatat di timer index.read"""
+    documents = iter(documents)
+    while True:
+        with metrics.timer('index.read'):
+            document = next(documents, None)
+        if document is None:
+            return
+        if metrics.enabled:
+            metrics.count('index.docs')
+            metrics.count('index.bytes_read', len(document[1]))
+        yield document
+
+def explain_step_label(step):
+    """Ringkasan satu langkah explain, misal '#1 = quantum (df=120)' atau '#3 = AND(#1, #2)'"""
+    if step['kind'] == 'operator':
+        return '#{} = {}({})'.format(step['id'], step['operator'], ', '.join('#{}'.format(i) for i in step['inputs']))
+    return '#{} = {} (df={})'.format(step['id'], step['token'], step['df'])
+
+def format_explain(plan):
+    """Tabel teks dari plan hasil BSBIIndex.explain(...)"""
+    lines = ['Query    : {}'.format(plan['query']),
+             'Postfix  : {}'.format(' '.join(plan['postfix'])),
+             'Strategy : {}'.format(plan['strategy'])]
+    groups = [(shard['shard'], shard) for shard in plan['shards']] if 'shards' in plan else [(None, plan)]
+    for name, group in groups:
+        if name is not None:
+            lines.append('Shard {}{}'.format(name, ' (skipped by Bloom filter)' if group['skipped'] else ''))
+        for step in group.get('steps', []):
+            if step['kind'] == 'operator':
+                detail = 'in={} out={}'.format('x'.join(map(str, step['input_sizes'])), step['output_size'])
+                if 'query_cache_hit' in step:
+                    detail += ' cache_hit={}'.format(step['query_cache_hit'])
+            else:
+                detail = 'bytes={} decode={:.3f}ms out={}'.format(step['bytes_read'], step['decode_s'] * 1000,
+                                                                 step['output_size'])
+                if step['postings_cache_hit']:
+                    detail += ' postings_cache_hit'
+            lines.append('  {:<40} {:>9.3f}ms  {}'.format(explain_step_label(step), step['elapsed_s'] * 1000, detail))
+    lines.append('Result   : {} docs in {:.3f}ms'.format(plan['result_size'], plan['elapsed_s'] * 1000))
+    return '\n'.join(lines)
 
 class BSBIIndex:
     """
@@ -29,38 +101,265 @@ class BSBIIndex:
     term_id_map(IdMap): Untuk mapping terms ke termIDs
     doc_id_map(IdMap): Untuk mapping relative paths dari dokumen (misal,
                     /collection/0/gamma.txt) to docIDs
-    data_path(str): Path ke data
+    doc_lengths(array): Panjang setiap dokumen (banyaknya token yang di-index),
+                    di-index dengan docID - 1; disimpan sebagai kolom 'length'
+                    di doc table
+    data_path(str): Path ke data (koleksi dengan layout satu file per dokumen,
+                    lihat sources.DirectorySource); boleh None jika source diberikan
     output_path(str): Path ke output index files
     postings_encoding: Lihat di compression.py, kandidatnya adalah StandardPostings,
                     VBEPostings, dsb.
     index_name(str): Nama dari file yang berisi inverted index
+    with_tf(bool): Jika True, term frequency ikut disimpan di index dan skor
+                    maksimum BM25 (per term dan per block) dihitung setelah merge,
+                    sehingga index bisa dipakai untuk ranked retrieval (WAND/BMW)
+    generation(int): Generasi index, naik setiap kali indexing selesai.
+                    Dipakai untuk meng-invalidate query_cache
+    query_cache(QueryResultCache): Cache hasil boolean query (None jika tidak aktif,
+                    lihat enable_query_cache)
+    postings_cache(PostingsCache): Cache postings list hasil decode dari merged
+                    index (None jika tidak aktif, lihat enable_postings_cache)
+    n_shards(int): Jika > 1, index dibangun sebagai n_shards shard yang
+                    dipartisi berdasarkan docID (lihat build_shards), bukan satu
+                    merged index. Ranked retrieval (with_tf) belum didukung
+                    untuk index yang di-shard karena BM25 butuh statistik global.
+    shard_workers(int): Banyaknya worker process untuk membangun shard dan
+                    mengevaluasi query pada shard secara paralel (default: jumlah
+                    CPU). Jika 1, semua shard diproses di process ini.
+    shards(List[Shard]): Manifest shard hasil load(), [] jika index tidak di-shard
+    segment(bool): Jika True, hasil indexing disimpan sebagai satu file segment
+                    <index_name>.seg (lihat segment.py) yang berisi postings,
+                    dictionary, term table, dan doc table. Intermediate indices,
+                    pasangan .index/.dict, terms.dict, dan docs.dict dihapus
+                    setelah segment ditulis. load() otomatis memakai segment
+                    jika ada.
+    encode_workers(int): Banyaknya thread untuk encode postings list saat
+                    menulis index (lihat InvertedIndexWriter); 0 berarti encode
+                    dijalankan di thread pemanggil.
+    pipelined(bool): Jika True, start_indexing memakai pipeline bertahap
+                    (lihat index_blocks_pipelined); metriknya disimpan di
+                    pipeline_stats.
+    analyze_workers(int): Banyaknya worker process untuk stage analyze pada
+                    pipeline; 1 berarti analisis dijalankan di thread stage itu.
+    source: Sumber dokumen (lihat sources.py), misal JsonlSource atau
+                    TarSource, yang menentukan dokumen dan batas block; None
+                    berarti DirectorySource(data_path).
+    reorder(str): Jika 'bisection' atau 'minhash', docID di-assign ulang setelah
+                    merge sehingga dokumen yang mirip mendapat docID berdekatan
+                    (lihat reorder.py dan reorder_doc_ids). None berarti docID
+                    sesuai urutan dokumen dibaca.
+    merge_workers(int): Jika > 1, merged index dibangun secara paralel oleh
+                    merge_workers process, masing-masing me-merge satu rentang
+                    termID (lihat merge.py dan parallel_merge). Hasilnya sama
+                    persis dengan merge sekuensial.
     """
-    def __init__(self, data_path, output_path, postings_encoding, index_name = "main_index"):
+    def __init__(self, data_path, output_path, postings_encoding, index_name = "main_index", with_tf = False,
+                 n_shards = 1, shard_workers = None, segment = False, encode_workers = 0,
+                 pipelined = False, analyze_workers = 1, source = None, reorder = None,
+                 merge_workers = 1):
+        if with_tf and n_shards > 1:
+            raise ValueError("with_tf belum didukung untuk index yang di-shard.")
+        if segment and n_shards > 1:
+            raise ValueError("segment belum didukung untuk index yang di-shard.")
+        if reorder and n_shards > 1:
+            raise ValueError("reorder belum didukung untuk index yang di-shard.")
         self.term_id_map = IdMap()
         self.doc_id_map = IdMap()
         self.data_path = data_path
         self.output_path = output_path
         self.index_name = index_name
         self.postings_encoding = postings_encoding
+        self.with_tf = with_tf
+        self.qac = None
+        self.speller = None
+        self.generation = 0
+        self.query_cache = None
+        self.postings_cache = None
+        self.analyzer = None
+        self.n_shards = n_shards
+        self.shard_workers = shard_workers or os.cpu_count() or 1
+        self.shards = []
+        self.shard_pool = None
+        self.shard_pool_generation = None
+        self.shard_stats = {'queries': 0, 'evaluated': 0, 'skipped': 0}
+        self.segment = segment
+        self.encode_workers = encode_workers
+        self.pipelined = pipelined
+        self.analyze_workers = analyze_workers
+        self.source = source
+        self.reorder = reorder
+        self.merge_workers = merge_workers
+        self.pipeline_stats = None
+        self.opened_segment = None
+        self.opened_segment_id = None
+        self.opened_doc_table = None
+        self.opened_doc_table_id = None
+        self.doc_lengths = array('I')
+        # (term hasil stemming, bentuk asli) -> banyaknya kemunculan, untuk saran did_you_mean
+        self.surface_counts = Counter()
 
         # Untuk menyimpan nama-nama file dari semua intermediate inverted index
         self.intermediate_indices = []
 
     def save(self):
-        """Menyimpan doc_id_map and term_id_map ke output directory via pickle"""
+        """
+        Menyimpan term_id_map ke output directory via pickle, doc_id_map
+        (beserta panjang setiap dokumen) sebagai doc table docs.table (lihat
+        doctable.py), serta stopwords dan konfigurasi stemmer yang dipakai ke
+        analyzer.bin
+        """
+
+        with metrics.timer('io.pickle_save'):
+            with open(os.path.join(self.output_path, 'terms.dict'), 'wb') as f:
+                pickle.dump(self.term_id_map, f)
+        with metrics.timer('io.doc_table_save'):
+            write_doc_table(doc_table_file_path(self.output_path), self.doc_id_map.id_to_str, self.doc_columns())
+        # docs.dict dari indexing versi lama tidak berlaku lagi
+        if os.path.exists(os.path.join(self.output_path, 'docs.dict')):
+            os.remove(os.path.join(self.output_path, 'docs.dict'))
+        save_analyzer(self.output_path, *self.analyzer_resources())
 
-        with open(os.path.join(self.output_path, 'terms.dict'), 'wb') as f:
-            pickle.dump(self.term_id_map, f)
-        with open(os.path.join(self.output_path, 'docs.dict'), 'wb') as f:
-            pickle.dump(self.doc_id_map, f)
+    def doc_columns(self):
+        """Kolom per dokumen untuk doc table: panjang dokumen (banyaknya token yang di-index)"""
+        if len(self.doc_lengths) != len(self.doc_id_map):
+            return {}
+        return {'length': self.doc_lengths}
+
+    def record_doc_length(self, doc_id, length):
+        if doc_id > len(self.doc_lengths):
+            self.doc_lengths.extend([0] * (doc_id - len(self.doc_lengths)))
+        self.doc_lengths[doc_id - 1] = length
+
+    def analyzer_resources(self):
+        """
+        (stopwords, konfigurasi stemmer) untuk analisis. Dibaca dari
+        analyzer.bin milik index; index lama yang belum memilikinya memakai
+        stopwords NLTK (yang baru di-import saat itu).
+        """
+        if self.analyzer is None:
+            loaded = load_analyzer(self.output_path) if self.output_path else None
+            self.analyzer = loaded or (default_stopwords(), DEFAULT_CONFIG)
+        return self.analyzer
 
     def load(self):
-        """Memuat doc_id_map and term_id_map dari output directory"""
+        """
+        Memuat doc_id_map and term_id_map dari output directory. Jika index
+        disimpan sebagai segment, keduanya dibaca langsung dari segment (yang
+        tetap terbuka dan hanya dibuka ulang jika file-nya berganti). Begitu
+        juga doc table docs.table; index lama yang masih menyimpan docs.dict
+        tetap bisa dimuat.
+        """
+        path = segment_file_path(self.index_name, self.output_path)
+        if os.path.exists(path):
+            self.open_segment(path)
+            self.term_id_map = self.opened_segment.term_map
+            self.doc_id_map = self.opened_segment.doc_table
+        else:
+            with metrics.timer('io.pickle_load'):
+                with open(os.path.join(self.output_path, 'terms.dict'), 'rb') as f:
+                    self.term_id_map = pickle.load(f)
+                if not os.path.exists(doc_table_file_path(self.output_path)):
+                    with open(os.path.join(self.output_path, 'docs.dict'), 'rb') as f:
+                        self.doc_id_map = pickle.load(f)
+            if os.path.exists(doc_table_file_path(self.output_path)):
+                self.open_doc_table(doc_table_file_path(self.output_path))
+                self.doc_id_map = self.opened_doc_table
+        generation = self.read_generation()
+        if generation != self.generation:
+            # Index dibangun ulang, analyzer.bin mungkin ikut berubah
+            self.analyzer = None
+        self.generation = generation
+        if self.query_cache is not None:
+            self.query_cache.set_generation(self.generation)
+        if self.postings_cache is not None:
+            self.postings_cache.set_generation(self.generation)
+        self.shards = load_shards(self.index_name, self.output_path)
+
+    def open_segment(self, path):
+        st = os.stat(path)
+        segment_id = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if self.opened_segment is None or self.opened_segment_id != segment_id:
+            if self.opened_segment is not None:
+                self.opened_segment.close()
+            self.opened_segment = Segment(path)
+            self.opened_segment_id = segment_id
+
+    def open_doc_table(self, path):
+        st = os.stat(path)
+        doc_table_id = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if self.opened_doc_table is None or self.opened_doc_table_id != doc_table_id:
+            if self.opened_doc_table is not None:
+                self.opened_doc_table.close()
+            self.opened_doc_table = DocTableFile(path)
+            self.opened_doc_table_id = doc_table_id
+
+    def write_segment(self):
+        """
+        Tulis merged index, term_id_map, dan doc_id_map sebagai satu segment
+        <index_name>.seg, lalu hapus file-file yang sudah digantikannya.
+        """
+        with InvertedIndexReader(self.index_name, self.postings_encoding, path=self.output_path) as reader:
+            write_segment(segment_file_path(self.index_name, self.output_path), reader,
+                          self.term_id_map.id_to_str, self.doc_id_map.id_to_str, self.doc_columns())
+        replaced = [index_id + ext for index_id in self.intermediate_indices + [self.index_name]
+                    for ext in ('.index', '.dict')] + ['terms.dict', 'docs.dict', 'docs.table']
+        for filename in replaced:
+            if os.path.exists(os.path.join(self.output_path, filename)):
+                os.remove(os.path.join(self.output_path, filename))
+
+    def read_generation(self):
+        """Generasi index di output directory (0 jika belum pernah di-index)"""
+        try:
+            with open(os.path.join(self.output_path, 'generation'), 'r') as f:
+                return int(f.read())
+        except FileNotFoundError:
+            return 0
 
-        with open(os.path.join(self.output_path, 'terms.dict'), 'rb') as f:
-            self.term_id_map = pickle.load(f)
-        with open(os.path.join(self.output_path, 'docs.dict'), 'rb') as f:
-            self.doc_id_map = pickle.load(f)
+    def bump_generation(self):
+        """Naikkan generasi index, sehingga semua hasil query yang di-cache menjadi tidak valid"""
+        self.generation = self.read_generation() + 1
+        with open(os.path.join(self.output_path, 'generation'), 'w') as f:
+            f.write(str(self.generation))
+        if self.query_cache is not None:
+            self.query_cache.set_generation(self.generation)
+        if self.postings_cache is not None:
+            self.postings_cache.set_generation(self.generation)
+
+    def enable_query_cache(self, max_bytes = 64 * 1024 * 1024):
+        """
+        Aktifkan cache hasil boolean_retrieve dengan batas ukuran max_bytes.
+        Statistik hit/miss tersedia lewat self.query_cache.stats().
+        """
+        self.query_cache = QueryResultCache(max_bytes)
+        self.query_cache.set_generation(self.generation)
+        return self.query_cache
+
+    def enable_postings_cache(self, max_bytes = 64 * 1024 * 1024, policy = 'lru', min_df = 0, hot_terms = None):
+        """
+        Aktifkan cache postings list hasil decode untuk merged index (lihat
+        cache.PostingsCache untuk policy dan min_df). Jika hot_terms (list of
+        term yang sudah di-stem, misal dari query log) diberikan, postings
+        list-nya langsung dimuat ke cache. Statistik tersedia lewat
+        self.postings_cache.stats().
+
+        Shard dibuka per query tanpa postings cache, sehingga cache ini tidak
+        bisa dipakai untuk index yang di-shard (ValueError).
+        """
+        if self.shards or os.path.exists(shards_file_path(self.index_name, self.output_path)):
+            raise ValueError("postings cache tidak didukung untuk index yang di-shard")
+        self.postings_cache = PostingsCache(max_bytes, policy, min_df)
+        self.postings_cache.set_generation(self.generation)
+        if hot_terms:
+            self.load()
+            term_ids = [self.term_id_map[term] for term in hot_terms if term in self.term_id_map.str_to_id]
+            with self.open_reader() as reader:
+                reader.warm_up(term_ids)
+        return self.postings_cache
+
+    def open_reader(self, use_mmap = False):
+        """InvertedIndexReader untuk merged index, memakai postings_cache jika aktif"""
+        return InvertedIndexReader(self.index_name, self.postings_encoding, path=self.output_path,
+                                   postings_cache=self.postings_cache, use_mmap=use_mmap)
 
     def start_indexing(self):
         """
@@ -72,26 +371,323 @@ class BSBIIndex:
         untuk parsing dokumen dan memanggil invert_write yang melakukan inversion
         di setiap block dan menyimpannya ke index yang baru.
         """
-        # loop untuk setiap sub-directory di dalam folder collection (setiap block)]
-        for block_path in tqdm(sorted(next(os.walk(self.data_path))[1])):
-            gc.collect()
-            td_pairs = self.parsing_block(block_path)
-            index_id = 'intermediate_index_'+block_path
-            self.intermediate_indices.append(index_id)
-            with InvertedIndexWriter(index_id, self.postings_encoding, path = self.output_path) as index:
-                self.write_to_index(td_pairs, index)
-                td_pairs = None
+        # loop untuk setiap block dari sumber dokumen (default: setiap sub-directory di dalam folder collection)
+        blocks = self.document_source().blocks()
+        # Index baru selalu memakai stopwords terkini, bukan analyzer.bin dari build sebelumnya
+        self.analyzer = (default_stopwords(), DEFAULT_CONFIG)
+        self.surface_counts = Counter()
+        if self.pipelined:
+            block_doc_ids = self.index_blocks_pipelined(blocks)
+        else:
+            # Ingat untuk install tqdm terlebih dahulu (pip install tqdm)
+            from tqdm import tqdm
+            block_doc_ids = [len(self.doc_id_map)]
+            for block_path, documents in tqdm(blocks):
+                gc.collect()
+                td_pairs = self.parsing_block(block_path, documents)
+                block_doc_ids.append(len(self.doc_id_map))
+                index_id = 'intermediate_index_'+block_path
+                self.intermediate_indices.append(index_id)
+                with InvertedIndexWriter(index_id, self.postings_encoding, path = self.output_path,
+                                         encode_workers = self.encode_workers) as index, \
+                        metrics.timer('index.invert_write'):
+                    self.write_to_index(td_pairs, index)
+                    td_pairs = None
     
         self.save()
 
         gc.collect()
-        with InvertedIndexWriter(self.index_name, self.postings_encoding, path = self.output_path) as merged_index:
-            with contextlib.ExitStack() as stack:
-                indices = [stack.enter_context(InvertedIndexReader(index_id, self.postings_encoding, path=self.output_path))
-                               for index_id in self.intermediate_indices]
-                self.merge_index(indices, merged_index)
+        if self.n_shards > 1:
+            with metrics.timer('index.build_shards'):
+                self.build_shards(block_doc_ids)
+        else:
+            if self.merge_workers > 1:
+                with metrics.timer('index.merge'):
+                    self.parallel_merge()
+            else:
+                with InvertedIndexWriter(self.index_name, self.postings_encoding, path = self.output_path,
+                                         encode_workers = self.encode_workers) as merged_index, \
+                        metrics.timer('index.merge'):
+                    with contextlib.ExitStack() as stack:
+                        indices = [stack.enter_context(InvertedIndexReader(index_id, self.postings_encoding, path=self.output_path))
+                                       for index_id in self.intermediate_indices]
+                        self.merge_index(indices, merged_index)
+            # Manifest shard dari indexing sebelumnya tidak berlaku lagi
+            if os.path.exists(shards_file_path(self.index_name, self.output_path)):
+                os.remove(shards_file_path(self.index_name, self.output_path))
+            self.shards = []
+            if self.reorder:
+                with metrics.timer('index.reorder'):
+                    self.reorder_doc_ids()
+
+        if self.with_tf:
+            with metrics.timer('index.score_index'):
+                build_score_index(self.index_name, self.postings_encoding, self.output_path)
+        with metrics.timer('index.autocomplete'):
+            self.build_autocomplete()
+        with metrics.timer('index.spelling'):
+            self.build_spelling_corrector()
+        if self.segment:
+            with metrics.timer('index.segment'):
+                self.write_segment()
+        elif os.path.exists(segment_file_path(self.index_name, self.output_path)):
+            # Segment dari indexing sebelumnya tidak berlaku lagi
+            os.remove(segment_file_path(self.index_name, self.output_path))
+        self.bump_generation()
+
+    def parallel_merge(self):
+        """
+        Merge intermediate indices menjadi merged index secara paralel: ruang
+        termID dibagi menjadi merge_workers rentang yang seimbang menurut
+        total byte postings (term_ranges), setiap rentang di-merge di process
+        pool menjadi file part (merge_part), lalu part-part disambung sesuai
+        urutan rentang dengan append_index dan dihapus.
+        """
+        with contextlib.ExitStack() as stack:
+            indices = [stack.enter_context(InvertedIndexReader(index_id, self.postings_encoding, path=self.output_path))
+                       for index_id in self.intermediate_indices]
+            ranges = term_ranges(indices, self.merge_workers)
+        jobs = [(self.intermediate_indices, '{}_part{}'.format(self.index_name, k), self.postings_encoding,
+                 self.output_path, self.with_tf, term_range, self.encode_workers)
+                for k, term_range in enumerate(ranges)]
+        if len(jobs) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(len(jobs)) as pool:
+                part_names = list(pool.map(merge_part, *zip(*jobs)))
+        else:
+            part_names = [merge_part(*job) for job in jobs]
+        with InvertedIndexWriter(self.index_name, self.postings_encoding, path=self.output_path) as merged_index:
+            for part_name in part_names:
+                with InvertedIndexReader(part_name, self.postings_encoding, path=self.output_path) as part_index:
+                    merged_index.append_index(part_index)
+                os.remove(part_index.index_file_path)
+                os.remove(part_index.metadata_file_path)
+
+    def reorder_doc_ids(self):
+        """
+        Assign ulang docID di merged index dengan metode self.reorder, lalu
+        tulis ulang postings (dan tf) list, doc_id_map, dan doc_lengths dengan
+        docID yang baru. Intermediate indices tetap memakai docID lama.
+        """
+        with InvertedIndexReader(self.index_name, self.postings_encoding, path=self.output_path) as reader:
+            postings_lists = load_postings_lists(reader)
+        order = compute_order(postings_lists, len(self.doc_id_map), self.reorder)
+        postings_lists = None
+        reassign_doc_ids(self.index_name, self.postings_encoding, self.output_path, new_doc_ids(order))
+        doc_id_map = IdMap()
+        for old_id in order:
+            doc_id_map[self.doc_id_map[old_id]]
+        if len(self.doc_lengths) == len(order):
+            self.doc_lengths = array('I', [self.doc_lengths[old_id - 1] for old_id in order])
+        self.doc_id_map = doc_id_map
+        self.save()
+
+    def document_source(self):
+        return self.source if self.source is not None else DirectorySource(self.data_path)
+
+    def assign_doc_id(self, doc_name):
+        """docID baru untuk doc_name; nama dokumen yang muncul dua kali ditolak"""
+        if doc_name in self.doc_id_map.str_to_id:
+            raise ValueError("dokumen {!r} muncul lebih dari sekali".format(doc_name))
+        return self.doc_id_map[doc_name]
+
+    def index_blocks_pipelined(self, blocks, queue_size = 64):
+        """
+        Versi pipeline dari loop parsing_block + write_to_index di
+        start_indexing. Empat stage berjalan bersamaan (lihat pipeline.py):
+
+            read    : membaca dokumen dari blocks (iterable of (block_id,
+                      iterable of (nama, text)), lihat sources.py) sesuai urutan
+            analyze : tokenisasi, stopword removal, dan stemming (self.analyze)
+            invert  : memberi docID/termID dan membangun postings block
+                      (termID -> {docID: tf})
+            write   : encode dan tulis intermediate index setiap block
+
+        Karena setiap stage memproses item sesuai urutan (dan stage analyze
+        memakai satu stemmer per block seperti parsing_block), hasilnya sama
+        persis dengan versi sekuensial. Jika analyze_workers > 1, stage
+        analyze mengirim dokumen ke process pool dan meneruskan hasilnya tetap
+        sesuai urutan dokumen; karena Porter2Stemmer menyimpan state antar
+        kata, stemmer dibuat per dokumen sehingga sebagian kecil kata langka
+        bisa di-stem sedikit berbeda dari versi sekuensial. Queue antara
+        invert dan write berisi satu block utuh, sehingga dibatasi 1 block.
+        Metrik setiap stage disimpan di self.pipeline_stats.
+
+        Returns
+        -------
+        List[int]
+            banyaknya dokumen sebelum setiap block, diakhiri banyaknya
+            dokumen (seperti block_doc_ids di start_indexing)
+        """
+        en_stopwords, config = self.analyzer_resources()
+        stemmer = make_stemmer(config)
+        block_doc_ids = [len(self.doc_id_map)]
+        term_dict = {}
+
+        def read():
+            for block_path, documents in blocks:
+                for doc_name, text in timed_documents(documents):
+                    yield block_path, doc_name, text
+                # Penanda akhir block
+                yield block_path, None, None
+
+        analysis_pool = None
+        if self.analyze_workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            analysis_pool = ProcessPoolExecutor(self.analyze_workers, initializer=init_analysis_worker,
+                                                initargs=(en_stopwords, config))
+        pending = deque()
+
+        def analyze(item):
+            nonlocal stemmer
+            block_path, doc_name, text = item
+            if analysis_pool is None:
+                if doc_name is not None:
+                    text = self.analyze(text, stemmer, en_stopwords, self.surface_counts)
+                else:
+                    stemmer = make_stemmer(config)
+                return [(block_path, doc_name, text)]
+            if doc_name is not None:
+                text = analysis_pool.submit(analyze_in_worker, text)
+            pending.append((block_path, doc_name, text))
+            outputs = []
+            while pending and (len(pending) > queue_size or pending[0][1] is None or pending[0][2].done()):
+                outputs.append(finish_analysis(*pending.popleft()))
+            return outputs
+
+        def finish_analysis(block_path, doc_name, future):
+            if doc_name is None:
+                return block_path, None, None
+            tokens, surface_counts = future.result()
+            self.surface_counts.update(surface_counts)
+            return block_path, doc_name, tokens
+
+        def flush_analysis():
+            while pending:
+                yield finish_analysis(*pending.popleft())
 
-    def parsing_block(self, block_path):
+        def invert(item):
+            nonlocal term_dict
+            block_path, doc_name, tokens = item
+            if doc_name is None:
+                block_doc_ids.append(len(self.doc_id_map))
+                block_term_dict, term_dict = term_dict, {}
+                return [(block_path, block_term_dict)]
+            doc_id = self.assign_doc_id(doc_name)
+            for token in tokens:
+                postings = term_dict.setdefault(self.term_id_map[token], {})
+                postings[doc_id] = postings.get(doc_id, 0) + 1
+            self.record_doc_length(doc_id, len(tokens))
+            if metrics.enabled:
+                metrics.count('index.pairs', len(tokens))
+            return []
+
+        def write(item):
+            block_path, block_term_dict = item
+            index_id = 'intermediate_index_' + block_path
+            self.intermediate_indices.append(index_id)
+            with InvertedIndexWriter(index_id, self.postings_encoding, path = self.output_path,
+                                     encode_workers = self.encode_workers) as index, \
+                    metrics.timer('index.invert_write'):
+                self.write_term_dict(block_term_dict, index)
+            return []
+
+        pipeline = Pipeline(queue_size)
+        pipeline.add_stage('read', read).add_stage('analyze', analyze, finish = flush_analysis)
+        pipeline.add_stage('invert', invert).add_stage('write', write, queue_size = 1)
+        try:
+            pipeline.run()
+        finally:
+            self.pipeline_stats = pipeline.stats()
+            if analysis_pool is not None:
+                analysis_pool.shutdown(cancel_futures = True)
+        return block_doc_ids
+
+    def build_shards(self, block_doc_ids):
+        """
+        Membangun n_shards shard yang dipartisi berdasarkan docID. Karena docID
+        diberikan berurutan per block, setiap shard cukup berisi block-block
+        yang berurutan: shard ke-k adalah hasil merge intermediate indices
+        block-block tersebut dan mencakup docID [block_doc_ids[awal] + 1,
+        block_doc_ids[akhir] + 1). Merge setiap shard saling independen
+        sehingga dijalankan paralel di process pool.
+
+        Parameters
+        ----------
+        block_doc_ids: List[int]
+            block_doc_ids[i] adalah banyaknya dokumen sebelum block ke-i
+            (docID dimulai dari 1, sehingga docID pertama block ke-i adalah
+            block_doc_ids[i] + 1); elemen terakhir adalah banyaknya dokumen
+        """
+        n_blocks = len(self.intermediate_indices)
+        n_shards = max(1, min(self.n_shards, n_blocks))
+        jobs = []
+        for k in range(n_shards):
+            first, last = k * n_blocks // n_shards, (k + 1) * n_blocks // n_shards
+            jobs.append((self.intermediate_indices[first:last], '{}_shard{}'.format(self.index_name, k),
+                         self.postings_encoding, self.output_path,
+                         (block_doc_ids[first] + 1, block_doc_ids[last] + 1)))
+        if self.shard_workers > 1 and n_shards > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(min(self.shard_workers, n_shards)) as pool:
+                self.shards = list(pool.map(build_shard, *zip(*jobs)))
+        else:
+            self.shards = [build_shard(*job) for job in jobs]
+        save_shards(self.shards, self.index_name, self.output_path)
+
+    def source_indices(self):
+        """Nama index yang berisi postings: semua shard, atau merged index"""
+        return [shard.name for shard in self.shards] or [self.index_name]
+
+    def sharded_postings(self, postfix):
+        """
+        Coordinator untuk index yang di-shard: query dievaluasi di setiap shard
+        (paralel di process pool jika shard_workers > 1), lalu hasilnya
+        digabung sesuai urutan shard, yang sekaligus urutan docID. Shard yang
+        menurut Bloom filter-nya pasti tidak cocok dengan query dilewati tanpa
+        dibuka. Jumlah shard yang dievaluasi dan dilewati dicatat di shard_stats.
+        """
+        tree = postfix_to_tree(postfix)
+        if tree is None:
+            return []
+        str_to_id = self.term_id_map.str_to_id
+        selected = [shard for shard in self.shards
+                    if might_match(tree, lambda term: term in str_to_id and str_to_id[term] in shard.bloom)]
+        self.shard_stats['queries'] += 1
+        self.shard_stats['evaluated'] += len(selected)
+        self.shard_stats['skipped'] += len(self.shards) - len(selected)
+
+        if self.shard_workers > 1 and len(selected) > 1:
+            if self.shard_pool is None or self.shard_pool_generation != self.generation:
+                if self.shard_pool is not None:
+                    self.shard_pool.shutdown()
+                from concurrent.futures import ProcessPoolExecutor
+                self.shard_pool = ProcessPoolExecutor(min(self.shard_workers, len(self.shards)),
+                                                      initializer=init_shard_worker,
+                                                      initargs=(self.output_path, self.postings_encoding, self.index_name))
+                self.shard_pool_generation = self.generation
+            futures = [self.shard_pool.submit(evaluate_on_shard, shard.name, postfix) for shard in selected]
+            results = [future.result() for future in futures]
+        else:
+            results = []
+            for shard in selected:
+                with InvertedIndexReader(shard.name, self.postings_encoding, path=self.output_path) as reader:
+                    results.append(self.evaluate_postfix(postfix, reader))
+        return [doc_id for result in results for doc_id in result]
+
+    def close(self):
+        """Hentikan process pool milik coordinator shard dan tutup segment dan doc table, jika ada"""
+        if self.shard_pool is not None:
+            self.shard_pool.shutdown()
+            self.shard_pool = None
+        if self.opened_segment is not None:
+            self.opened_segment.close()
+            self.opened_segment = None
+        if self.opened_doc_table is not None:
+            self.opened_doc_table.close()
+            self.opened_doc_table = None
+
+    def parsing_block(self, block_path, documents = None):
         """
         Lakukan parsing terhadap text file sehingga menjadi sequence of
         <termID, docID> pairs.
@@ -113,6 +709,9 @@ class BSBIIndex:
             CATAT bahwa satu folder di collection dianggap merepresentasikan satu block.
             Konsep block di soal tugas ini berbeda dengan konsep block yang terkait
             dengan operating systems.
+        documents : iterable of (str, str)
+            Dokumen (nama, text) di block ini, misal dari sources.JsonlSource.
+            Jika None, dokumen dibaca dari file-file di directory block_path.
 
         Returns
         -------
@@ -125,31 +724,53 @@ class BSBIIndex:
         termIDs dan docIDs. Dua variable ini harus persis untuk semua pemanggilan
         parse_block(...).
         """
-        import re
-        from porter2stemmer import Porter2Stemmer
-        stemmer = Porter2Stemmer()
-        en_stopwords = stopwords.words('english')
+        en_stopwords, config = self.analyzer_resources()
+        stemmer = make_stemmer(config)
+        if documents is None:
+            documents = DirectorySource(self.data_path).documents(block_path)
         td_pairs = []
-        block_dir = os.path.join(self.data_path, block_path)
-        for filename in sorted(os.listdir(block_dir)):
-            file_path = os.path.join(block_dir, filename)
-            if os.path.isfile(file_path):
-                # Map document relative path to docID
-                doc_id = self.doc_id_map[os.path.join(block_path, filename)]
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    text = f.read()
-                tokens = re.findall(r'\b\w+\b', text.lower())
-                # Remove stopwords and punctuation
-                tokens = [token for token in tokens if token.lower() not in en_stopwords]
-                for token in tokens:
-                    stemmed = stemmer.stem(token)
-                    term_id = self.term_id_map[stemmed]
-                    td_pairs.append((term_id, doc_id))
+        for doc_name, text in timed_documents(documents):
+            # Map document name (relative path) to docID
+            doc_id = self.assign_doc_id(doc_name)
+            tokens = self.analyze(text, stemmer, en_stopwords, self.surface_counts)
+            for stemmed in tokens:
+                term_id = self.term_id_map[stemmed]
+                td_pairs.append((term_id, doc_id))
+            self.record_doc_length(doc_id, len(tokens))
 
         # Sort td_pairs by termID and docID
-        td_pairs.sort(key=lambda x: (x[0], x[1]))  # Sort by termID first, then docID
+        with metrics.timer('index.sort'):
+            td_pairs.sort(key=lambda x: (x[0], x[1]))  # Sort by termID first, then docID
+        if metrics.enabled:
+            metrics.count('index.pairs', len(td_pairs))
         return td_pairs
 
+    def analyze(self, text, stemmer, en_stopwords, surface_counts = None):
+        """
+        Tokenisasi text dengan regex, buang stopwords, lalu lakukan stemming.
+        Dipakai saat parsing dokumen maupun saat memproses query ranked retrieval.
+        Jika surface_counts (Counter) diberikan, setiap pasangan (token hasil
+        stemming, token asli) dihitung di sana.
+
+        Returns
+        -------
+        List[str]
+            token yang sudah di-stem, sesuai urutan kemunculan
+        """
+        import re
+        with metrics.timer('analyze.tokenize'):
+            tokens = re.findall(r'\b\w+\b', text.lower())
+        # Remove stopwords and punctuation
+        with metrics.timer('analyze.stem'):
+            kept = [token for token in tokens if token not in en_stopwords]
+            stemmed = [stemmer.stem(token) for token in kept]
+        if surface_counts is not None:
+            surface_counts.update(zip(stemmed, kept))
+        if metrics.enabled:
+            metrics.count('analyze.tokens', len(tokens))
+            metrics.count('analyze.stemmed_tokens', len(stemmed))
+        return stemmed
+
     def write_to_index(self, td_pairs, index):
         """
         Melakukan inversion td_pairs (list of <termID, docID> pairs) dan
@@ -171,88 +792,506 @@ class BSBIIndex:
         term_dict = {}
         for term_id, doc_id in td_pairs:
             if term_id not in term_dict:
-                term_dict[term_id] = set()
-            term_dict[term_id].add(doc_id)
+                term_dict[term_id] = {}
+            term_dict[term_id][doc_id] = term_dict[term_id].get(doc_id, 0) + 1
+        self.write_term_dict(term_dict, index)
+
+    def write_term_dict(self, term_dict, index):
+        """Tulis hasil inversion (termID -> {docID: tf}) ke index, terurut berdasarkan termID"""
         for term_id in sorted(term_dict.keys()):
-            index.append(term_id, sorted(list(term_dict[term_id])))
+            postings_list = sorted(term_dict[term_id])
+            if self.with_tf:
+                index.append(term_id, postings_list, [term_dict[term_id][doc_id] for doc_id in postings_list])
+            else:
+                index.append(term_id, postings_list)
 
-    def merge_index(self, indices, merged_index):
-        # Multiway merge using a heap. Each heap element is a tuple (term, unique_id, postings_list, reader)
+    def merge_index(self, indices, merged_index, term_range = None):
+        """
+        Multiway merge intermediate indices dengan heap berisi (term, urutan
+        reader). Postings list dari term yang sama tidak di-decode utuh, tetapi
+        dibaca lewat postings_cursor (dan tf_cursor), digabung secara streaming
+        dengan union_iter/union_with_tf_iter, lalu ditulis per chunk dengan
+        append_stream, sehingga memori yang dipakai bergantung pada ukuran
+        chunk, bukan pada postings list terpanjang.
+
+        Jika term_range = (low, high) diberikan, hanya term di [low, high)
+        yang di-merge (None berarti tidak dibatasi); term setiap intermediate
+        index terurut, sehingga awal dan akhirnya dicari dengan bisect.
+        """
         heap = []
-        for reader in indices:
-            try:
-                term, postings = next(reader)
-                heapq.heappush(heap, (term, id(reader), postings, reader))
-            except StopIteration:
-                pass
-        
+        if term_range is None:
+            term_iters = [iter(reader.terms) for reader in indices]
+        else:
+            low, high = term_range
+            term_iters = []
+            for reader in indices:
+                start = 0 if low is None else bisect.bisect_left(reader.terms, low)
+                end = len(reader.terms) if high is None else bisect.bisect_left(reader.terms, high)
+                term_iters.append(itertools.islice(reader.terms, start, end))
+        for i, term_iter in enumerate(term_iters):
+            term = next(term_iter, None)
+            if term is not None:
+                heapq.heappush(heap, (term, i))
+
         while heap:
-            current_term, _, postings, reader = heapq.heappop(heap)
-            merged_postings = postings
-            # Merge all entries with same term
+            current_term, i = heapq.heappop(heap)
+            readers = [i]
+            # Kumpulkan semua reader yang memiliki term yang sama
             while heap and heap[0][0] == current_term:
-                _, _, postings_next, reader_next = heapq.heappop(heap)
-                merged_postings = sort_union_list(merged_postings, postings_next)
-                try:
-                    next_term, next_postings = next(reader_next)
-                    heapq.heappush(heap, (next_term, id(reader_next), next_postings, reader_next))
-                except StopIteration:
-                    pass
+                readers.append(heapq.heappop(heap)[1])
+            if metrics.enabled:
+                metrics.count('merge.terms')
+                metrics.count('merge.heap_pops', len(readers))
+            if self.with_tf:
+                merged = union_with_tf_iter(*[zip(indices[i].postings_cursor(current_term),
+                                                  indices[i].tf_cursor(current_term)) for i in readers])
+            else:
+                merged = union_iter(*[indices[i].postings_cursor(current_term) for i in readers])
             # Write merged postings for the term
-            merged_index.append(current_term, merged_postings)
-            try:
-                next_term, next_postings = next(reader)
-                heapq.heappush(heap, (next_term, id(reader), next_postings, reader))
-            except StopIteration:
-                pass
-
-    def boolean_retrieve(self, query):
+            merged_index.append_stream(current_term, merged, self.with_tf)
+            for i in readers:
+                next_term = next(term_iters[i], None)
+                if next_term is not None:
+                    heapq.heappush(heap, (next_term, i))
+
+    def boolean_retrieve(self, query, did_you_mean = False, explain = False, limit = None):
+        """
+        Boolean retrieval untuk query dengan operator AND, OR, dan DIFF.
+
+        Jika limit diberikan, hanya limit docID pertama yang dicari: query
+        dievaluasi document-at-a-time (lihat stream_postings) dan evaluasi
+        berhenti begitu limit dokumen ditemukan, tanpa melewati query_cache.
+        count() dari hasilnya paling banyak limit.
+
+        Jika explain=True, query dievaluasi lewat explain(...) dan trace-nya
+        disimpan di atribut explain dari SearchResult yang dikembalikan. Jika
+        explain=False (default), jalur evaluasi biasa tidak berubah sama sekali.
+
+        Jika did_you_mean=True, operand yang tidak ada di lexicon diganti dengan
+        koreksi ejaan terbaiknya (lihat did_you_mean(...)) sebelum dievaluasi,
+        sehingga salah ketik pada query AND tidak membuat hasilnya kosong.
+
+        Jika query_cache aktif (lihat enable_query_cache), query dievaluasi
+        dari expression tree kanonik (QueryParser.expression_tree) dan hasil
+        setiap sub-expression di-cache, sehingga query yang identik atau yang
+        berbagi sub-expression tidak perlu membaca postings lagi.
+
+        Returns
+        -------
+        SearchResult
+            hasil yang lazy: count() tanpa me-resolve nama dokumen, page(offset,
+            limit) untuk satu halaman nama dokumen, atau iterasi
+        """
+        if explain:
+            plan, final_postings = self.explain(query, did_you_mean)
+            return SearchResult(final_postings, self.doc_id_map, plan)
+
         try:
             self.load()
         except FileNotFoundError:
             print("Index files not found. Please run indexing first.")
 
-        # Import stemmer when needed
-        from porter2stemmer import Porter2Stemmer
-        
-        # Instantiate query parser with empty stopwords set.
-        en_stopwords = stopwords.words('english')
-        qp = QueryParser(query, Porter2Stemmer(), stopwords=en_stopwords)
+        if metrics.enabled:
+            metrics.count('query.boolean')
+        with metrics.timer('query.boolean'):
+            if limit is not None:
+                with contextlib.closing(self.stream_postings(self.query_postfix(query, did_you_mean))) as doc_ids:
+                    final_postings = list(itertools.islice(doc_ids, limit))
+            elif self.shards:
+                final_postings = self.boolean_postings(query, None, did_you_mean)
+            else:
+                # Open the merged index for operand retrieval
+                with self.open_reader() as reader:
+                    final_postings = self.boolean_postings(query, reader, did_you_mean)
+        # Nama dokumen baru di-resolve lewat doc_id_map saat hasilnya dipakai
+        return SearchResult(final_postings, self.doc_id_map)
+
+    def boolean_postings(self, query, reader, did_you_mean = False):
+        """
+        Evaluasi boolean query terhadap reader yang sudah terbuka dan kembalikan
+        list of docIDs yang terurut. Dipakai oleh boolean_retrieve(...) dan oleh
+        worker di server.py, yang membuka index sekali untuk banyak query.
+        Untuk index yang di-shard, reader diabaikan (lihat sharded_postings).
+        """
+        postfix = self.query_postfix(query, did_you_mean)
+        if self.shards:
+            if self.query_cache is None:
+                return self.sharded_postings(postfix)
+            # Shard dievaluasi di process lain, sehingga hanya hasil akhir query yang di-cache
+            tree = canonicalize_tree(postfix_to_tree(postfix))
+            result = self.query_cache.get(tree)
+            if result is None:
+                result = self.sharded_postings(postfix)
+                self.query_cache.put(tree, result)
+            return result
+        if self.query_cache is not None:
+            tree = canonicalize_tree(postfix_to_tree(postfix))
+            return [] if tree is None else self.evaluate_tree(tree, reader)
+        return self.evaluate_postfix(postfix, reader)
+
+    def boolean_stream(self, query, did_you_mean = False):
+        """
+        Boolean retrieval yang hasilnya mengalir: iterator nama dokumen yang
+        cocok, terurut berdasarkan docID, yang dievaluasi document-at-a-time
+        (lihat stream_postings). Dokumen pertama tersedia tanpa menunggu
+        seluruh query dievaluasi. Query di-parse saat method dipanggil,
+        sehingga query yang tidak valid langsung menghasilkan ValueError.
+        """
+        self.load()
+        if metrics.enabled:
+            metrics.count('query.stream')
+        postfix = self.query_postfix(query, did_you_mean)
+        return (self.doc_id_map[doc_id] for doc_id in self.stream_postings(postfix))
+
+    def stream_postings(self, postfix):
+        """
+        Generator docID hasil query postfix, dievaluasi document-at-a-time di
+        merged index, atau di setiap shard (sesuai urutan shard, yang sekaligus
+        urutan docID) yang tidak dilewati oleh Bloom filter. Index dibuka
+        selama generator dikonsumsi dan ditutup saat generator selesai atau
+        di-close(), sehingga konsumen boleh berhenti kapan saja.
+        """
+        if self.shards:
+            tree = postfix_to_tree(postfix)
+            if tree is None:
+                return
+            str_to_id = self.term_id_map.str_to_id
+            for shard in self.shards:
+                if might_match(tree, lambda term: term in str_to_id and str_to_id[term] in shard.bloom):
+                    with InvertedIndexReader(shard.name, self.postings_encoding, path=self.output_path) as reader:
+                        yield from self.daat_postings(postfix, reader)
+        else:
+            with self.open_reader() as reader:
+                yield from self.daat_postings(postfix, reader)
+
+    def daat_postings(self, postfix, reader):
+        """
+        Iterator docID hasil query postfix terhadap reader yang sudah terbuka.
+        Postfix dikompilasi menjadi tree operator cursor (lihat daat.py) dan
+        docID ditarik satu per satu dari root-nya: memori yang dipakai
+        sebanding dengan ukuran query, bukan dengan panjang postings list
+        atau hasil antara.
+        """
+        str_to_id = self.term_id_map.str_to_id
+        return iter_docs(compile_postfix(postfix, lambda token: term_cursor(
+            reader, self.term_id_map[token] if token in str_to_id else None)))
+
+    def explain(self, query, did_you_mean = False):
+        """
+        EXPLAIN untuk boolean query: evaluasi query langkah demi langkah
+        sesuai urutan postfix dan catat apa yang terjadi di setiap langkah.
+        Berbeda dengan evaluate_postfix, setiap langkah dibentuk menjadi list
+        supaya waktu, ukuran input, dan ukuran output per langkah bisa diukur;
+        hasil akhirnya tetap sama.
+
+        Returns
+        -------
+        Tuple[Dict, List[int]]
+            plan dan list of docIDs hasil query. plan berisi:
+                query, postfix (term sudah di-stem)
+                strategy: jalur yang dipakai boolean_retrieve untuk query ini
+                          ('stream', 'tree+query_cache', atau 'sharded')
+                tree: expression tree kanonik (selain strategy 'stream')
+                evaluation_order: satu baris per langkah, misal '#3 = AND(#1, #2)';
+                                  untuk index yang di-shard, langkah shard pertama
+                                  yang tidak dilewati Bloom filter
+                steps: per operand: token, term_id, df (dari postings_dict),
+                       bytes_read, decode_s, output_size, elapsed_s, dan
+                       postings_cache_hit; per operator: operator, inputs,
+                       input_sizes, output_size, elapsed_s, dan
+                       query_cache_hit (jika query_cache aktif)
+                shards: untuk index yang di-shard, per shard: skipped (oleh
+                        Bloom filter) atau steps-nya sendiri
+                result_size, elapsed_s
+        """
+        start = time.perf_counter()
+        self.load()
+        postfix = self.query_postfix(query, did_you_mean)
+        if self.shards:
+            strategy = 'sharded'
+        else:
+            strategy = 'stream' if self.query_cache is None else 'tree+query_cache'
+        plan = {'query': query, 'postfix': postfix, 'strategy': strategy}
+        if strategy != 'stream':
+            # Bentuk kanonik yang dipakai sebagai key query_cache dan untuk Bloom filter shard
+            plan['tree'] = canonicalize_tree(postfix_to_tree(postfix))
+        if self.shards:
+            tree = postfix_to_tree(postfix)
+            str_to_id = self.term_id_map.str_to_id
+            plan['shards'] = []
+            result = []
+            for shard in self.shards:
+                if tree is None or not might_match(tree, lambda term: term in str_to_id and str_to_id[term] in shard.bloom):
+                    plan['shards'].append({'shard': shard.name, 'skipped': True})
+                    continue
+                with InvertedIndexReader(shard.name, self.postings_encoding, path=self.output_path) as reader:
+                    steps, shard_result = self.explain_postfix(postfix, reader)
+                plan['shards'].append({'shard': shard.name, 'skipped': False, 'steps': steps,
+                                       'result_size': len(shard_result)})
+                result.extend(shard_result)
+            # evaluation_order diambil dari shard pertama yang benar-benar dievaluasi
+            evaluated = [shard_plan for shard_plan in plan['shards'] if not shard_plan['skipped']]
+            steps = evaluated[0]['steps'] if evaluated else []
+        else:
+            with self.open_reader() as reader:
+                steps, result = self.explain_postfix(postfix, reader)
+            plan['steps'] = steps
+        plan['evaluation_order'] = [explain_step_label(step) for step in steps]
+        plan['result_size'] = len(result)
+        plan['elapsed_s'] = time.perf_counter() - start
+        return plan, result
+
+    def explain_postfix(self, postfix, reader):
+        """Langkah-langkah explain(...) untuk satu reader; mengembalikan (steps, list of docIDs)"""
+        operators = {'AND': intersect_iter, 'OR': union_iter, 'DIFF': diff_iter}
+        steps = []
+        stack = []   # (nomor langkah, postings list, sub-expression tree)
+        for token in postfix:
+            step = {'id': len(steps) + 1}
+            start = time.perf_counter()
+            if token in operators:
+                (id2, operand2, tree2), (id1, operand1, tree1) = stack.pop(), stack.pop()
+                postings_list = list(operators[token](iter(operand1), iter(operand2)))
+                tree = (token, tree1, tree2)
+                step.update({'kind': 'operator', 'operator': token, 'inputs': [id1, id2],
+                             'input_sizes': [len(operand1), len(operand2)]})
+                if self.query_cache is not None:
+                    step['query_cache_hit'] = canonicalize_tree(tree) in self.query_cache.entries
+            else:
+                tree = token
+                step.update({'kind': 'operand', 'token': token, 'term_id': None, 'df': 0,
+                             'bytes_read': 0, 'decode_s': 0.0, 'postings_cache_hit': False})
+                postings_list = []
+                term_id = self.term_id_map[token] if token in self.term_id_map.str_to_id else None
+                if term_id is not None and term_id in reader.postings_dict:
+                    position, df, length_in_bytes = reader.postings_dict[term_id]
+                    step.update({'term_id': term_id, 'df': df})
+                    if reader.postings_cache is not None and term_id in reader.postings_cache:
+                        step['postings_cache_hit'] = True
+                        postings_list = reader.get_postings_list(term_id)
+                    else:
+                        encoded_postings_list = reader.read_encoded(position, length_in_bytes)
+                        decode_start = time.perf_counter()
+                        postings_list = list(reader.encoding_method.decode_iter(encoded_postings_list))
+                        step.update({'bytes_read': length_in_bytes,
+                                     'decode_s': time.perf_counter() - decode_start})
+            step['output_size'] = len(postings_list)
+            step['elapsed_s'] = time.perf_counter() - start
+            steps.append(step)
+            stack.append((step['id'], postings_list, tree))
+        return steps, (stack.pop()[1] if stack else [])
+
+    def query_postfix(self, query, did_you_mean = False):
+        """Parse query menjadi postfix dari term yang sudah di-stem (dan dikoreksi jika did_you_mean)"""
+        # Stemmer baru untuk setiap query: Porter2Stemmer menyimpan state di antara
+        # pemanggilan stem(), sehingga stemmer yang dipakai ulang membuat hasil
+        # query bergantung pada query sebelumnya
+        en_stopwords, config = self.analyzer_resources()
+        qp = QueryParser(query, make_stemmer(config), stopwords=en_stopwords)
         if not qp.is_valid():
             raise ValueError("Invalid query syntax.")
         postfix = qp.infix_to_postfix()
+        if did_you_mean:
+            postfix = [token if token in ['AND', 'OR', 'DIFF'] or token in self.term_id_map.str_to_id
+                       else self.get_spelling_corrector().correct(token) or token
+                       for token in postfix]
+        return postfix
+
+    def evaluate_postfix(self, postfix, reader):
+        """
+        Evaluasi query dalam bentuk postfix dengan stack. Isi stack adalah
+        iterator: operand dibaca dengan reader.postings_cursor(...) dan operator
+        menggunakan versi streaming (intersect_iter, union_iter, diff_iter),
+        sehingga hanya hasil akhir yang dibentuk menjadi list.
+        """
         stack = []
-        # Open the merged index for operand retrieval
-        with InvertedIndexReader(self.index_name, self.postings_encoding, path=self.output_path) as reader:
-            for token in postfix:
-                if token in ['AND', 'OR', 'DIFF']:
-                    operand2 = stack.pop()
-                    operand1 = stack.pop()
-                    if token == 'AND':
-                        result = sort_intersect_list(operand1, operand2)
-                    elif token == 'OR':
-                        result = sort_union_list(operand1, operand2)
-                    elif token == 'DIFF':
-                        result = sort_diff_list(operand1, operand2)
-                    stack.append(result)
-                else:
-                    # For operand tokens, check if token exists in term_id_map.
-                    if token in self.term_id_map.str_to_id:
-                        term_id = self.term_id_map[token]
-                        postings = reader.get_postings_list(term_id)
-                    else:
-                        postings = []
-                    stack.append(postings)
-            if stack:
-                final_postings = stack.pop()
+        for token in postfix:
+            if token in ['AND', 'OR', 'DIFF']:
+                operand2 = stack.pop()
+                operand1 = stack.pop()
+                if token == 'AND':
+                    result = intersect_iter(operand1, operand2)
+                elif token == 'OR':
+                    result = union_iter(operand1, operand2)
+                elif token == 'DIFF':
+                    result = diff_iter(operand1, operand2)
+                stack.append(result)
+            elif token in self.term_id_map.str_to_id:
+                stack.append(reader.postings_cursor(self.term_id_map[token]))
             else:
-                final_postings = []
-        # Map docIDs to document names using doc_id_map
-        result_docs = [self.doc_id_map[doc_id] for doc_id in final_postings]
-        return result_docs
+                stack.append(iter(()))
+        if stack:
+            return list(stack.pop())
+        return []
+
+    def operand_postings(self, token, reader):
+        """Postings list dari operand (term yang sudah di-stem), [] jika tidak ada di lexicon"""
+        # For operand tokens, check if token exists in term_id_map.
+        if token in self.term_id_map.str_to_id:
+            return reader.get_postings_list(self.term_id_map[token])
+        return []
+
+    def evaluate_tree(self, tree, reader):
+        """
+        Evaluasi expression tree kanonik dengan query_cache. Hasil setiap node
+        operator dicari dulu di cache; jika tidak ada, dihitung dari anak-anaknya
+        lalu disimpan. Operand n-ary AND di-intersect mulai dari postings list
+        terpendek dan berhenti begitu hasilnya kosong.
+        """
+        if isinstance(tree, str):
+            return self.operand_postings(tree, reader)
+        result = self.query_cache.get(tree)
+        if result is not None:
+            return result
+        operator, children = tree[0], tree[1:]
+        if operator == 'DIFF':
+            result = sort_diff_list(self.evaluate_tree(children[0], reader),
+                                    self.evaluate_tree(children[1], reader))
+        elif operator == 'AND':
+            operands = sorted((self.evaluate_tree(child, reader) for child in children), key=len)
+            result = operands[0]
+            for operand in operands[1:]:
+                if not result:
+                    break
+                result = sort_intersect_list(result, operand)
+        else:
+            result = []
+            for child in children:
+                result = sort_union_list(result, self.evaluate_tree(child, reader))
+        self.query_cache.put(tree, result)
+        return result
+
+    def build_autocomplete(self, query_log = None):
+        """
+        Membangun (ulang) query auto-completion dari lexicon index, dengan
+        bobot document frequency setiap term dan, jika diberikan, frekuensi
+        query di query_log (iterable of query strings).
+        """
+        self.qac = build_autocomplete(self.index_name, self.postings_encoding, self.output_path,
+                                      self.term_id_map, query_log, source_indices=self.source_indices())
+        return self.qac
+
+    def complete(self, prefix, k = 10):
+        """
+        Kembalikan k completion terbaik untuk prefix yang sedang diketik user,
+        sebagai list (completion, bobot).
+        """
+        if self.qac is None:
+            self.qac = QueryAutocomplete.load(self.index_name, self.output_path)
+        return self.qac.complete(prefix, k)
+
+    def build_spelling_corrector(self):
+        """
+        Membangun (ulang) spelling corrector dari lexicon index, beserta bentuk
+        asli setiap term yang dihitung saat indexing (tanpa indexing, bentuk
+        asli dari .spell sebelumnya dipakai ulang)
+        """
+        surface = surface_forms(self.surface_counts) if self.surface_counts else None
+        self.speller = build_spelling_corrector(self.index_name, self.postings_encoding, self.output_path,
+                                                self.term_id_map, source_indices=self.source_indices(),
+                                                surface=surface)
+        return self.speller
+
+    def get_spelling_corrector(self):
+        if self.speller is None:
+            self.speller = SpellingCorrector.load(self.index_name, self.output_path)
+        return self.speller
+
+    def did_you_mean(self, query):
+        """
+        Saran query "did you mean": setiap operand yang (setelah stemming) tidak
+        ada di lexicon diganti dengan kandidat koreksi terbaik, yaitu term dengan
+        edit distance <= 2 terkecil dan df terbesar. Yang ditampilkan adalah
+        bentuk asli kandidat yang paling sering muncul di koleksi (misal
+        'gravity'), bukan stem-nya ('graviti').
+
+        Returns
+        -------
+        str atau None
+            query hasil koreksi, atau None jika tidak ada operand yang dikoreksi
+        """
+        self.load()
+        en_stopwords, config = self.analyzer_resources()
+        qp = QueryParser(query, make_stemmer(config), stopwords=en_stopwords)
+        corrected = []
+        changed = False
+        for raw_token, token in zip(qp.token_list, qp.token_preprocessed):
+            if token not in ['AND', 'OR', 'DIFF', '(', ')'] and token not in self.term_id_map.str_to_id:
+                speller = self.get_spelling_corrector()
+                correction = speller.correct(token)
+                if correction is not None:
+                    raw_token = speller.surface_form(correction)
+                    changed = True
+            corrected.append(raw_token)
+        if not changed:
+            return None
+        return ' '.join(corrected).replace('( ', '(').replace(' )', ')')
+
+    def retrieve_bm25(self, query, k = 10, method = 'bmw'):
+        """
+        Ranked retrieval top-k dengan BM25 untuk query bebas (disjunctive,
+        semua term query di-OR-kan). Index harus dibangun dengan with_tf=True.
+
+        Parameters
+        ----------
+        query: str
+            Query bebas, diproses dengan analyze(...) seperti dokumen
+        k: int
+            Banyaknya dokumen yang dikembalikan
+        method: str
+            'bmw' (Block-Max WAND), 'wand', atau 'exhaustive'. Ketiganya
+            mengembalikan top-k yang identik; bedanya hanya di banyaknya
+            postings yang di-score.
+
+        Returns
+        -------
+        Tuple[List[Tuple[float, str]], Dict]
+            list (skor, nama dokumen) terurut dari skor tertinggi, dan statistik
+            postings yang di-score vs. di-skip
+        """
+        self.load()
+        en_stopwords, config = self.analyzer_resources()
+        terms = self.analyze(query, make_stemmer(config), en_stopwords)
+        term_ids = [self.term_id_map[term] for term in terms if term in self.term_id_map.str_to_id]
+
+        score_index = ScoreIndex.load(self.index_name, self.output_path)
+        if metrics.enabled:
+            metrics.count('query.bm25')
+        with self.open_reader() as reader, metrics.timer('query.bm25'):
+            top_k, stats = WANDRetriever(reader, score_index).retrieve(term_ids, k, method)
+        return [(score, self.doc_id_map[doc_id]) for score, doc_id in top_k], stats
 
 if __name__ == "__main__":
-    pass
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as output_path:
+        index = BSBIIndex(None, output_path, VBEPostings)
+        postfix = index.query_postfix('signal AND theory')
+        index.query_postfix('energy OR quantum')
+        assert index.query_postfix('signal AND theory') == postfix, "hasil query tidak boleh bergantung pada query sebelumnya"
+
+    # Saran did_you_mean memakai bentuk asli yang paling sering muncul, bukan stem-nya
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        collection = os.path.join(tmp_dir, 'collection')
+        for block in ['0', '1']:
+            os.makedirs(os.path.join(collection, block))
+            for i in range(3):
+                with open(os.path.join(collection, block, 'doc{}.txt'.format(i)), 'w') as f:
+                    f.write('quantum gravity waves and gravity {}'.format('gravities' if i == 0 else 'signal'))
+        for pipelined, analyze_workers in [(False, 1), (True, 1), (True, 2)]:
+            output_path = os.path.join(tmp_dir, 'index_{}_{}'.format(pipelined, analyze_workers))
+            os.makedirs(output_path)
+            BSBIIndex(collection, output_path, VBEPostings, pipelined=pipelined,
+                      analyze_workers=analyze_workers).start_indexing()
+            index = BSBIIndex(None, output_path, VBEPostings)
+            assert index.did_you_mean('quantm AND gravty') == 'quantum AND gravity', "saran did_you_mean harus bentuk asli"
+            assert index.did_you_mean('(wavs OR signal)') == '(waves OR signal)', "saran did_you_mean harus bentuk asli"
+            assert len(index.boolean_retrieve('quantm AND gravty', did_you_mean=True)) == 6, "query terkoreksi salah"
+            index.build_spelling_corrector()
+            assert BSBIIndex(None, output_path, VBEPostings).did_you_mean('gravty') == 'gravity', \
+                "membangun ulang spelling corrector tidak boleh menghilangkan bentuk asli"
+            index.close()
+
     # BSBI_instance = BSBIIndex(data_path = 'arxiv_collections', \
     #                           postings_encoding = VBEPostings, \
     #                           output_path = 'index_vb')
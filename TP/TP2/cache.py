@@ -0,0 +1,283 @@
+import array
+import heapq
+from collections import OrderedDict
+
+from compression import VBEPostings
+
+class QueryResultCache:
+    """
+    Cache hasil boolean query dengan granularitas sub-expression. Key-nya
+    adalah node expression tree yang sudah dikanonisasi (lihat
+    QueryParser.expression_tree), sehingga sub-expression yang sama, misal
+    (quantum OR continuum), bisa dipakai ulang oleh query lain yang
+    mengandungnya.
+
+    Hasil (sorted list of docIDs) disimpan dalam bentuk ter-encode (default
+    VBEPostings, gap-based) supaya kompak. Eviction menggunakan LRU dengan
+    batas total ukuran dalam byte. Setiap entri berlaku untuk satu generasi
+    index; begitu generasi index berubah (index dibangun ulang), seluruh isi
+    cache dibuang.
+
+    Attributes
+    ----------
+    max_bytes (int): batas total ukuran entri di cache
+    generation: generasi index yang isinya sedang di-cache
+    hits, misses, evictions, invalidations (int): counter statistik
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024, postings_encoding=VBEPostings):
+        self.max_bytes = max_bytes
+        self.postings_encoding = postings_encoding
+        self.generation = None
+        self.entries = OrderedDict()   # key -> encoded postings list
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def entry_size(key, encoded_postings_list):
+        # Perkiraan kasar ukuran key ditambah ukuran postings yang ter-encode
+        return len(repr(key)) + len(encoded_postings_list)
+
+    def set_generation(self, generation):
+        """Kosongkan cache jika generasi index berubah"""
+        if generation != self.generation:
+            if self.entries:
+                self.invalidations += 1
+            self.clear()
+            self.generation = generation
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes_used = 0
+
+    def get(self, key):
+        """Kembalikan postings list untuk key, atau None jika tidak ada di cache"""
+        encoded_postings_list = self.entries.get(key)
+        if encoded_postings_list is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return self.postings_encoding.decode(encoded_postings_list)
+
+    def put(self, key, postings_list):
+        encoded_postings_list = self.postings_encoding.encode(postings_list) if postings_list else b''
+        size = self.entry_size(key, encoded_postings_list)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.bytes_used -= self.entry_size(key, self.entries.pop(key))
+        self.entries[key] = encoded_postings_list
+        self.bytes_used += size
+        while self.bytes_used > self.max_bytes:
+            old_key, old_encoded = self.entries.popitem(last=False)
+            self.bytes_used -= self.entry_size(old_key, old_encoded)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self.entries), 'bytes': self.bytes_used,
+                'evictions': self.evictions, 'invalidations': self.invalidations}
+
+
+class PostingsCache:
+    """
+    Cache postings list yang sudah di-decode, dipakai oleh InvertedIndexReader
+    (lihat parameter postings_cache). Untuk EliasGammaPostings dan
+    Simple8bPostings, decode jauh lebih mahal daripada membaca byte-nya dari
+    disk, sehingga term populer yang di-decode berulang kali sebaiknya
+    disimpan dalam bentuk sudah ter-decode.
+
+    Postings list disimpan sebagai array('I') (4 byte per docID, bukan list of
+    int Python) dengan batas total ukuran max_bytes. Key-nya termID, sehingga
+    satu cache hanya boleh dipakai untuk satu index; generasi index dicatat
+    seperti di QueryResultCache.
+
+    Kebijakan admission/eviction:
+        - min_df: postings list dengan df < min_df tidak pernah di-cache
+          (murah untuk di-decode ulang)
+        - 'lru': setiap postings list masuk cache, yang paling lama tidak
+          dipakai di-evict
+        - 'lfu': frekuensi akses setiap term dihitung (termasuk saat miss);
+          yang di-evict adalah term dengan frekuensi terkecil, dan term baru
+          hanya masuk jika frekuensinya tidak lebih kecil dari calon korbannya
+
+    Attributes
+    ----------
+    hits, misses, evictions, rejected (int): counter statistik
+    decode_seconds_saved (float): total waktu decode yang dihemat oleh hit
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024, policy='lru', min_df=0):
+        if policy not in ('lru', 'lfu'):
+            raise ValueError("policy harus 'lru' atau 'lfu'")
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.min_df = min_df
+        self.generation = None
+        self.entries = OrderedDict()   # termID -> (array('I'), waktu decode)
+        self.bytes_used = 0
+        self.frequency = {}            # termID -> banyaknya akses (LFU)
+        self.heap = []                 # (frekuensi, termID), entri lama dibuang secara lazy
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0
+        self.decode_seconds_saved = 0.0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, term):
+        return term in self.entries
+
+    def set_generation(self, generation):
+        """Kosongkan cache jika generasi index berubah"""
+        if generation != self.generation:
+            self.clear()
+            self.generation = generation
+
+    def clear(self):
+        self.entries.clear()
+        self.frequency.clear()
+        self.heap = []
+        self.bytes_used = 0
+
+    def get(self, term):
+        """Kembalikan postings list (list of docIDs) untuk term, atau None jika tidak ada di cache"""
+        if self.policy == 'lfu':
+            self.__touch(term)
+        entry = self.entries.get(term)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.decode_seconds_saved += entry[1]
+        if self.policy == 'lru':
+            self.entries.move_to_end(term)
+        return entry[0].tolist()
+
+    def put(self, term, postings_list, decode_seconds=0.0, force=False):
+        """
+        Simpan postings list hasil decode jika lolos kebijakan admission.
+        force=True melewati min_df dan perbandingan frekuensi LFU (untuk warm-up).
+
+        Returns
+        -------
+        bool
+            True jika postings list masuk ke cache
+        """
+        size = len(postings_list) * 4
+        if size > self.max_bytes or (not force and len(postings_list) < self.min_df):
+            self.rejected += 1
+            return False
+        if term in self.entries:
+            self.bytes_used -= len(self.entries.pop(term)[0]) * 4
+        while self.bytes_used + size > self.max_bytes:
+            victim = self.__victim()
+            if (self.policy == 'lfu' and not force and
+                    self.frequency.get(victim, 0) > self.frequency.get(term, 0)):
+                self.rejected += 1
+                return False
+            self.bytes_used -= len(self.entries.pop(victim)[0]) * 4
+            self.evictions += 1
+        self.entries[term] = (array.array('I', postings_list), decode_seconds)
+        self.bytes_used += size
+        if self.policy == 'lfu':
+            heapq.heappush(self.heap, (self.frequency.get(term, 0), term))
+        return True
+
+    def __touch(self, term):
+        count = self.frequency.get(term, 0) + 1
+        self.frequency[term] = count
+        if term in self.entries:
+            heapq.heappush(self.heap, (count, term))
+            if len(self.heap) > 4 * len(self.entries) + 64:
+                self.heap = [(self.frequency[t], t) for t in self.entries]
+                heapq.heapify(self.heap)
+
+    def __victim(self):
+        """Term yang di-evict berikutnya (tanpa menghapusnya)"""
+        if self.policy == 'lru':
+            return next(iter(self.entries))
+        # Entri di heap yang sudah tidak sesuai (term sudah di-evict atau
+        # frekuensinya sudah naik) dibuang di sini
+        while True:
+            count, term = self.heap[0]
+            if term in self.entries and self.frequency.get(term, 0) == count:
+                return term
+            heapq.heappop(self.heap)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self.entries), 'bytes': self.bytes_used,
+                'evictions': self.evictions, 'rejected': self.rejected,
+                'decode_seconds_saved': self.decode_seconds_saved}
+
+
+if __name__ == '__main__':
+
+    cache = QueryResultCache(max_bytes=100)
+    cache.set_generation(1)
+    key_a = ('OR', 'continuum', 'quantum')
+    key_b = ('AND', 'cosmolog', ('OR', 'continuum', 'quantum'))
+    assert cache.get(key_a) is None, "cache seharusnya kosong"
+    cache.put(key_a, [3, 5, 80, 1000])
+    cache.put(key_b, [])
+    assert cache.get(key_a) == [3, 5, 80, 1000], "isi cache salah"
+    assert cache.get(key_b) == [], "isi cache salah"
+    assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 1, "statistik salah"
+    assert cache.bytes_used == sum(QueryResultCache.entry_size(k, v) for k, v in cache.entries.items()), "ukuran cache salah"
+
+    # key_a paling lama tidak dipakai, sehingga di-evict duluan
+    cache.get(key_b)
+    cache.put(('OR', 'a', 'b'), list(range(1, 31)))
+    assert key_a not in cache.entries and key_b in cache.entries, "LRU eviction salah"
+    assert cache.bytes_used <= cache.max_bytes, "batas byte dilanggar"
+
+    cache.put(('OR', 'x', 'y'), list(range(1, 1000)))
+    assert ('OR', 'x', 'y') not in cache.entries, "entri yang lebih besar dari budget tidak boleh disimpan"
+
+    cache.set_generation(1)
+    assert len(cache) > 0, "generasi sama tidak boleh mengosongkan cache"
+    cache.set_generation(2)
+    assert len(cache) == 0 and cache.bytes_used == 0, "cache harus kosong setelah generasi berubah"
+
+
+    postings_cache = PostingsCache(max_bytes=32, policy='lru')
+    assert postings_cache.get(1) is None, "cache seharusnya kosong"
+    assert postings_cache.put(1, [1, 2, 3], 0.5)
+    assert postings_cache.put(2, [4, 5, 6], 0.5)
+    assert isinstance(postings_cache.entries[1][0], array.array), "postings harus disimpan sebagai array"
+    assert postings_cache.get(1) == [1, 2, 3], "isi cache salah"
+    assert postings_cache.put(3, [7, 8, 9, 10])
+    assert 2 not in postings_cache and 1 in postings_cache, "LRU eviction salah"
+    assert postings_cache.bytes_used == 28 and postings_cache.decode_seconds_saved == 0.5, "statistik salah"
+    assert not postings_cache.put(4, list(range(11))), "postings lebih besar dari budget tidak boleh masuk"
+
+    postings_cache = PostingsCache(max_bytes=1000, min_df=3)
+    assert not postings_cache.put(1, [1, 2]) and postings_cache.put(2, [1, 2, 3]), "admission min_df salah"
+    assert postings_cache.put(1, [1, 2], force=True), "warm-up harus melewati min_df"
+
+    postings_cache = PostingsCache(max_bytes=24, policy='lfu')
+    for term, times in [(1, 3), (2, 1), (3, 2)]:
+        for _ in range(times):
+            if postings_cache.get(term) is None:
+                postings_cache.put(term, [term, term + 10])
+    assert set(postings_cache.entries) == {1, 2, 3}
+    postings_cache.get(4)
+    assert postings_cache.put(4, [4, 14]) and 2 not in postings_cache, "LFU harus meng-evict term dengan frekuensi terkecil"
+    postings_cache.get(4)
+    postings_cache.get(5)
+    assert not postings_cache.put(5, [5, 15]), "term baru yang jarang tidak boleh meng-evict term yang sering dipakai"
+    assert set(postings_cache.entries) == {1, 3, 4} and postings_cache.rejected == 1
+    postings_cache.set_generation(7)
+    assert len(postings_cache) == 0 and postings_cache.bytes_used == 0, "cache harus kosong setelah generasi berubah"
@@ -1,5 +1,43 @@
 import array
 
+from metrics import metrics
+
+# Banyaknya postings yang di-decode/di-encode sekaligus oleh decode_iter(...)
+# dan encoder() di setiap codec. Memori yang dipakai saat streaming
+# sebanding dengan CHUNK_SIZE, bukan dengan panjang postings list.
+CHUNK_SIZE = 1024
+
+class StandardEncoder:
+    """Encoder incremental untuk StandardPostings: setiap chunk langsung menjadi array('L')"""
+    def encode(self, chunk):
+        return array.array('L', chunk).tobytes()
+
+    def finish(self):
+        return b''
+
+class GapChunkEncoder:
+    """
+    Encoder incremental untuk codec gap-based yang setiap gap-nya di-encode
+    secara independen (VBEPostings, Simple8bPostings): gap dihitung relatif
+    terhadap posting terakhir chunk sebelumnya, lalu encode_gaps(gaps)
+    menghasilkan bytes untuk chunk tersebut.
+    """
+    def __init__(self, encode_gaps):
+        self.encode_gaps = encode_gaps
+        self.prev = 0
+
+    def encode(self, chunk):
+        gaps = []
+        prev = self.prev
+        for posting in chunk:
+            gaps.append(posting - prev)
+            prev = posting
+        self.prev = prev
+        return self.encode_gaps(gaps)
+
+    def finish(self):
+        return b''
+
 class StandardPostings:
     """ 
     Class dengan static methods, untuk mengubah representasi postings list
@@ -52,6 +90,29 @@ class StandardPostings:
         decoded_postings_list.frombytes(encoded_postings_list)
         return decoded_postings_list.tolist()
 
+    @staticmethod
+    def decode_iter(encoded_postings_list, chunk_size=CHUNK_SIZE):
+        """
+        Versi incremental dari decode(...): generator yang menghasilkan docID
+        satu per satu, dengan hanya chunk_size docID yang di-decode sekaligus.
+        encoded_postings_list boleh berupa bytes atau memoryview (misal dari
+        index file yang di-mmap).
+        """
+        chunk_bytes = chunk_size * array.array('L').itemsize
+        for start in range(0, len(encoded_postings_list), chunk_bytes):
+            chunk = array.array('L')
+            chunk.frombytes(encoded_postings_list[start:start + chunk_bytes])
+            yield from chunk
+
+    @staticmethod
+    def encoder():
+        """
+        Encoder incremental: encode(chunk) mengembalikan bytes untuk chunk
+        postings berikutnya, finish() mengembalikan sisa bytes di akhir.
+        Gabungan semua bytes-nya bisa di-decode dengan decode(...).
+        """
+        return StandardEncoder()
+
 
 class VBEPostings:
     """ 
@@ -112,8 +173,6 @@ class VBEPostings:
         # Mengubah encoded_postings_list menjadi bytearray
         encoded_postings_list = bytes(encoded_postings_list)
 
-        assert VBEPostings.decode(encoded_postings_list) == postings_list, "Encoding and decoding mismatch"
-
         return encoded_postings_list
     
     @staticmethod
@@ -190,6 +249,28 @@ class VBEPostings:
                 n = 0
         return numbers
 
+    @staticmethod
+    def decode_iter(encoded_postings_list):
+        """
+        Versi incremental dari decode(...): generator yang menghasilkan docID
+        satu per satu langsung dari bytestream (bytes atau memoryview), tanpa
+        membentuk list gap maupun list docID.
+        """
+        n = 0
+        prev = 0
+        for byte in encoded_postings_list:
+            if byte < 128:
+                n = 128 * n + byte
+            else:
+                prev += 128 * n + byte - 128
+                yield prev
+                n = 0
+
+    @staticmethod
+    def encoder():
+        """Encoder incremental, lihat StandardPostings.encoder()"""
+        return GapChunkEncoder(lambda gaps: bytes(VBEPostings.vb_encode(gaps)))
+
 class Simple8bPostings:
     """
     reference: https://github.com/jwilder/encoding/blob/master/simple8b/encoding.go#L32
@@ -586,8 +667,6 @@ class Simple8bPostings:
         packed_list = cls.encode_all(gap_list)
         encoded = cls._packed_to_bytes(packed_list)
 
-        assert cls.decode(encoded) == values, "Encoding and decoding mismatch"
-
         return encoded
 
     @classmethod
@@ -599,9 +678,29 @@ class Simple8bPostings:
         gap_list = cls.decode_all(packed_list)
         return cls.to_postings_list(gap_list)
 
+    @classmethod
+    def decode_iter(cls, data):
+        """
+        Versi incremental dari decode(...): generator yang membaca satu word
+        64-bit sekaligus (maksimum 240 postings) dari data (bytes atau
+        memoryview).
+        """
+        if len(data) % 8 != 0:
+            raise ValueError("Invalid byte length")
+        prev = 0
+        for i in range(0, len(data), 8):
+            for gap in cls._decode_one(int.from_bytes(data[i:i+8], 'big')):
+                prev += gap
+                yield prev
+
+    @classmethod
+    def encoder(cls):
+        """Encoder incremental, lihat StandardPostings.encoder()"""
+        return GapChunkEncoder(lambda gaps: cls._packed_to_bytes(cls.encode_all(gaps)))
+
 import array
 import bitarray as ba
-from bitarray.util import int2ba
+from bitarray.util import ba2int, int2ba
 
 class EliasGammaPostings:
     @staticmethod
@@ -662,9 +761,6 @@ class EliasGammaPostings:
             
         encoded = EliasGammaPostings.compress_to_gamma(gaps)
 
-        decoded =  EliasGammaPostings.decode(encoded)
-        assert decoded == doc_ids, "Encoding and decoding mismatch"
-
         return encoded
 
     @staticmethod
@@ -678,6 +774,133 @@ class EliasGammaPostings:
             
         return gaps
 
+    @staticmethod
+    def decode_iter(compressed_bytes, chunk_size=CHUNK_SIZE):
+        """
+        Versi incremental dari decode(...). Bytes dibaca per chunk_size byte;
+        kode gamma yang terpotong di batas chunk disimpan sampai chunk
+        berikutnya dibaca. Bit 0 di akhir stream adalah padding.
+        """
+        bits = ba.bitarray(endian="big")
+        prev = 0
+        for start in range(0, len(compressed_bytes), chunk_size):
+            bits.frombytes(bytes(compressed_bytes[start:start + chunk_size]))
+            position = 0
+            while True:
+                try:
+                    one = bits.index(1, position)
+                except ValueError:
+                    break
+                end = 2 * one - position + 1
+                if end > len(bits):
+                    break
+                prev += ba2int(bits[one:end])
+                yield prev
+                position = end
+            del bits[:position]
+
+    @staticmethod
+    def encoder():
+        """Encoder incremental, lihat StandardPostings.encoder()"""
+        return EliasGammaEncoder()
+
+class EliasGammaEncoder:
+    """
+    Encoder incremental untuk EliasGammaPostings. Kode gamma tidak selalu
+    berakhir di batas byte, sehingga sisa bit setiap chunk disimpan dan
+    disambung dengan chunk berikutnya; padding hanya ditambahkan di finish().
+    """
+    def __init__(self):
+        self.prev = 0
+        self.bits = ba.bitarray(endian="big")
+
+    def encode(self, chunk):
+        for posting in chunk:
+            gap = posting - self.prev
+            assert gap > 0
+            self.prev = posting
+            self.bits.extend(int2ba(gap, length=2 * gap.bit_length() - 1, endian="big"))
+        n_full_bytes = len(self.bits) // 8
+        encoded = self.bits[:8 * n_full_bytes].tobytes()
+        del self.bits[:8 * n_full_bytes]
+        return encoded
+
+    def finish(self):
+        encoded = self.bits.tobytes()
+        self.bits = ba.bitarray(endian="big")
+        return encoded
+
+class InstrumentedEncoder:
+    """Pembungkus encoder() yang mencatat postings dan byte hasil encode ke metrics"""
+    def __init__(self, encoder):
+        self.encoder = encoder
+
+    def encode(self, chunk):
+        with metrics.timer('codec.encode'):
+            encoded = self.encoder.encode(chunk)
+        metrics.count('codec.postings_encoded', len(chunk))
+        metrics.count('codec.bytes_encoded', len(encoded))
+        return encoded
+
+    def finish(self):
+        encoded = self.encoder.finish()
+        metrics.count('codec.bytes_encoded', len(encoded))
+        return encoded
+
+def instrument_codec(codec):
+    """
+    Bungkus encode, decode, decode_iter, dan encoder() milik codec supaya
+    waktu, banyaknya postings, dan banyaknya byte yang di-encode/di-decode
+    tercatat di metrics. Jika metrics tidak aktif, pembungkusnya langsung
+    memanggil method aslinya.
+    """
+    encode, decode, decode_iter, encoder = codec.encode, codec.decode, codec.decode_iter, codec.encoder
+    def instrumented_encode(postings_list):
+        if not metrics.enabled:
+            return encode(postings_list)
+        with metrics.timer('codec.encode'):
+            encoded_postings_list = encode(postings_list)
+        metrics.count('codec.postings_encoded', len(postings_list))
+        metrics.count('codec.bytes_encoded', len(encoded_postings_list))
+        return encoded_postings_list
+
+    def instrumented_decode(encoded_postings_list):
+        if not metrics.enabled:
+            return decode(encoded_postings_list)
+        with metrics.timer('codec.decode'):
+            postings_list = decode(encoded_postings_list)
+        metrics.count('codec.postings_decoded', len(postings_list))
+        metrics.count('codec.bytes_decoded', len(encoded_postings_list))
+        return postings_list
+
+    def instrumented_decode_iter(encoded_postings_list, *args, **kwargs):
+        if not metrics.enabled:
+            return decode_iter(encoded_postings_list, *args, **kwargs)
+        metrics.count('codec.bytes_decoded', len(encoded_postings_list))
+        return counting_iter(decode_iter(encoded_postings_list, *args, **kwargs), 'codec.postings_decoded')
+
+    def instrumented_encoder():
+        return InstrumentedEncoder(encoder()) if metrics.enabled else encoder()
+
+    codec.encode = staticmethod(instrumented_encode)
+    codec.decode = staticmethod(instrumented_decode)
+    codec.decode_iter = staticmethod(instrumented_decode_iter)
+    codec.encoder = staticmethod(instrumented_encoder)
+    return codec
+
+def counting_iter(iterator, name):
+    n = 0
+    for item in iterator:
+        n += 1
+        yield item
+    metrics.count(name, n)
+
+for codec in (StandardPostings, VBEPostings, Simple8bPostings, EliasGammaPostings):
+    instrument_codec(codec)
+
+# Nama singkat setiap encoding, dipakai oleh command line tools (benchmark.py, server.py)
+ENCODINGS = {'standard': StandardPostings, 'vb': VBEPostings,
+             'simple8b': Simple8bPostings, 'eliasgamma': EliasGammaPostings}
 
 if __name__ == '__main__':
     
@@ -693,3 +916,26 @@ if __name__ == '__main__':
         print("hasil decoding: ", decoded_posting_list)
         assert decoded_posting_list == postings_list, "hasil decoding tidak sama dengan postings original"
         print()
+
+    # decode_iter dan encoder() harus konsisten dengan decode dan encode,
+    # termasuk ketika chunk terpotong di tengah word/kode
+    long_postings_list = list(range(1, 3001)) + [3000 + 7 * i for i in range(1, 3001)] + [10 ** 6, 10 ** 7]
+    for Postings in [StandardPostings, VBEPostings, Simple8bPostings, EliasGammaPostings]:
+        encoded_postings_list = Postings.encode(long_postings_list)
+        assert list(Postings.decode_iter(encoded_postings_list)) == long_postings_list, "decode_iter salah"
+        assert list(Postings.decode_iter(memoryview(encoded_postings_list))) == long_postings_list, "decode_iter salah"
+        encoder = Postings.encoder()
+        streamed = b''.join(encoder.encode(long_postings_list[i:i + 333])
+                            for i in range(0, len(long_postings_list), 333)) + encoder.finish()
+        assert Postings.decode(streamed) == long_postings_list, "encoder incremental salah"
+
+    import metrics as instrumentation
+    instrumentation.enable()
+    encoded_postings_list = VBEPostings.encode(long_postings_list)
+    assert VBEPostings.decode(encoded_postings_list) == long_postings_list
+    assert list(VBEPostings.decode_iter(encoded_postings_list)) == long_postings_list
+    counters = instrumentation.metrics.snapshot()['counters']
+    assert counters['codec.postings_encoded'] == len(long_postings_list), "counter encode salah"
+    assert counters['codec.postings_decoded'] == 2 * len(long_postings_list), "counter decode salah"
+    assert counters['codec.bytes_decoded'] == 2 * len(encoded_postings_list), "counter byte decode salah"
+    instrumentation.disable()
@@ -0,0 +1,229 @@
+"""
+Evaluasi boolean query secara document-at-a-time (DAAT).
+
+Query postfix dikompilasi menjadi tree operator cursor yang lazy. Setiap
+cursor menunjuk ke satu docID (atribut doc, END_OF_LIST jika sudah habis)
+dan bisa dimajukan dengan next() atau next_geq(doc_id):
+
+    PostingsCursor : postings list yang sudah di-decode (dari postings cache);
+                     next_geq dengan binary search
+    StreamCursor   : postings list yang di-decode incremental dari bytes
+                     ter-encode (reader.postings_cursor)
+    AndCursor      : n-ary; leapfrog dengan next_geq, mulai dari child
+                     dengan cost (perkiraan banyaknya docID) terkecil
+    OrCursor       : n-ary; docID terkecil di antara child-nya
+    DiffCursor     : docID dari include yang tidak ada di exclude; exclude
+                     hanya dimajukan dengan next_geq
+
+DocID ditarik satu per satu dari root, sehingga hasil pertama keluar tanpa
+menunggu seluruh query selesai, memori yang dipakai sebanding dengan ukuran
+tree (bukan panjang postings list atau hasil antara), dan query "N hasil
+pertama" bisa berhenti lebih awal. Child AND dan OR yang bersarang
+diratakan dengan canonicalize_tree.
+"""
+import bisect
+
+from util import canonicalize_tree, postfix_to_tree
+from wand import END_OF_LIST
+
+class PostingsCursor:
+    """Cursor di atas postings list yang sudah berupa list (atau array) docID"""
+    def __init__(self, postings):
+        self.postings = postings
+        self.position = 0
+        self.cost = len(postings)
+        self.doc = postings[0] if postings else END_OF_LIST
+
+    def next(self):
+        self.position += 1
+        self.doc = self.postings[self.position] if self.position < len(self.postings) else END_OF_LIST
+
+    def next_geq(self, doc_id):
+        """Majukan cursor ke posting pertama dengan docID >= doc_id"""
+        if self.doc < doc_id:
+            self.position = bisect.bisect_left(self.postings, doc_id, self.position + 1)
+            self.doc = self.postings[self.position] if self.position < len(self.postings) else END_OF_LIST
+
+class StreamCursor:
+    """
+    Cursor di atas iterator docID yang di-decode incremental. Tanpa akses
+    acak ke bytes ter-encode, next_geq melewati docID satu per satu, tetapi
+    docID yang dilewati tidak diteruskan ke operator di atasnya.
+    """
+    def __init__(self, iterator, cost):
+        self.iterator = iterator
+        self.cost = cost
+        self.doc = next(iterator, END_OF_LIST)
+
+    def next(self):
+        self.doc = next(self.iterator, END_OF_LIST)
+
+    def next_geq(self, doc_id):
+        doc, iterator = self.doc, self.iterator
+        while doc < doc_id:
+            doc = next(iterator, END_OF_LIST)
+        self.doc = doc
+
+class AndCursor:
+    """DocID yang ada di semua children"""
+    def __init__(self, children):
+        self.children = sorted(children, key=lambda child: child.cost)
+        self.cost = self.children[0].cost
+        self.align(max(child.doc for child in self.children))
+
+    def align(self, doc_id):
+        """Leapfrog: majukan semua child ke docID >= doc_id sampai semuanya menunjuk ke docID yang sama"""
+        while doc_id != END_OF_LIST:
+            for child in self.children:
+                child.next_geq(doc_id)
+                if child.doc != doc_id:
+                    doc_id = child.doc
+                    break
+            else:
+                break
+        self.doc = doc_id
+
+    def next(self):
+        lead = self.children[0]
+        lead.next()
+        self.align(lead.doc)
+
+    def next_geq(self, doc_id):
+        if self.doc < doc_id:
+            self.align(doc_id)
+
+class OrCursor:
+    """DocID yang ada di salah satu children"""
+    def __init__(self, children):
+        self.children = children
+        self.cost = sum(child.cost for child in children)
+        self.doc = min(child.doc for child in children)
+
+    def next(self):
+        doc_id, smallest = self.doc, END_OF_LIST
+        for child in self.children:
+            if child.doc == doc_id:
+                child.next()
+            if child.doc < smallest:
+                smallest = child.doc
+        self.doc = smallest
+
+    def next_geq(self, doc_id):
+        if self.doc < doc_id:
+            for child in self.children:
+                child.next_geq(doc_id)
+            self.doc = min(child.doc for child in self.children)
+
+class DiffCursor:
+    """DocID yang ada di include tetapi tidak ada di exclude"""
+    def __init__(self, include, exclude):
+        self.include = include
+        self.exclude = exclude
+        self.cost = include.cost
+        self.skip_excluded()
+
+    def skip_excluded(self):
+        doc_id = self.include.doc
+        while doc_id != END_OF_LIST:
+            self.exclude.next_geq(doc_id)
+            if self.exclude.doc != doc_id:
+                break
+            self.include.next()
+            doc_id = self.include.doc
+        self.doc = doc_id
+
+    def next(self):
+        self.include.next()
+        self.skip_excluded()
+
+    def next_geq(self, doc_id):
+        if self.doc < doc_id:
+            self.include.next_geq(doc_id)
+            self.skip_excluded()
+
+def term_cursor(reader, term_id):
+    """
+    Cursor untuk postings list term_id di reader: PostingsCursor jika
+    postings cache aktif (postings list-nya diambil lewat cache), atau
+    StreamCursor yang men-decode dari bytes ter-encode.
+    """
+    if term_id is None or term_id not in reader.postings_dict:
+        return PostingsCursor([])
+    if reader.postings_cache is not None:
+        return PostingsCursor(reader.get_postings_list(term_id))
+    return StreamCursor(reader.postings_cursor(term_id), reader.postings_dict[term_id][1])
+
+def compile_tree(tree, open_term):
+    """Tree operator cursor dari expression tree; open_term(term) membuka cursor untuk operand"""
+    if not isinstance(tree, tuple):
+        return open_term(tree)
+    operator, children = tree[0], [compile_tree(child, open_term) for child in tree[1:]]
+    if operator == 'AND':
+        return AndCursor(children)
+    if operator == 'OR':
+        return OrCursor(children)
+    return DiffCursor(*children)
+
+def compile_postfix(postfix, open_term):
+    """Tree operator cursor dari query postfix (AND dan OR yang bersarang diratakan)"""
+    tree = canonicalize_tree(postfix_to_tree(postfix))
+    if tree is None:
+        return PostingsCursor([])
+    return compile_tree(tree, open_term)
+
+def iter_docs(cursor):
+    """Iterator docID dari root cursor, satu per satu sesuai urutan docID"""
+    while cursor.doc != END_OF_LIST:
+        yield cursor.doc
+        cursor.next()
+
+
+if __name__ == '__main__':
+
+    import itertools
+    import random
+    from util import diff_iter, intersect_iter, union_iter
+
+    lists = {'a': [1, 3, 5, 7, 9, 11], 'b': [2, 3, 5, 8, 11], 'c': [5, 6, 7, 11, 12], 'd': []}
+
+    def open_list(term):
+        return PostingsCursor(lists.get(term, []))
+
+    def open_stream(term):
+        return StreamCursor(iter(lists.get(term, [])), len(lists.get(term, [])))
+
+    for open_term in (open_list, open_stream):
+        assert list(iter_docs(compile_postfix(['a', 'b', 'AND'], open_term))) == [3, 5, 11], "AND salah"
+        assert list(iter_docs(compile_postfix(['a', 'b', 'OR'], open_term))) == [1, 2, 3, 5, 7, 8, 9, 11], "OR salah"
+        assert list(iter_docs(compile_postfix(['a', 'b', 'DIFF'], open_term))) == [1, 7, 9], "DIFF salah"
+        assert list(iter_docs(compile_postfix(['a', 'b', 'AND', 'c', 'AND'], open_term))) == [5, 11], "AND n-ary salah"
+        assert list(iter_docs(compile_postfix(['a', 'd', 'AND'], open_term))) == [], "AND dengan list kosong salah"
+        assert list(iter_docs(compile_postfix(['a', 'x', 'OR'], open_term))) == lists['a'], "OR dengan term tidak dikenal salah"
+        assert list(iter_docs(compile_postfix([], open_term))) == [], "query kosong salah"
+
+    cursor = compile_postfix(['a', 'b', 'OR', 'c', 'AND'], open_stream)
+    assert cursor.doc == 5, "hasil pertama harus tersedia tanpa evaluasi penuh"
+    cursor.next_geq(8)
+    assert cursor.doc == 11, "next_geq salah"
+    cursor.next()
+    assert cursor.doc == END_OF_LIST, "cursor harus habis"
+
+    # Bandingkan dengan evaluasi stack streaming untuk query acak
+    operators = {'AND': intersect_iter, 'OR': union_iter, 'DIFF': diff_iter}
+    rng = random.Random(0)
+    for _ in range(300):
+        lists = {term: sorted(rng.sample(range(1, 60), rng.randint(0, 30))) for term in 'abcde'}
+        postfix = [rng.choice('abcde')]
+        for _ in range(rng.randint(0, 5)):
+            postfix += [rng.choice('abcde'), rng.choice(list(operators))]
+        stack = []
+        for token in postfix:
+            if token in operators:
+                operand2, operand1 = stack.pop(), stack.pop()
+                stack.append(operators[token](operand1, operand2))
+            else:
+                stack.append(iter(lists[token]))
+        expected = list(stack.pop())
+        for open_term in (open_list, open_stream):
+            assert list(iter_docs(compile_postfix(postfix, open_term))) == expected, "DAAT salah untuk {}".format(postfix)
+        assert list(itertools.islice(iter_docs(compile_postfix(postfix, open_stream)), 3)) == expected[:3], "N hasil pertama salah"
@@ -0,0 +1,234 @@
+"""
+Doc table kolumnar, pengganti doc_id_map (IdMap berisi path relatif setiap
+dokumen) yang di-pickle ke docs.dict. Nama dokumen "<block>/<filename>"
+dipecah menjadi direktori block (disimpan sekali di block dictionary) dan
+filename (di-front-code terhadap filename dokumen sebelumnya), sehingga
+awalan yang sama tidak disimpan berulang kali.
+
+Layout (versi 1, semua integer little-endian):
+
+    header     : MAGIC (8 byte) | versi (u32) | n_docs (u32) | n_blocks (u32)
+                 | n_columns (u32) | restart interval (u32) | lebar block id (u32)
+    blocks     : offsets (u32 * (n_blocks + 1)) | blob UTF-8 awalan direktori
+                 (termasuk separator, misal '0/')
+    block ids  : block id setiap docID (u16 atau u32 * n_docs)
+    offsets    : posisi entry filename setiap docID (u32 * (n_docs + 1))
+    filenames  : per entry: panjang awalan yang sama dengan filename
+                 sebelumnya (u8) | sisa filename (UTF-8)
+    columns    : per kolom: panjang nama (u32) | nama | typecode array (1 byte)
+                 | nilai (itemsize * n_docs)
+
+Setiap restart interval docID (dan setiap pergantian block), entry disimpan
+utuh (awalan 0), sehingga nama docID mana pun di-resolve dengan aritmetika
+offset: block id dan posisi entry dibaca langsung, lalu paling banyak
+restart interval - 1 entry sebelumnya di-decode. Doc table bisa berdiri
+sendiri sebagai file docs.table (dibaca lewat mmap) atau menjadi section DOCS
+di segment.
+"""
+import array
+import mmap
+import os
+import struct
+import sys
+
+MAGIC = b'IRDOCTBL'
+VERSION = 1
+RESTART_INTERVAL = 16
+
+HEADER = struct.Struct('<8sIIIIII')
+U32 = struct.Struct('<I')
+
+def doc_table_file_path(path):
+    return os.path.join(path, 'docs.table')
+
+def split_doc_name(name):
+    """(awalan direktori termasuk separator, filename), misal '0/a.txt' -> ('0/', 'a.txt')"""
+    split = max(name.rfind('/'), name.rfind(os.sep)) + 1
+    return name[:split], name[split:]
+
+def doc_table_bytes(doc_names, columns=None, restart_interval=RESTART_INTERVAL):
+    """
+    Serialisasi list nama dokumen (docID = posisi + 1) dan kolom tambahan
+    (dict nama -> array.array sepanjang doc_names) menjadi doc table.
+    """
+    columns = columns or {}
+    blocks = {}
+    block_ids = []
+    offsets = [0]
+    entries = []
+    previous_block, previous = None, b''
+    for i, name in enumerate(doc_names):
+        block, filename = split_doc_name(name)
+        block_id = blocks.setdefault(block, len(blocks))
+        encoded = filename.encode('utf-8')
+        shared = 0
+        if i % restart_interval != 0 and block_id == previous_block:
+            limit = min(len(encoded), len(previous), 255)
+            while shared < limit and encoded[shared] == previous[shared]:
+                shared += 1
+        entry = bytes([shared]) + encoded[shared:]
+        entries.append(entry)
+        offsets.append(offsets[-1] + len(entry))
+        block_ids.append(block_id)
+        previous_block, previous = block_id, encoded
+
+    encoded_blocks = [block.encode('utf-8') for block in blocks]
+    block_offsets = [0]
+    for block in encoded_blocks:
+        block_offsets.append(block_offsets[-1] + len(block))
+    block_id_width = 2 if len(blocks) <= 0xFFFF else 4
+    parts = [HEADER.pack(MAGIC, VERSION, len(doc_names), len(blocks), len(columns), restart_interval, block_id_width),
+             struct.pack('<{}I'.format(len(block_offsets)), *block_offsets), b''.join(encoded_blocks),
+             struct.pack('<{}{}'.format(len(block_ids), 'H' if block_id_width == 2 else 'I'), *block_ids),
+             struct.pack('<{}I'.format(len(offsets)), *offsets), b''.join(entries)]
+    for column_name, values in columns.items():
+        if len(values) != len(doc_names):
+            raise ValueError("kolom {} berisi {} nilai untuk {} dokumen".format(column_name, len(values), len(doc_names)))
+        values = array.array(values.typecode, values)
+        if sys.byteorder != 'little':
+            values.byteswap()
+        encoded_name = column_name.encode('utf-8')
+        parts += [U32.pack(len(encoded_name)), encoded_name, values.typecode.encode('ascii'), values.tobytes()]
+    return b''.join(parts)
+
+class DocColumn:
+    """Kolom per dokumen di doc table, di-index dengan docID (mulai dari 1)"""
+    def __init__(self, buffer, offset, typecode, count):
+        self.buffer = buffer
+        self.offset = offset
+        self.format = struct.Struct('<' + typecode)
+        self.typecode = typecode
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, doc_id):
+        if not 1 <= doc_id <= self.count:
+            raise IndexError(doc_id)
+        return self.format.unpack_from(self.buffer, self.offset + (doc_id - 1) * self.format.size)[0]
+
+    def __iter__(self):
+        for doc_id in range(1, self.count + 1):
+            yield self[doc_id]
+
+class DocTable:
+    """
+    Doc table read-only di atas buffer (mmap atau bytes). Antarmukanya sama
+    seperti IdMap untuk docID ke nama: table[doc_id], len(table), iterasi
+    nama sesuai urutan docID. Kolom tambahan lewat column(nama).
+    """
+    def __init__(self, buffer, offset=0):
+        self.buffer = buffer
+        (magic, version, self.count, n_blocks, n_columns,
+         self.restart_interval, block_id_width) = HEADER.unpack_from(buffer, offset)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("bukan doc table versi {}".format(VERSION))
+        position = offset + HEADER.size
+        block_offsets = struct.unpack_from('<{}I'.format(n_blocks + 1), buffer, position)
+        position += 4 * (n_blocks + 1)
+        self.blocks = [str(buffer[position + start:position + end], 'utf-8')
+                       for start, end in zip(block_offsets, block_offsets[1:])]
+        position += block_offsets[-1]
+        self.block_id_format = struct.Struct('<H' if block_id_width == 2 else '<I')
+        self.block_ids_start = position
+        position += block_id_width * self.count
+        self.offsets_start = position
+        position += 4 * (self.count + 1)
+        self.entries_start = position
+        position += U32.unpack_from(buffer, self.offsets_start + 4 * self.count)[0]
+        self.columns = {}
+        for _ in range(n_columns):
+            (name_length,) = U32.unpack_from(buffer, position)
+            position += U32.size
+            name = str(buffer[position:position + name_length], 'utf-8')
+            position += name_length
+            typecode = chr(buffer[position])
+            position += 1
+            self.columns[name] = DocColumn(buffer, position, typecode, self.count)
+            position += array.array(typecode).itemsize * self.count
+        self.end = position
+
+    def __len__(self):
+        return self.count
+
+    def filename(self, doc_id):
+        """Filename dokumen doc_id (tanpa direktori block)"""
+        if not 1 <= doc_id <= self.count:
+            raise IndexError(doc_id)
+        i = doc_id - 1
+        restart = i - i % self.restart_interval
+        offsets = struct.unpack_from('<{}I'.format(i - restart + 2), self.buffer, self.offsets_start + 4 * restart)
+        base = offsets[0]
+        entries = self.buffer[self.entries_start + base:self.entries_start + offsets[-1]]
+        # Mundur dari entry doc_id: setiap entry sebelumnya hanya menyumbang
+        # bagian awalan yang masih dibutuhkan, berhenti saat awalannya lengkap
+        j = i - restart
+        start = offsets[j] - base
+        need = entries[start]
+        parts = [entries[start + 1:offsets[j + 1] - base]]
+        while need > 0:
+            j -= 1
+            start = offsets[j] - base
+            shared = entries[start]
+            if shared < need:
+                parts.append(entries[start + 1:start + 1 + need - shared])
+                need = shared
+        return str(b''.join(reversed(parts)), 'utf-8')
+
+    def block(self, doc_id):
+        """Awalan direktori block dokumen doc_id"""
+        return self.blocks[self.block_id_format.unpack_from(self.buffer, self.block_ids_start +
+                                                            self.block_id_format.size * (doc_id - 1))[0]]
+
+    def __getitem__(self, doc_id):
+        if isinstance(doc_id, str):
+            raise TypeError("doc table tidak menyimpan index nama -> docID")
+        return self.block(doc_id) + self.filename(doc_id)
+
+    def __iter__(self):
+        for doc_id in range(1, self.count + 1):
+            yield self[doc_id]
+
+    def column(self, name):
+        return self.columns[name]
+
+def write_doc_table(file_path, doc_names, columns=None):
+    """Tulis doc table ke file_path (lewat file sementara yang di-rename)"""
+    with open(file_path + '.tmp', 'wb') as f:
+        f.write(doc_table_bytes(doc_names, columns))
+    os.replace(file_path + '.tmp', file_path)
+
+class DocTableFile(DocTable):
+    """DocTable dari file docs.table yang di-mmap"""
+    def __init__(self, file_path):
+        with open(file_path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        super().__init__(buffer)
+
+    def close(self):
+        self.buffer.close()
+
+
+if __name__ == '__main__':
+
+    import pickle
+    import tempfile
+
+    names = ['0/a.txt', '0/abc.txt', '0/abd.txt', '1/abd.txt', '1/b.txt', 'c.txt', '10/aé.txt'] + \
+            ['2/doc{:04d}.txt'.format(i) for i in range(40)]
+    lengths = array.array('I', range(len(names)))
+    table = DocTable(doc_table_bytes(names, {'length': lengths}))
+    assert list(table) == names and len(table) == len(names), "nama dokumen salah"
+    assert [table[doc_id] for doc_id in range(len(names), 0, -1)] == names[::-1], "akses acak salah"
+    assert table.block(2) == '0/' and table.filename(2) == 'abc.txt' and table.block(6) == '', "block/filename salah"
+    assert list(table.column('length')) == list(lengths) and table.column('length')[3] == 2, "kolom salah"
+    assert len(doc_table_bytes(names)) < len(pickle.dumps((names, {name: i + 1 for i, name in enumerate(names)}))), \
+           "doc table harus lebih kecil dari IdMap yang di-pickle"
+    assert list(DocTable(doc_table_bytes([]))) == [], "doc table kosong salah"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        write_doc_table(doc_table_file_path(tmp_dir), names, {'length': lengths})
+        table = DocTableFile(doc_table_file_path(tmp_dir))
+        assert table[47] == '2/doc0039.txt' and table.column('length')[47] == 46, "doc table dari file salah"
+        table.close()
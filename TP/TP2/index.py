@@ -1,5 +1,62 @@
+import itertools
+import mmap
 import pickle
 import os
+import time
+import zlib
+from collections import deque
+
+from compression import CHUNK_SIZE
+from metrics import metrics
+from segment import Segment, segment_file_path
+
+# Ukuran buffer InvertedIndexWriter sebelum ditulis ke file
+WRITE_BUFFER_SIZE = 8 * 1024 * 1024
+# Banyaknya encode yang boleh menunggu di thread pool InvertedIndexWriter
+MAX_PENDING_ENCODES = 256
+
+def to_cumulative(tf_list):
+    """
+    Mengubah tf list menjadi prefix sum. Karena setiap tf >= 1, hasilnya monoton
+    naik sehingga bisa di-encode dengan gap-based encoding yang sama seperti docIDs.
+    """
+    cumulative = []
+    total = 0
+    for tf in tf_list:
+        total += tf
+        cumulative.append(total)
+    return cumulative
+
+def from_cumulative(cumulative_tf):
+    """Kebalikan dari to_cumulative(...)"""
+    tf_list = []
+    prev = 0
+    for total in cumulative_tf:
+        tf_list.append(total - prev)
+        prev = total
+    return tf_list
+
+def sampled_cursor(cursor, term):
+    """Bungkus postings cursor; total waktu decode-nya dicatat sebagai sample reader.decode_latency"""
+    decode_seconds = 0.0
+    while True:
+        start = time.perf_counter()
+        try:
+            doc_id = next(cursor)
+        except StopIteration:
+            break
+        finally:
+            decode_seconds += time.perf_counter() - start
+        yield doc_id
+    metrics.sample('reader.decode_latency', decode_seconds, term)
+
+def list_indices(path):
+    """(nama index .index/.dict, nama segment .seg) di direktori path, terurut"""
+    filenames = set(os.listdir(path))
+    indices = sorted(filename[:-len('.index')] for filename in filenames
+                     if filename.endswith('.index') and filename[:-len('.index')] + '.dict' in filenames)
+    segments = sorted(filename[:-len('.seg')] for filename in filenames if filename.endswith('.seg'))
+    return indices, segments
 
 class InvertedIndex:
     """
@@ -33,6 +90,25 @@ class InvertedIndex:
         List of terms IDs, untuk mengingat urutan terms yang dimasukan ke
         dalam Inverted Index.
 
+    tf_dict: Dictionary mapping (opsional):
+
+            termID -> (start_position_in_index_file,
+                       length_in_bytes_of_tf_list)
+
+        Hanya terisi jika index dibangun dengan term frequency (dibutuhkan
+        untuk scoring seperti BM25). tf list disimpan tepat setelah postings
+        list dari term yang sama dalam bentuk prefix sum, sehingga urutannya
+        monoton naik dan bisa di-encode dengan encoding_method yang sama.
+
+    checksum_dict: Dictionary mapping:
+
+            termID -> crc32 dari bytes postings list term tersebut, diikuti
+                      bytes tf list-nya (jika ada)
+
+        Diisi oleh InvertedIndexWriter dan diperiksa oleh verify.py. Kosong
+        untuk index lama dan untuk segment (segment punya checksum per
+        section di footer-nya).
+
     """
     def __init__(self, index_name, encoding_method, path=''):
         """
@@ -52,6 +128,8 @@ class InvertedIndex:
 
         self.postings_dict = {}
         self.terms = []         #Untuk keep track urutan term yang dimasukkan ke index
+        self.tf_dict = {}
+        self.checksum_dict = {}
 
     def __enter__(self):
         """
@@ -72,27 +150,90 @@ class InvertedIndex:
         self.index_file = open(self.index_file_path, 'rb+')
 
         # Kita muat postings dict dan terms iterator dari file metadata
-        with open(self.metadata_file_path, 'rb') as f:
-            self.postings_dict, self.terms = pickle.load(f)
-            self.term_iter = self.terms.__iter__()
+        self.load_metadata()
 
         return self
 
+    def load_metadata(self):
+        """Memuat postings_dict, terms, tf_dict, dan checksum_dict dari file metadata"""
+        with open(self.metadata_file_path, 'rb') as f, metrics.timer('io.pickle_load'):
+            metadata = pickle.load(f)
+            self.postings_dict, self.terms = metadata[0], metadata[1]
+            # Index lama (tanpa term frequency) hanya menyimpan 2 elemen
+            self.tf_dict = metadata[2] if len(metadata) > 2 else {}
+            self.checksum_dict = metadata[3] if len(metadata) > 3 else {}
+            self.term_iter = self.terms.__iter__()
+
     def __exit__(self, exception_type, exception_value, traceback):
         """Menutup index_file dan menyimpan postings_dict dan terms ketika keluar context"""
         # Menutup index file
         self.index_file.close()
 
         # Menyimpan metadata (postings dict dan terms) ke file metadata dengan bantuan pickle
-        with open(self.metadata_file_path, 'wb') as f:
-            pickle.dump([self.postings_dict, self.terms], f)
+        metadata = [self.postings_dict, self.terms]
+        if self.tf_dict or self.checksum_dict:
+            metadata.append(self.tf_dict)
+        if self.checksum_dict:
+            metadata.append(self.checksum_dict)
+        with open(self.metadata_file_path, 'wb') as f, metrics.timer('io.pickle_save'):
+            pickle.dump(metadata, f)
 
 
 class InvertedIndexReader(InvertedIndex):
     """
     Class yang mengimplementasikan bagaimana caranya scan atau membaca secara
     efisien Inverted Index yang disimpan di sebuah file.
+
+    Jika postings_cache (lihat cache.PostingsCache) diberikan, postings list
+    hasil decode disimpan di sana dan dipakai ulang oleh get_postings_list(...).
+    Cache tersebut boleh dipakai ulang oleh beberapa reader berturut-turut,
+    selama semuanya membaca index yang sama.
+
+    Reader bersifat read-only: index file dibuka dengan mode 'rb' dan metadata
+    tidak ditulis ulang saat keluar context, sehingga banyak reader (misal
+    worker process di server.py) aman membuka index yang sama bersamaan. Jika
+    use_mmap=True, index file di-mmap sehingga page-nya dibagi antar process
+    lewat page cache OS, tanpa buffer read per process.
+
+    Jika pasangan <index_name>.index/.dict tidak ada tetapi <index_name>.seg
+    ada (lihat segment.py), reader membuka segment tersebut: satu open, satu
+    mmap, dan postings_dict/tf_dict/terms dibaca langsung dari file tanpa
+    unpickle.
     """
+    def __init__(self, index_name, encoding_method, path='', postings_cache=None, use_mmap=False):
+        super().__init__(index_name, encoding_method, path)
+        self.postings_cache = postings_cache
+        self.use_mmap = use_mmap
+        self.segment_file_path = segment_file_path(index_name, path)
+        self.segment = None
+
+    def __enter__(self):
+        if not os.path.exists(self.index_file_path) and os.path.exists(self.segment_file_path):
+            self.segment = Segment(self.segment_file_path)
+            self.raw_index_file, self.index_file = self.segment.file, self.segment.buffer
+            self.postings_dict, self.tf_dict = self.segment.postings_dict, self.segment.tf_dict
+            self.terms = self.segment.postings_dict
+            self.term_iter = iter(self.terms)
+            return self
+        self.raw_index_file = open(self.index_file_path, 'rb')
+        self.index_file = self.raw_index_file
+        # mmap tidak bisa dibuat untuk file kosong
+        if self.use_mmap and os.fstat(self.raw_index_file.fileno()).st_size > 0:
+            self.index_file = mmap.mmap(self.raw_index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.load_metadata()
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        """Menutup index file; metadata tidak berubah sehingga tidak perlu disimpan"""
+        if self.index_file is not self.raw_index_file:
+            try:
+                self.index_file.close()
+            except BufferError:
+                # Masih ada postings_cursor yang memegang memoryview; mmap
+                # ditutup saat cursor tersebut di-garbage collect
+                pass
+        self.raw_index_file.close()
+
     def __iter__(self):
         return self
 
@@ -136,22 +277,199 @@ class InvertedIndexReader(InvertedIndex):
         term disimpan.
         """
         if term in self.postings_dict:
+            if self.postings_cache is not None:
+                postings_list = self.postings_cache.get(term)
+                if postings_list is not None:
+                    return postings_list
             position, n_postings, length_in_bytes = self.postings_dict[term]
             self.index_file.seek(position)  # Move file pointer to start of postings list
             encoded_postings_list = self.index_file.read(length_in_bytes)
-            return self.encoding_method.decode(encoded_postings_list)
+            sampled = False
+            if metrics.enabled:
+                metrics.count('reader.seeks')
+                metrics.count('reader.bytes_read', length_in_bytes)
+                sampled = metrics.should_sample()
+            if self.postings_cache is None and not sampled:
+                return self.encoding_method.decode(encoded_postings_list)
+            start = time.perf_counter()
+            postings_list = self.encoding_method.decode(encoded_postings_list)
+            decode_seconds = time.perf_counter() - start
+            if sampled:
+                metrics.sample('reader.decode_latency', decode_seconds, term)
+            if self.postings_cache is not None:
+                self.postings_cache.put(term, postings_list, decode_seconds)
+            return postings_list
+        return []
+
+    def read_encoded(self, position, length_in_bytes):
+        """
+        Bytes dari index file di [position, position + length_in_bytes). Jika
+        index file di-mmap, yang dikembalikan adalah memoryview tanpa copy.
+        """
+        if metrics.enabled:
+            metrics.count('reader.bytes_read', length_in_bytes)
+        if self.index_file is not self.raw_index_file:
+            return memoryview(self.index_file)[position:position + length_in_bytes]
+        if metrics.enabled:
+            metrics.count('reader.seeks')
+        self.index_file.seek(position)
+        return self.index_file.read(length_in_bytes)
+
+    def postings_cursor(self, term):
+        """
+        Iterator docID dari postings list term, di-decode secara incremental
+        dengan encoding_method.decode_iter(...). Hanya bytes ter-encode (yang
+        kompak) yang dibaca sekaligus; docID-nya di-decode per chunk saat
+        iterator dikonsumsi. Beberapa cursor boleh dikonsumsi bergantian
+        karena masing-masing memegang buffer sendiri.
+        """
+        if term not in self.postings_dict:
+            return iter(())
+        if self.postings_cache is not None:
+            return iter(self.get_postings_list(term))
+        position, n_postings, length_in_bytes = self.postings_dict[term]
+        cursor = self.encoding_method.decode_iter(self.read_encoded(position, length_in_bytes))
+        if metrics.enabled and metrics.should_sample():
+            return sampled_cursor(cursor, term)
+        return cursor
+
+    def tf_cursor(self, term):
+        """Iterator tf dari term, sejajar dengan postings_cursor(term)"""
+        if term not in self.tf_dict:
+            return iter(())
+        position, length_in_bytes = self.tf_dict[term]
+        return self.from_cumulative_iter(self.encoding_method.decode_iter(self.read_encoded(position, length_in_bytes)))
+
+    @staticmethod
+    def from_cumulative_iter(cumulative_tf):
+        prev = 0
+        for total in cumulative_tf:
+            yield total - prev
+            prev = total
+
+    def warm_up(self, terms):
+        """
+        Isi postings_cache dengan postings list dari terms (misal term
+        terpopuler dari query log), tanpa melalui kebijakan admission cache.
+        """
+        for term in terms:
+            if term in self.postings_dict and term not in self.postings_cache:
+                position, n_postings, length_in_bytes = self.postings_dict[term]
+                self.index_file.seek(position)
+                start = time.perf_counter()
+                postings_list = self.encoding_method.decode(self.index_file.read(length_in_bytes))
+                self.postings_cache.put(term, postings_list, time.perf_counter() - start, force=True)
+
+    def get_tf_list(self, term):
+        """
+        Kembalikan list term frequency untuk sebuah term, sejajar dengan
+        postings list dari get_postings_list(term). tf list disimpan sebagai
+        prefix sum, sehingga di sini dikembalikan lagi menjadi nilai tf aslinya.
+
+        Jika index tidak menyimpan term frequency, kembalikan list kosong.
+        """
+        if term in self.tf_dict:
+            position, length_in_bytes = self.tf_dict[term]
+            self.index_file.seek(position)
+            cumulative_tf = self.encoding_method.decode(self.index_file.read(length_in_bytes))
+            return from_cumulative(cumulative_tf)
         return []
 
 class InvertedIndexWriter(InvertedIndex):
     """
     Class yang mengimplementasikan bagaimana caranya menulis secara
     efisien Inverted Index yang disimpan di sebuah file.
+
+    Postings list yang sudah di-encode tidak langsung ditulis satu per satu,
+    tetapi dikumpulkan di buffer di memori dan ditulis ke file sekaligus
+    setiap kali buffer mencapai buffer_size byte. Posisi setiap postings list
+    dihitung sendiri dari banyaknya byte yang sudah di-append (self.offset),
+    bukan dengan tell().
+
+    Jika encode_workers > 0, encode pada append(...) dijalankan di thread pool
+    sementara pemanggil (misal heap pada merge_index) terus menghasilkan term
+    berikutnya. Hasil encode tetap ditulis sesuai urutan append, sehingga isi
+    file sama persis dengan tanpa thread pool; postings_dict dan tf_dict baru
+    lengkap setelah flush().
     """
+    def __init__(self, index_name, encoding_method, path='', buffer_size=WRITE_BUFFER_SIZE, encode_workers=0):
+        super().__init__(index_name, encoding_method, path)
+        self.buffer_size = buffer_size
+        self.encode_workers = encode_workers
+
     def __enter__(self):
-        self.index_file = open(self.index_file_path, 'wb+')
+        self.file = open(self.index_file_path, 'wb+')
+        self.buffer = bytearray()
+        self.offset = 0
+        self.pending = deque()
+        self.pool = None
+        if self.encode_workers > 0:
+            from concurrent.futures import ThreadPoolExecutor
+            self.pool = ThreadPoolExecutor(self.encode_workers)
         return self
 
-    def append(self, term, postings_list):
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.flush()
+        if self.pool is not None:
+            self.pool.shutdown()
+        super().__exit__(exception_type, exception_value, traceback)
+
+    @property
+    def index_file(self):
+        """File index; buffer di-flush dulu supaya isinya lengkap jika file dibaca atau di-seek"""
+        self.flush()
+        return self.file
+
+    def write(self, data):
+        """Append bytes ke buffer; buffer ditulis ke file jika sudah penuh"""
+        self.buffer += data
+        self.offset += len(data)
+        if len(self.buffer) >= self.buffer_size:
+            self.write_buffer()
+        return len(data)
+
+    def write_buffer(self):
+        if metrics.enabled:
+            metrics.count('writer.file_writes')
+            metrics.count('writer.bytes_written', len(self.buffer))
+        self.file.write(self.buffer)
+        self.buffer.clear()
+
+    def flush(self):
+        """Tulis semua postings list yang masih di-encode atau masih di buffer ke file"""
+        self.drain(block=True)
+        if self.buffer:
+            self.write_buffer()
+        self.file.flush()
+
+    def drain(self, block=False):
+        """
+        Tulis hasil encode di thread pool sesuai urutan append. Jika block=False,
+        hanya hasil yang sudah selesai di depan antrian (atau yang melebihi
+        MAX_PENDING_ENCODES) yang ditunggu.
+        """
+        while self.pending and (block or self.pending[0][2].done() or len(self.pending) > MAX_PENDING_ENCODES):
+            term, n_postings, future = self.pending.popleft()
+            self.write_encoded(term, n_postings, *future.result())
+
+    def encode(self, postings_list, tf_list=None):
+        """(encoded postings list, encoded tf list atau None)"""
+        encoded_tf_list = None
+        if tf_list is not None:
+            encoded_tf_list = self.encoding_method.encode(to_cumulative(tf_list))
+        return self.encoding_method.encode(postings_list), encoded_tf_list
+
+    def write_encoded(self, term, n_postings, encoded_postings_list, encoded_tf_list=None):
+        self.postings_dict[term] = (self.offset, n_postings, len(encoded_postings_list))
+        self.write(encoded_postings_list)
+        checksum = zlib.crc32(encoded_postings_list)
+        if encoded_tf_list is not None:
+            self.tf_dict[term] = (self.offset, len(encoded_tf_list))
+            self.write(encoded_tf_list)
+            checksum = zlib.crc32(encoded_tf_list, checksum)
+        self.checksum_dict[term] = checksum
+
+    def append(self, term, postings_list, tf_list=None):
         """
         Menambahkan (append) sebuah term dan juga postings_list yang terasosiasi
         ke posisi akhir index file.
@@ -164,7 +482,7 @@ class InvertedIndexWriter(InvertedIndex):
                            - number_of_postings_in_list
                            - length_in_bytes_of_postings_list
         3. Menambahkan (append) bystream dari postings_list yang sudah di-encode
-           ke posisi akhir index file di harddisk.
+           ke posisi akhir index file di harddisk (lewat buffer, lihat write).
 
         SEARCH ON YOUR FAVORITE SEARCH ENGINE:
         - Anda mungkin mau membaca tentang Python I/O
@@ -180,23 +498,106 @@ class InvertedIndexWriter(InvertedIndex):
             term atau termID yang merupakan unique identifier dari sebuah term
         postings_list: List[Int]
             List of docIDs dimana term muncul
+        tf_list: List[Int], optional
+            Term frequency dari term di setiap docID pada postings_list. Jika
+            diberikan, tf list ditulis tepat setelah postings list dan posisinya
+            dicatat di self.tf_dict.
         """
-        # Encode the postings list using the specified encoding method
-        encoded_postings_list = self.encoding_method.encode(postings_list)
-        
-        # Get the current position in the file
-        current_pos = self.index_file.tell()
-        
-        # Store metadata in the dictionary
-        n_postings = len(postings_list)
-        length_in_bytes = len(encoded_postings_list)
+        # Term dicatat sekarang supaya urutannya sesuai urutan append, meskipun
+        # encode-nya selesai belakangan
+        self.terms.append(term)
+        if self.pool is None:
+            self.write_encoded(term, len(postings_list), *self.encode(postings_list, tf_list))
+            return
+        self.pending.append((term, len(postings_list), self.pool.submit(self.encode, postings_list, tf_list)))
+        self.drain()
+
+    def append_stream(self, term, postings, with_tf=False, chunk_size=CHUNK_SIZE):
+        """
+        Sama seperti append(...), tetapi postings berupa iterator (misal hasil
+        merge dari beberapa postings_cursor) yang di-encode per chunk_size
+        postings dengan encoding_method.encoder() dan langsung ditulis ke
+        buffer. Jika with_tf=True, postings menghasilkan pasangan (docID, tf);
+        tf list (prefix sum) di-encode per chunk ke buffer bytes yang kompak,
+        lalu ditulis tepat setelah postings list.
+
+        Jika thread pool aktif dan postings habis dalam chunk pertama (postings
+        list pendek, yang merupakan mayoritas term), encode-nya diserahkan ke
+        append(...) sehingga berjalan di thread pool. Postings list yang lebih
+        panjang tetap di-stream di thread ini supaya memorinya tetap terbatas.
+        """
+        postings = iter(postings)
+        first_chunk = list(itertools.islice(postings, chunk_size))
+        if self.pool is not None and len(first_chunk) < chunk_size:
+            if with_tf:
+                self.append(term, [doc_id for doc_id, _ in first_chunk], [tf for _, tf in first_chunk])
+            else:
+                self.append(term, first_chunk)
+            return
+        self.drain(block=True)
+        current_pos = self.offset
+        encoder = self.encoding_method.encoder()
+        tf_encoder = self.encoding_method.encoder() if with_tf else None
+        encoded_tf_list = bytearray()
+        n_postings = 0
+        length_in_bytes = 0
+        checksum = 0
+        total_tf = 0
+        chunk, tf_chunk = [], []
+        for posting in itertools.chain(first_chunk, postings):
+            if with_tf:
+                doc_id, tf = posting
+                chunk.append(doc_id)
+                total_tf += tf
+                tf_chunk.append(total_tf)
+            else:
+                chunk.append(posting)
+            if len(chunk) >= chunk_size:
+                encoded_chunk = encoder.encode(chunk)
+                checksum = zlib.crc32(encoded_chunk, checksum)
+                length_in_bytes += self.write(encoded_chunk)
+                n_postings += len(chunk)
+                if with_tf:
+                    encoded_tf_list += tf_encoder.encode(tf_chunk)
+                chunk, tf_chunk = [], []
+        encoded_chunk = encoder.encode(chunk) + encoder.finish()
+        checksum = zlib.crc32(encoded_chunk, checksum)
+        length_in_bytes += self.write(encoded_chunk)
+        n_postings += len(chunk)
         self.postings_dict[term] = (current_pos, n_postings, length_in_bytes)
-        
-        # Add term to the list of terms
         self.terms.append(term)
-        
-        # Write the encoded postings list to the index file
-        self.index_file.write(encoded_postings_list)
+        if with_tf:
+            encoded_tf_list += tf_encoder.encode(tf_chunk) + tf_encoder.finish()
+            self.tf_dict[term] = (current_pos + length_in_bytes, len(encoded_tf_list))
+            self.write(encoded_tf_list)
+            checksum = zlib.crc32(encoded_tf_list, checksum)
+        self.checksum_dict[term] = checksum
+
+    def append_index(self, reader):
+        """
+        Append seluruh isi index lain (InvertedIndexReader yang sudah dibuka,
+        dengan encoding yang sama) ke akhir index ini. Bytes-nya disalin apa
+        adanya tanpa decode (checksum-nya juga disalin), dan posisi di
+        postings_dict/tf_dict-nya digeser sebesar self.offset. Semua term di reader harus lebih besar dari term
+        yang sudah ada, supaya urutan term tetap terurut.
+        """
+        self.drain(block=True)
+        shift = self.offset
+        reader.index_file.seek(0)
+        while True:
+            data = reader.index_file.read(self.buffer_size)
+            if not data:
+                break
+            self.write(data)
+        for term in reader.terms:
+            position, n_postings, length_in_bytes = reader.postings_dict[term]
+            self.postings_dict[term] = (position + shift, n_postings, length_in_bytes)
+            self.terms.append(term)
+            if term in reader.tf_dict:
+                position, length_in_bytes = reader.tf_dict[term]
+                self.tf_dict[term] = (position + shift, length_in_bytes)
+            if term in reader.checksum_dict:
+                self.checksum_dict[term] = reader.checksum_dict[term]
 
 if __name__ == "__main__":
 
@@ -236,8 +637,33 @@ if __name__ == "__main__":
         assert VBEPostings.decode(index.index_file.read(index.postings_dict[1][2])) == [2, 3, 4, 8, 10], "terdapat kesalahan"
         assert VBEPostings.decode(index.index_file.read(index.postings_dict[2][2])) == [3, 4, 5], "terdapat kesalahan"
 
+    with InvertedIndexWriter('test', encoding_method=VBEPostings, path='./tmp/') as index:
+        index.append(1, [2, 3, 4, 8, 10], [1, 3, 1, 2, 7])
+        index.append(2, [3, 4, 5], [2, 2, 1])
+        assert index.tf_dict[1] == (index.postings_dict[1][2], len(VBEPostings.encode([1, 4, 5, 7, 14]))), "tf dictionary salah"
+
+    with InvertedIndexReader('test', encoding_method=VBEPostings, path='./tmp/') as index:
+        assert index.get_postings_list(2) == [3, 4, 5], "postings dengan tf salah"
+        assert index.get_tf_list(1) == [1, 3, 1, 2, 7], "tf list salah"
+        assert index.get_tf_list(2) == [2, 2, 1], "tf list salah"
+        assert next(index) == (1, [2, 3, 4, 8, 10]), "iterasi index dengan tf salah"
+
+    from cache import PostingsCache
+    postings_cache = PostingsCache(max_bytes=1000)
+    with InvertedIndexReader('test', VBEPostings, path='./tmp/', postings_cache=postings_cache) as index:
+        index.warm_up([1])
+        assert index.get_postings_list(1) == [2, 3, 4, 8, 10], "postings dari cache salah"
+        assert index.get_postings_list(2) == [3, 4, 5], "postings dengan cache salah"
+    with InvertedIndexReader('test', VBEPostings, path='./tmp/', postings_cache=postings_cache) as index:
+        assert index.get_postings_list(2) == [3, 4, 5], "postings dari cache salah"
+        assert index.get_postings_list(3) == [], "term yang tidak ada harus menghasilkan list kosong"
+    assert postings_cache.stats()['hits'] == 2 and postings_cache.stats()['misses'] == 1, "statistik cache salah"
+
+    with InvertedIndexReader('test', VBEPostings, path='./tmp/', use_mmap=True) as index:
+        assert list(index) == [(1, [2, 3, 4, 8, 10]), (2, [3, 4, 5])], "iterasi index dengan mmap salah"
+        assert index.get_tf_list(2) == [2, 2, 1], "tf list dengan mmap salah"
+
 
-    
     # Silakan sesuaikan metode encode dan decode Simple8bPostings berdasarkan parameter method yang Anda implementasikan
     with InvertedIndexWriter('test', encoding_method=Simple8bPostings, path='./tmp/') as index:
         index.append(1, [2, 3, 4, 8, 10])
@@ -256,3 +682,64 @@ if __name__ == "__main__":
         assert Simple8bPostings.decode(index.index_file.read(index.postings_dict[1][2])) == [2, 3, 4, 8, 10], "terdapat kesalahan"
         assert Simple8bPostings.decode(index.index_file.read(index.postings_dict[2][2])) == [3, 4, 5], "terdapat kesalahan"
 
+    with InvertedIndexWriter('test', encoding_method=VBEPostings, path='./tmp/') as index:
+        index.append_stream(1, iter([(2, 1), (3, 3), (4, 1), (8, 2), (10, 7)]), with_tf=True, chunk_size=2)
+        index.append_stream(2, iter([3, 4, 5]), chunk_size=2)
+    for use_mmap in [False, True]:
+        with InvertedIndexReader('test', VBEPostings, path='./tmp/', use_mmap=use_mmap) as index:
+            assert index.get_postings_list(1) == [2, 3, 4, 8, 10], "append_stream salah"
+            assert index.get_tf_list(1) == [1, 3, 1, 2, 7], "tf dari append_stream salah"
+            assert index.get_postings_list(2) == [3, 4, 5], "append_stream salah"
+            postings_cursor, tf_cursor = index.postings_cursor(1), index.tf_cursor(1)
+            assert next(index.postings_cursor(2)) == 3 and list(postings_cursor) == [2, 3, 4, 8, 10], "postings_cursor salah"
+            assert list(tf_cursor) == [1, 3, 1, 2, 7] and list(index.postings_cursor(3)) == [], "tf_cursor salah"
+
+    # Buffer kecil dan thread pool harus menghasilkan file dan metadata yang sama persis
+    import random
+    random.seed(0)
+    lists = [sorted(random.sample(range(1, 5000), random.randint(1, 3000))) for _ in range(40)]
+    outputs = []
+    for buffer_size, encode_workers in [(WRITE_BUFFER_SIZE, 0), (100, 0), (100, 2)]:
+        with InvertedIndexWriter('test', VBEPostings, path='./tmp/', buffer_size=buffer_size,
+                                 encode_workers=encode_workers) as index:
+            for term, postings_list in enumerate(lists):
+                if term % 2:
+                    index.append(term, postings_list, [1] * len(postings_list))
+                else:
+                    index.append_stream(term, iter(postings_list))
+            index.flush()
+            assert index.offset == os.path.getsize(index.index_file_path), "offset writer salah"
+        with open(index.index_file_path, 'rb') as f:
+            outputs.append((f.read(), index.postings_dict, index.tf_dict, index.checksum_dict, index.terms))
+    assert outputs[0] == outputs[1] == outputs[2], "buffer atau thread pool mengubah isi index"
+    data, postings_dict, tf_dict, checksum_dict, _ = outputs[0]
+    for term, (position, _, length_in_bytes) in postings_dict.items():
+        if term in tf_dict:
+            length_in_bytes += tf_dict[term][1]
+        assert checksum_dict[term] == zlib.crc32(data[position:position + length_in_bytes]), "checksum salah"
+    import metrics as instrumentation
+    instrumentation.enable(decode_sample_rate=1.0)
+    with InvertedIndexReader('test', VBEPostings, path='./tmp/') as index:
+        assert [index.get_postings_list(term) for term in range(40)] == lists, "postings dari writer ber-buffer salah"
+        assert list(index.postings_cursor(3)) == lists[3], "postings_cursor dengan sampling salah"
+    snapshot = instrumentation.metrics.snapshot()
+    assert snapshot['samples']['reader.decode_latency']['n'] == 41, "sampling decode latency salah"
+    assert snapshot['counters']['reader.seeks'] == 41, "counter seek salah"
+    instrumentation.disable()
+    with InvertedIndexReader('test', VBEPostings, path='./tmp/') as index:
+        assert index.get_tf_list(1) == [1] * len(lists[1]), "tf dari writer ber-buffer salah"
+
+    # Menyambung dua index (term 0..19 dan 20..39) harus sama persis dengan menulisnya sekaligus
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for part, terms in enumerate([range(20), range(20, 40)]):
+            with InvertedIndexWriter('part{}'.format(part), VBEPostings, path=tmp_dir) as index:
+                for term in terms:
+                    index.append(term, lists[term], [1] * len(lists[term]) if term % 2 else None)
+        with InvertedIndexWriter('merged', VBEPostings, path=tmp_dir, buffer_size=100) as index:
+            for part in range(2):
+                with InvertedIndexReader('part{}'.format(part), VBEPostings, path=tmp_dir) as reader:
+                    index.append_index(reader)
+        with open(os.path.join(tmp_dir, 'merged.index'), 'rb') as f:
+            assert (f.read(), index.postings_dict, index.tf_dict, index.checksum_dict, index.terms) == outputs[0], \
+                "append_index salah"
@@ -0,0 +1,376 @@
+"""
+Load test boolean retrieval dengan me-replay query log atau query sintetis.
+
+Sumber query:
+    --queries FILE   query log, satu query per baris (baris kosong dan baris
+                     yang diawali '#' dilewati)
+    --synthesize N   N query sintetis: term diambil dengan distribusi Zipf
+                     terhadap ranking df di postings_dict (term ber-df besar
+                     paling sering muncul) lalu disusun dengan QUERY_SHAPES
+
+Target:
+    output_path      searcher di process ini (BSBIIndex yang sudah di-load
+                     dengan reader yang tetap terbuka, seperti worker server.py)
+    --server ADDR    query server lokal (server.py), http://host:port atau
+                     unix:/path/ke/socket
+
+Beban:
+    --concurrency C  closed loop: C client, masing-masing langsung mengirim
+                     query berikutnya begitu query sebelumnya selesai
+    --rate R         open loop: query ke-i dijadwalkan pada detik i / R dan
+                     latency dihitung dari jadwal itu, sehingga antrian di
+                     sisi client ikut terukur; C membatasi query yang berjalan
+                     bersamaan
+    --duration S     ulangi query sampai S detik (default: satu putaran)
+
+Setiap fase (--phases cold,warm) me-replay query yang sama. Fase cold untuk
+target lokal dimulai dengan searcher yang baru dibuka (cache kosong) dan file
+index dikeluarkan dari page cache OS (posix_fadvise, jika tersedia); fase
+warm memakai searcher yang sama dengan fase sebelumnya. Untuk --server, fase
+cold adalah putaran pertama setelah server berjalan.
+
+Laporan per fase: throughput, p50/p95/p99/max latency query yang berhasil,
+dan banyaknya error per jenis (status HTTP, misal 400 untuk query tidak valid
+dan 503 untuk server yang overload, atau 'exception').
+
+Contoh:
+    python loadtest.py index_vb --synthesize 2000 --concurrency 1
+    python loadtest.py index_vb --queries queries.txt --postings-cache-mb 64 --query-cache-mb 64
+    python loadtest.py index_vb --synthesize 5000 --server http://127.0.0.1:8080 --concurrency 16
+    python loadtest.py index_vb --synthesize 5000 --server http://127.0.0.1:8080 --rate 200 --duration 30
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import socket
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark import latency_summary, zipf_term_sample
+from compression import ENCODINGS
+from index import InvertedIndexReader
+from util import SearchResult
+
+# Bentuk query sintetis; {0}, {1}, {2} diisi dengan term
+QUERY_SHAPES = ['{0}', '{0} AND {1}', '{0} OR {1}', '{0} AND {1} AND {2}', '({0} OR {1}) AND {2}', '{0} DIFF {1}']
+
+def read_query_log(file_path):
+    """List query dari query log (satu query per baris)"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+def synthesize_queries(output_path, encoding, index_name, n_queries, seed=0, s=1.0):
+    """
+    n_queries query sintetis dari lexicon index. Untuk index yang di-shard,
+    df sebuah term adalah jumlah df-nya di semua shard.
+    """
+    from bsbi import BSBIIndex
+    index = BSBIIndex(None, output_path, encoding, index_name)
+    index.load()
+    document_frequency = Counter()
+    for name in index.source_indices():
+        with InvertedIndexReader(name, encoding, path=output_path) as reader:
+            for term, (_, n_postings, _) in reader.postings_dict.items():
+                document_frequency[term] += n_postings
+    index.close()
+    # Term dengan karakter selain huruf dan angka bisa mengubah hasil parsing query
+    postings_dict = {term: (None, n_postings) for term, n_postings in document_frequency.items()
+                     if index.term_id_map[term].isalnum()}
+    rng = random.Random(seed)
+    terms = iter(zipf_term_sample(postings_dict, 3 * n_queries, seed, s))
+    queries = []
+    for _ in range(n_queries):
+        shape = rng.choice(QUERY_SHAPES)
+        queries.append(shape.format(*(index.term_id_map[next(terms)] for _ in range(3))))
+    return queries
+
+def evict_page_cache(path):
+    """Keluarkan file di path dari page cache OS (tanpa efek jika posix_fadvise tidak tersedia)"""
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    for filename in os.listdir(path):
+        file_path = os.path.join(path, filename)
+        if os.path.isfile(file_path):
+            fd = os.open(file_path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+    return True
+
+class LocalTarget:
+    """
+    Searcher di process ini. Query dievaluasi satu per satu (lock) karena
+    reader dan cache BSBIIndex tidak thread-safe; dengan concurrency > 1,
+    latency-nya mencakup waktu antri.
+    """
+    def __init__(self, output_path, encoding, index_name='main_index', query_cache_bytes=0, postings_cache_bytes=0):
+        from bsbi import BSBIIndex
+        self.index = BSBIIndex(None, output_path, encoding, index_name, shard_workers=1)
+        self.index.load()
+        if query_cache_bytes > 0:
+            self.index.enable_query_cache(query_cache_bytes)
+        if postings_cache_bytes > 0:
+            self.index.enable_postings_cache(postings_cache_bytes)
+        self.reader = None if self.index.shards else self.index.open_reader(use_mmap=True).__enter__()
+        self.lock = threading.Lock()
+
+    def search(self, query, limit):
+        """Status seperti respons server: 200, atau 400 untuk query yang tidak valid"""
+        with self.lock:
+            try:
+                result = SearchResult(self.index.boolean_postings(query, self.reader), self.index.doc_id_map)
+            except (ValueError, IndexError, KeyError):
+                return 400
+            result.count()
+            result.page(0, limit)
+        return 200
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.__exit__(None, None, None)
+        self.index.close()
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, unix_path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = unix_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+class ServerTarget:
+    """Query server lokal lewat HTTP keep-alive, satu koneksi per thread client"""
+    def __init__(self, address, timeout=30.0):
+        self.address = address
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            if self.address.startswith('unix:'):
+                connection = UnixHTTPConnection(self.address[len('unix:'):], self.timeout)
+            else:
+                url = urllib.parse.urlsplit(self.address)
+                connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=self.timeout)
+            self.local.connection = connection
+        return connection
+
+    def search(self, query, limit):
+        connection = self.connection()
+        try:
+            connection.request('GET', '/search?' + urllib.parse.urlencode({'q': query, 'limit': limit}))
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self.local.connection = None
+            raise
+        return response.status
+
+    def close(self):
+        pass
+
+def run_load(target, queries, limit=10, concurrency=1, rate=None, duration=None):
+    """
+    Kirim queries ke target (lihat docstring modul untuk closed dan open loop).
+    Tanpa duration, setiap query dikirim tepat sekali.
+
+    Returns
+    -------
+    dict
+        queries, errors (jenis -> banyaknya), error_rate, duration_s,
+        throughput_qps, dan latency_summary(...) dari query yang berhasil
+    """
+    samples = []
+    errors = Counter()
+    # Dipakai bersama oleh semua thread client
+    lock = threading.Lock()
+    n_sent = itertools.count()
+
+    def call(query, scheduled_ns):
+        try:
+            status = target.search(query, limit)
+        except Exception:
+            status = 'exception'
+        latency_ns = time.perf_counter_ns() - scheduled_ns
+        with lock:
+            if status == 200:
+                samples.append(latency_ns)
+            else:
+                errors[str(status)] += 1
+
+    start = time.perf_counter()
+    if rate is None:
+        def client():
+            while True:
+                i = next(n_sent)
+                if (duration is None and i >= len(queries)) or \
+                        (duration is not None and time.perf_counter() - start >= duration):
+                    return
+                call(queries[i % len(queries)], time.perf_counter_ns())
+        clients = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        n_queries = len(samples) + sum(errors.values())
+    else:
+        start_ns = time.perf_counter_ns()
+        n_queries = len(queries) if duration is None else int(duration * rate)
+        with ThreadPoolExecutor(concurrency) as pool:
+            for i in range(n_queries):
+                scheduled_ns = start_ns + int(i * 1e9 / rate)
+                delay = (scheduled_ns - time.perf_counter_ns()) / 1e9
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(call, queries[i % len(queries)], scheduled_ns)
+    elapsed = time.perf_counter() - start
+    summary = {'queries': n_queries, 'errors': dict(errors),
+               'error_rate': sum(errors.values()) / max(1, n_queries),
+               'duration_s': elapsed, 'throughput_qps': len(samples) / elapsed if elapsed > 0 else 0.0}
+    summary.update(latency_summary(samples))
+    return summary
+
+def run_phases(open_target, queries, phases=('cold', 'warm'), evict_path=None, **load_options):
+    """
+    Jalankan run_load sekali per fase. open_target() membuka target baru;
+    fase cold selalu memakai target baru (dan mengeluarkan evict_path dari
+    page cache sebelum dibuka), fase lain memakai target dari fase sebelumnya.
+
+    Returns
+    -------
+    dict
+        nama fase -> ringkasan run_load, ditambah open_s jika target dibuka
+    """
+    report = {}
+    target = None
+    try:
+        for phase in phases:
+            open_s = None
+            if target is None or phase == 'cold':
+                if target is not None:
+                    target.close()
+                if phase == 'cold' and evict_path is not None:
+                    evict_page_cache(evict_path)
+                start = time.perf_counter()
+                target = open_target()
+                open_s = time.perf_counter() - start
+            report[phase] = run_load(target, queries, **load_options)
+            if open_s is not None:
+                report[phase]['open_s'] = open_s
+    finally:
+        if target is not None:
+            target.close()
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output_path', nargs='?', help='direktori index untuk target lokal dan --synthesize')
+    parser.add_argument('--encoding', choices=ENCODINGS, default='vb')
+    parser.add_argument('--index-name', default='main_index')
+    parser.add_argument('--queries', help='query log, satu query per baris')
+    parser.add_argument('--synthesize', type=int, default=1000, help='banyaknya query sintetis jika --queries tidak diberikan')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--server', help='http://host:port atau unix:/path query server (default: searcher lokal)')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--rate', type=float, default=None, help='query per detik (open loop)')
+    parser.add_argument('--duration', type=float, default=None, help='detik per fase (default: satu putaran query)')
+    parser.add_argument('--limit', type=int, default=10, help='banyaknya nama dokumen per respons')
+    parser.add_argument('--phases', default='cold,warm')
+    parser.add_argument('--query-cache-mb', type=float, default=0)
+    parser.add_argument('--postings-cache-mb', type=float, default=0)
+    parser.add_argument('--json', help='simpan laporan ke file JSON ini')
+    args = parser.parse_args()
+    if args.server is None and args.output_path is None:
+        parser.error("output_path wajib untuk target lokal")
+    if args.queries is None and args.output_path is None:
+        parser.error("output_path wajib untuk --synthesize")
+
+    encoding = ENCODINGS[args.encoding]
+    if args.queries is not None:
+        queries = read_query_log(args.queries)
+    else:
+        queries = synthesize_queries(args.output_path, encoding, args.index_name, args.synthesize, args.seed)
+    if args.server is not None:
+        target = ServerTarget(args.server)
+        open_target, evict_path = (lambda: target), None
+    else:
+        open_target = lambda: LocalTarget(args.output_path, encoding, args.index_name,
+                                          int(args.query_cache_mb * 1024 * 1024),
+                                          int(args.postings_cache_mb * 1024 * 1024))
+        evict_path = args.output_path
+
+    report = run_phases(open_target, queries, args.phases.split(','), evict_path, limit=args.limit,
+                        concurrency=args.concurrency, rate=args.rate, duration=args.duration)
+    for phase, summary in report.items():
+        print("{:<5} {:>7} query  {:>8.1f} q/s  p50 {:>8.2f} ms  p95 {:>8.2f} ms  p99 {:>8.2f} ms  "
+              "max {:>8.2f} ms  error {:.2%} {}".format(
+                  phase, summary['queries'], summary['throughput_qps'], summary['p50_us'] / 1000,
+                  summary['p95_us'] / 1000, summary['p99_us'] / 1000, summary['max_us'] / 1000,
+                  summary['error_rate'], summary['errors'] or ''))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'queries': len(queries), 'phases': report}, f, indent=2)
+
+if __name__ == '__main__':
+
+    import sys
+
+    # Dengan argumen: command line; tanpa argumen: self-test
+    if len(sys.argv) > 1:
+        main()
+
+    class StubTarget:
+        """Target palsu: status ditentukan oleh query, setiap query memakan waktu latency_s"""
+        def __init__(self, latency_s=0.002):
+            self.latency_s = latency_s
+            self.calls = Counter()
+            self.lock = threading.Lock()
+
+        def search(self, query, limit):
+            with self.lock:
+                self.calls[query] += 1
+            time.sleep(self.latency_s)
+            if query == 'boom':
+                raise ConnectionError(query)
+            return {'bad': 400, 'busy': 503}.get(query, 200)
+
+        def close(self):
+            pass
+
+    queries = ['quantum'] * 30 + ['bad'] * 6 + ['busy'] * 3 + ['boom']
+    random.Random(0).shuffle(queries)
+    for options in [{'concurrency': 1}, {'concurrency': 8}, {'concurrency': 8, 'rate': 2000}]:
+        target = StubTarget()
+        summary = run_load(target, queries, **options)
+        assert summary['queries'] == len(queries) and sum(target.calls.values()) == len(queries), \
+            "setiap query harus dikirim tepat sekali ({})".format(options)
+        assert summary['errors'] == {'400': 6, '503': 3, 'exception': 1}, "error per status salah ({})".format(options)
+        assert summary['error_rate'] == 10 / 40 and summary['n'] == 30, "error rate salah ({})".format(options)
+        assert 2000 <= summary['p50_us'] <= summary['p95_us'] <= summary['p99_us'] <= summary['max_us'], \
+            "persentil latency salah ({})".format(options)
+        assert summary['throughput_qps'] > 0, "throughput salah"
+
+    # Open loop: latency dihitung dari jadwal, sehingga antrian di sisi client ikut terukur
+    summary = run_load(StubTarget(latency_s=0.01), ['quantum'] * 20, concurrency=1, rate=1000)
+    assert summary['queries'] == 20 and summary['p99_us'] >= 100000, "antrian open loop tidak terukur"
+
+    # Dengan duration, query diulang sampai waktunya habis
+    summary = run_load(StubTarget(latency_s=0.001), ['quantum', 'bad'], concurrency=2, duration=0.1)
+    assert summary['queries'] > 2 and summary['queries'] == summary['n'] + summary['errors']['400'], "duration salah"
+    summary = run_load(StubTarget(), ['quantum'], rate=100, duration=0.1)
+    assert summary['queries'] == 10, "banyaknya query open loop dengan duration salah"
+
+    report = run_phases(StubTarget, ['quantum'] * 5, phases=['cold', 'warm'])
+    assert list(report) == ['cold', 'warm'] and 'open_s' in report['cold'] and 'open_s' not in report['warm'], \
+        "fase salah"
@@ -0,0 +1,80 @@
+"""
+Merge paralel berdasarkan partisi termID. TermID adalah integer yang padat,
+sehingga ruang termID bisa dibagi menjadi rentang-rentang [low, high) yang
+saling lepas dan di-merge secara independen:
+
+    1. term_ranges(...) membagi termID menjadi n_parts rentang dengan total
+       ukuran postings (byte, dari postings_dict dan tf_dict setiap
+       intermediate index) yang kira-kira sama besar
+    2. setiap rentang di-merge oleh merge_part(...) di process terpisah ke
+       file part <index_name>_part<k>
+    3. part-part tersebut disambung sesuai urutan rentang dengan
+       InvertedIndexWriter.append_index(...): bytes-nya disalin tanpa decode
+       dan posisinya di postings_dict/tf_dict digeser
+
+Karena setiap part berisi term yang terurut dan rentangnya berurutan, hasil
+akhirnya sama persis (byte per byte) dengan merge sekuensial.
+"""
+import contextlib
+from collections import Counter
+
+from index import InvertedIndexReader, InvertedIndexWriter
+
+# Index yang lebih kecil dari ini tidak dibagi menjadi beberapa part
+MIN_PART_BYTES = 4 * 1024 * 1024
+
+def term_ranges(indices, n_parts):
+    """
+    List of (low, high) yang membagi semua term di indices menjadi paling
+    banyak n_parts rentang dengan total byte postings (dan tf) yang seimbang.
+    None berarti tidak dibatasi: rentang pertama dimulai dari None dan
+    rentang terakhir berakhir di None.
+    """
+    sizes = Counter()
+    for reader in indices:
+        for term, (_, _, length_in_bytes) in reader.postings_dict.items():
+            sizes[term] += length_in_bytes
+        for term, (_, length_in_bytes) in reader.tf_dict.items():
+            sizes[term] += length_in_bytes
+    total = sum(sizes.values())
+    bounds = [None]
+    cumulative = 0
+    for term in sorted(sizes):
+        # Term menjadi awal rentang berikutnya jika titik tengahnya melewati batas
+        if cumulative and len(bounds) < n_parts and cumulative + sizes[term] / 2 >= total * len(bounds) / n_parts:
+            bounds.append(term)
+        cumulative += sizes[term]
+    bounds.append(None)
+    return list(zip(bounds, bounds[1:]))
+
+def merge_part(index_ids, part_name, postings_encoding, path, with_tf, term_range, encode_workers=0):
+    """
+    Merge term di term_range dari intermediate indices index_ids menjadi
+    index part_name. Berupa fungsi level modul supaya bisa dijalankan di
+    process pool.
+    """
+    from bsbi import BSBIIndex
+    merger = BSBIIndex(None, path, postings_encoding, part_name, with_tf=with_tf)
+    with InvertedIndexWriter(part_name, postings_encoding, path=path, encode_workers=encode_workers) as part_index:
+        with contextlib.ExitStack() as stack:
+            indices = [stack.enter_context(InvertedIndexReader(index_id, postings_encoding, path=path))
+                       for index_id in index_ids]
+            merger.merge_index(indices, part_index, term_range)
+    return part_name
+
+
+if __name__ == '__main__':
+
+    class FakeReader:
+        def __init__(self, postings_dict, tf_dict=None):
+            self.postings_dict = postings_dict
+            self.tf_dict = tf_dict or {}
+
+    readers = [FakeReader({1: (0, 1, 10), 2: (10, 1, 10), 5: (20, 1, 40)}, {1: (30, 10)}),
+               FakeReader({2: (0, 1, 10), 7: (10, 1, 20)})]
+    # Ukuran per term: 1 -> 20, 2 -> 20, 5 -> 40, 7 -> 20 (total 100)
+    assert term_ranges(readers, 1) == [(None, None)], "satu part harus mencakup semua term"
+    assert term_ranges(readers, 2) == [(None, 5), (5, None)], "rentang tidak seimbang"
+    assert term_ranges(readers, 3) == [(None, 5), (5, 7), (7, None)], "rentang tidak seimbang"
+    assert len(term_ranges(readers, 10)) <= 4, "rentang tidak boleh lebih banyak dari term"
+    assert term_ranges([], 4) == [(None, None)], "index kosong harus menghasilkan satu rentang"
@@ -0,0 +1,229 @@
+"""
+Instrumentation untuk indexing dan query: timer per fase, counter, dan
+sampling latency decode per term. Satu instance global (metrics) dipakai oleh
+bsbi.py, index.py, dan compression.py; secara default tidak aktif, dan setiap
+titik instrumentasi hanya memeriksa metrics.enabled (atau memakai
+metrics.timer(...) yang mengembalikan context manager kosong) sehingga
+overhead-nya dapat diabaikan.
+
+Contoh:
+    import metrics
+    metrics.enable([metrics.JsonFileSink('metrics.json'),
+                    metrics.PrometheusTextSink('metrics.prom')], decode_sample_rate=0.01)
+    BSBI_instance.start_indexing()
+    metrics.metrics.emit()
+
+Nama timer dan counter memakai awalan komponennya, misal 'index.tokenize',
+'merge.heap_pops', 'codec.bytes_decoded', 'reader.seeks'.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import nullcontext
+
+from util import percentile
+
+NULL_TIMER = nullcontext()
+
+class Timer:
+    def __init__(self, metrics, phase):
+        self.metrics = metrics
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.metrics.observe(self.phase, time.perf_counter() - self.start)
+
+class Metrics:
+    """
+    Kumpulan timer, counter, dan sample.
+
+    Attributes
+    ----------
+    enabled (bool)
+    timers (dict): fase -> [banyaknya pengukuran, total detik]
+    counters (dict): nama -> nilai
+    samples (dict): nama -> list of (detik, label), reservoir berukuran
+                    max_samples
+    decode_sample_rate (float): peluang sebuah decode di-sample
+    sinks (list): tujuan emit(), lihat LogSink, JsonFileSink, PrometheusTextSink
+    """
+    def __init__(self, max_samples=1024):
+        self.enabled = False
+        self.decode_sample_rate = 0.0
+        self.max_samples = max_samples
+        self.sinks = []
+        self.lock = threading.Lock()
+        self.random = random.Random(0)
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.timers = {}
+            self.counters = {}
+            self.samples = {}
+            self.sample_seen = {}
+
+    def timer(self, phase):
+        """Context manager yang mengukur waktu fase phase (kosong jika tidak aktif)"""
+        return Timer(self, phase) if self.enabled else NULL_TIMER
+
+    def observe(self, phase, seconds):
+        with self.lock:
+            timer = self.timers.setdefault(phase, [0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def should_sample(self):
+        return self.decode_sample_rate > 0 and self.random.random() < self.decode_sample_rate
+
+    def sample(self, name, seconds, label=None):
+        """Simpan satu sample dengan reservoir sampling supaya memorinya terbatas"""
+        with self.lock:
+            samples = self.samples.setdefault(name, [])
+            seen = self.sample_seen.get(name, 0) + 1
+            self.sample_seen[name] = seen
+            if len(samples) < self.max_samples:
+                samples.append((seconds, label))
+            else:
+                i = self.random.randrange(seen)
+                if i < self.max_samples:
+                    samples[i] = (seconds, label)
+
+    def snapshot(self):
+        """Dict berisi timers, counters, dan ringkasan samples (persentil dan sample terlambat)"""
+        with self.lock:
+            summary = {}
+            for name, samples in self.samples.items():
+                values = sorted(seconds for seconds, _ in samples)
+                summary[name] = {'n': self.sample_seen[name],
+                                 'p50_s': percentile(values, 50), 'p95_s': percentile(values, 95),
+                                 'p99_s': percentile(values, 99), 'max_s': values[-1] if values else 0.0,
+                                 'slowest': sorted(samples, key=lambda s: s[0], reverse=True)[:10]}
+            return {'timers': {phase: {'count': count, 'seconds': seconds}
+                               for phase, (count, seconds) in self.timers.items()},
+                    'counters': dict(self.counters),
+                    'samples': summary}
+
+    def emit(self):
+        """Kirim snapshot ke semua sink"""
+        snapshot = self.snapshot()
+        for sink in self.sinks:
+            sink.emit(snapshot)
+        return snapshot
+
+class LogSink:
+    """Tulis snapshot ke logger (satu baris JSON)"""
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger('ir.metrics')
+        self.level = level
+
+    def emit(self, snapshot):
+        self.logger.log(self.level, json.dumps(snapshot, default=str))
+
+class JsonFileSink:
+    """Tulis snapshot ke file JSON (ditimpa setiap emit)"""
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, snapshot):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f, indent=2, default=str)
+        os.replace(tmp_path, self.path)
+
+class PrometheusTextSink:
+    """
+    Tulis snapshot dalam Prometheus text exposition format (misal untuk
+    textfile collector node_exporter). Timer menjadi <prefix>_phase_seconds_total
+    dan <prefix>_phase_count_total berlabel phase, counter menjadi
+    <prefix>_<nama>_total, dan sample menjadi summary berlabel quantile.
+    """
+    def __init__(self, path, prefix='ir'):
+        self.path = path
+        self.prefix = prefix
+
+    def metric_name(self, name):
+        return self.prefix + '_' + ''.join(c if c.isalnum() else '_' for c in name)
+
+    def render(self, snapshot):
+        lines = ['# TYPE {}_phase_seconds_total counter'.format(self.prefix)]
+        for phase, timer in sorted(snapshot['timers'].items()):
+            lines.append('{}_phase_seconds_total{{phase="{}"}} {}'.format(self.prefix, phase, timer['seconds']))
+        lines.append('# TYPE {}_phase_count_total counter'.format(self.prefix))
+        for phase, timer in sorted(snapshot['timers'].items()):
+            lines.append('{}_phase_count_total{{phase="{}"}} {}'.format(self.prefix, phase, timer['count']))
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = self.metric_name(name) + '_total'
+            lines.append('# TYPE {} counter'.format(metric))
+            lines.append('{} {}'.format(metric, value))
+        for name, summary in sorted(snapshot['samples'].items()):
+            metric = self.metric_name(name) + '_seconds'
+            lines.append('# TYPE {} summary'.format(metric))
+            for quantile, key in [('0.5', 'p50_s'), ('0.95', 'p95_s'), ('0.99', 'p99_s')]:
+                lines.append('{}{{quantile="{}"}} {}'.format(metric, quantile, summary[key]))
+            lines.append('{}_count {}'.format(metric, summary['n']))
+        return '\n'.join(lines) + '\n'
+
+    def emit(self, snapshot):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.render(snapshot))
+        os.replace(tmp_path, self.path)
+
+# Instance global yang dipakai oleh semua modul
+metrics = Metrics()
+
+def enable(sinks=(), decode_sample_rate=0.0):
+    """Aktifkan instrumentasi (isi sebelumnya dikosongkan)"""
+    metrics.reset()
+    metrics.sinks = list(sinks)
+    metrics.decode_sample_rate = decode_sample_rate
+    metrics.enabled = True
+    return metrics
+
+def disable():
+    metrics.enabled = False
+
+
+if __name__ == '__main__':
+
+    import tempfile
+
+    assert metrics.timer('x') is NULL_TIMER, "timer harus kosong jika metrics tidak aktif"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path, prom_path = os.path.join(tmp_dir, 'm.json'), os.path.join(tmp_dir, 'm.prom')
+        enable([JsonFileSink(json_path), PrometheusTextSink(prom_path)], decode_sample_rate=1.0)
+        with metrics.timer('index.sort'):
+            sorted(range(1000))
+        with metrics.timer('index.sort'):
+            pass
+        metrics.count('index.docs', 3)
+        metrics.count('index.docs')
+        for i in range(2000):
+            if metrics.should_sample():
+                metrics.sample('decode_latency', i / 1e6, i)
+        snapshot = metrics.emit()
+        assert snapshot['timers']['index.sort']['count'] == 2 and snapshot['counters']['index.docs'] == 4, "metrik salah"
+        summary = snapshot['samples']['decode_latency']
+        assert summary['n'] == 2000 and len(metrics.samples['decode_latency']) == 1024, "reservoir sampling salah"
+        assert summary['slowest'][0][0] <= 0.001999 and summary['p50_s'] <= summary['p99_s'], "ringkasan sample salah"
+        with open(json_path) as f:
+            assert json.load(f)['counters']['index.docs'] == 4, "JsonFileSink salah"
+        with open(prom_path) as f:
+            prom = f.read()
+        assert 'ir_phase_count_total{phase="index.sort"} 2' in prom and 'ir_index_docs_total 4' in prom, "PrometheusTextSink salah"
+        assert 'ir_decode_latency_seconds{quantile="0.99"}' in prom, "PrometheusTextSink salah"
+        disable()
+        assert metrics.timer('x') is NULL_TIMER, "timer harus kosong setelah disable"
@@ -0,0 +1,216 @@
+"""
+Pipeline bertahap untuk indexing. Setiap stage berjalan di thread sendiri dan
+dihubungkan ke stage berikutnya lewat queue yang dibatasi, sehingga misalnya
+membaca file dari disk, analisis (tokenisasi dan stemming), inversion, dan
+encode/write ke index bisa berjalan tumpang tindih. Queue yang penuh membuat
+stage sebelumnya menunggu (backpressure), sehingga memori tetap terbatas.
+
+Setiap stage mencatat metrik: banyaknya item masuk/keluar, waktu sibuk
+(busy), waktu menunggu input (starved), waktu menunggu tempat di queue
+berikutnya (blocked), serta kedalaman queue input-nya. Stage dengan
+utilization tertinggi adalah bottleneck di mesin tersebut (lihat bottleneck()).
+"""
+import queue
+import threading
+import time
+
+# Penanda akhir aliran item
+DONE = object()
+
+class Stage:
+    """
+    Satu stage pipeline. fn(item) mengembalikan iterable berisi nol atau
+    lebih item untuk stage berikutnya; untuk stage pertama (source), fn()
+    dipanggil tanpa argumen. Jika finish diberikan, finish() dipanggil setelah
+    input habis dan hasilnya (iterable) ikut dikirim ke stage berikutnya,
+    misal untuk item yang masih ditahan oleh stage tersebut.
+
+    Attributes
+    ----------
+    items_in, items_out (int)
+    busy_seconds (float): waktu di dalam fn
+    starved_seconds (float): waktu menunggu item dari queue input
+    blocked_seconds (float): waktu menunggu tempat di queue output
+    """
+    def __init__(self, name, fn, inbox, outbox, pipeline, finish=None):
+        self.name = name
+        self.fn = fn
+        self.finish = finish
+        self.inbox = inbox
+        self.outbox = outbox
+        self.pipeline = pipeline
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_seconds = 0.0
+        self.starved_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.depth_total = 0
+        self.depth_max = 0
+
+    def put(self, item):
+        start = time.perf_counter()
+        while not self.pipeline.failed.is_set():
+            try:
+                self.outbox.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self.blocked_seconds += time.perf_counter() - start
+
+    def get(self):
+        depth = self.inbox.qsize()
+        self.depth_total += depth
+        self.depth_max = max(self.depth_max, depth)
+        start = time.perf_counter()
+        while not self.pipeline.failed.is_set():
+            try:
+                item = self.inbox.get(timeout=0.1)
+                break
+            except queue.Empty:
+                pass
+        else:
+            item = DONE
+        self.starved_seconds += time.perf_counter() - start
+        return item
+
+    def consume(self, fn, *args):
+        """Jalankan fn (dan iterable hasilnya) sambil memisahkan waktu sibuk dari waktu menunggu queue output"""
+        start = time.perf_counter()
+        outputs = iter(fn(*args))
+        self.busy_seconds += time.perf_counter() - start
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(outputs)
+            except StopIteration:
+                self.busy_seconds += time.perf_counter() - start
+                return
+            self.busy_seconds += time.perf_counter() - start
+            self.items_out += 1
+            if self.outbox is not None:
+                self.put(item)
+
+    def run(self):
+        try:
+            if self.inbox is None:
+                self.consume(self.fn)
+            else:
+                while True:
+                    item = self.get()
+                    if item is DONE:
+                        break
+                    self.items_in += 1
+                    self.consume(self.fn, item)
+            if self.finish is not None and not self.pipeline.failed.is_set():
+                self.consume(self.finish)
+        except BaseException as e:
+            self.pipeline.fail(e)
+        finally:
+            if self.outbox is not None:
+                self.put(DONE)
+
+    def stats(self, elapsed):
+        gets = self.items_in + (1 if self.inbox is not None else 0)
+        return {'items_in': self.items_in, 'items_out': self.items_out,
+                'busy_s': self.busy_seconds, 'starved_s': self.starved_seconds,
+                'blocked_s': self.blocked_seconds,
+                'utilization': self.busy_seconds / elapsed if elapsed else 0.0,
+                'throughput_per_s': (self.items_in or self.items_out) / elapsed if elapsed else 0.0,
+                'queue_depth_mean': self.depth_total / gets if self.inbox is not None else 0.0,
+                'queue_depth_max': self.depth_max}
+
+class Pipeline:
+    """
+    Rangkaian Stage yang dijalankan dengan run(). Jika salah satu stage
+    gagal, semua stage dihentikan dan exception-nya di-raise ulang oleh run().
+
+    Contoh:
+        pipeline = Pipeline()
+        pipeline.add_stage('read', read_files)
+        pipeline.add_stage('analyze', analyze, queue_size=256)
+        pipeline.run()
+        pipeline.stats()
+    """
+    def __init__(self, queue_size=64):
+        self.queue_size = queue_size
+        self.stages = []
+        self.failed = threading.Event()
+        self.error = None
+        self.elapsed = 0.0
+
+    def add_stage(self, name, fn, queue_size=None, finish=None):
+        """Tambahkan stage; queue_size membatasi queue antara stage sebelumnya dan stage ini"""
+        inbox = None
+        if self.stages:
+            inbox = queue.Queue(queue_size or self.queue_size)
+            self.stages[-1].outbox = inbox
+        self.stages.append(Stage(name, fn, inbox, None, self, finish))
+        return self
+
+    def fail(self, error):
+        if self.error is None:
+            self.error = error
+        self.failed.set()
+
+    def run(self):
+        start = time.perf_counter()
+        threads = [threading.Thread(target=stage.run, name='pipeline-' + stage.name, daemon=True)
+                   for stage in self.stages]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - start
+        if self.error is not None:
+            raise self.error
+
+    def stats(self):
+        """Metrik per stage (lihat Stage.stats) dan total waktu pipeline"""
+        stats = {stage.name: stage.stats(self.elapsed) for stage in self.stages}
+        stats['elapsed_s'] = self.elapsed
+        stats['bottleneck'] = self.bottleneck()
+        return stats
+
+    def bottleneck(self):
+        """Nama stage dengan waktu sibuk terbesar"""
+        return max(self.stages, key=lambda stage: stage.busy_seconds).name if self.stages else None
+
+
+if __name__ == '__main__':
+
+    results = []
+    pipeline = Pipeline(queue_size=2)
+    pipeline.add_stage('source', lambda: iter(range(100)))
+    pipeline.add_stage('square', lambda x: [x * x])
+    held = []
+    pipeline.add_stage('even', lambda x: [x] if x % 2 == 0 else held.append(x) or [], finish=lambda: held[-1:])
+    pipeline.add_stage('sink', lambda x: results.append(x) or ())
+    pipeline.run()
+    assert results == [x * x for x in range(0, 100, 2)] + [99 * 99], "urutan atau isi hasil pipeline salah"
+    stats = pipeline.stats()
+    assert stats['square']['items_in'] == 100 and stats['even']['items_out'] == 51, "metrik pipeline salah"
+    assert stats['sink']['queue_depth_max'] <= 2, "queue melebihi batas"
+
+    def slow(x):
+        time.sleep(0.002)
+        return [x]
+    pipeline = Pipeline(queue_size=4)
+    pipeline.add_stage('source', lambda: iter(range(50)))
+    pipeline.add_stage('slow', slow)
+    pipeline.add_stage('sink', lambda x: ())
+    pipeline.run()
+    assert pipeline.bottleneck() == 'slow', "bottleneck salah"
+
+    def broken(x):
+        if x == 10:
+            raise ValueError("rusak")
+        return [x]
+    pipeline = Pipeline(queue_size=1)
+    pipeline.add_stage('source', lambda: iter(range(1000)))
+    pipeline.add_stage('broken', broken)
+    pipeline.add_stage('sink', lambda x: ())
+    try:
+        pipeline.run()
+        assert False, "exception dari stage harus di-raise ulang"
+    except ValueError:
+        pass
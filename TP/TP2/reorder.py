@@ -0,0 +1,171 @@
+"""
+Reassignment docID supaya dokumen yang mirip (berbagi banyak term) mendapat
+docID yang berdekatan. Gap di postings list menjadi lebih kecil dan lebih
+seragam, sehingga encoding berbasis gap (VBE, Simple8b, Elias-Gamma)
+menghasilkan index yang lebih kecil dan lebih cepat di-decode.
+
+Dua metode untuk menghitung urutan dokumen yang baru:
+
+    bisection : recursive graph bisection (Dhulipala dkk., KDD 2016). Dokumen
+                dibagi dua secara rekursif; di setiap level, pasangan dokumen
+                ditukar antar bagian selama menurunkan perkiraan biaya log-gap
+                seluruh postings list. Hasilnya paling baik, tetapi biayanya
+                O(iterations * postings * log(n_docs)).
+    minhash   : dokumen diurutkan berdasarkan signature MinHash atas himpunan
+                term-nya. Jauh lebih murah dan tetap mengelompokkan dokumen
+                yang berbagi term langka.
+
+Term dengan df = 1 diabaikan karena tidak memengaruhi gap mana pun. Urutan
+dikembalikan sebagai list docID lama; reassign_doc_ids(...) menulis ulang
+index dengan docID baru.
+"""
+import math
+import os
+import random
+from collections import Counter
+
+from index import InvertedIndexReader, InvertedIndexWriter
+
+METHODS = ('bisection', 'minhash')
+
+def load_postings_lists(reader, min_df=2):
+    """dict termID -> postings list untuk semua term dengan df >= min_df"""
+    return {term: reader.get_postings_list(term) for term in reader.terms
+            if reader.postings_dict[term][1] >= min_df}
+
+def minhash_order(postings_lists, n_docs, n_hashes=4, seed=0):
+    """
+    Urutan docID (lama) berdasarkan signature MinHash dengan n_hashes
+    permutasi acak atas term. Untuk setiap permutasi, term dikunjungi sesuai
+    urutan acaknya dan dokumen yang belum punya nilai mendapat peringkat term
+    tersebut (yaitu minimum peringkat term di dokumen itu); kunjungan
+    berhenti begitu semua dokumen yang punya term sudah mendapat nilai.
+    """
+    rng = random.Random(seed)
+    terms = sorted(postings_lists)
+    covered = len({doc_id for postings in postings_lists.values() for doc_id in postings})
+    signatures = [[len(terms)] * n_hashes for _ in range(n_docs + 1)]
+    for i in range(n_hashes):
+        rng.shuffle(terms)
+        remaining = covered
+        for rank, term in enumerate(terms):
+            for doc_id in postings_lists[term]:
+                if signatures[doc_id][i] == len(terms):
+                    signatures[doc_id][i] = rank
+                    remaining -= 1
+            if remaining == 0:
+                break
+    return sorted(range(1, n_docs + 1), key=signatures.__getitem__)
+
+def bisection_order(postings_lists, n_docs, iterations=20, leaf_size=16, initial=None):
+    """
+    Urutan docID (lama) hasil recursive graph bisection, dimulai dari urutan
+    initial (default: urutan docID sekarang).
+    """
+    forward = [[] for _ in range(n_docs + 1)]
+    for term, postings in postings_lists.items():
+        for doc_id in postings:
+            forward[doc_id].append(term)
+    log2 = [0.0] + [math.log2(i) for i in range(1, n_docs + 2)]
+
+    def move_gains(part, degrees, other_degrees, n, n_other):
+        # Penurunan biaya jika satu dokumen dari part pindah ke bagian lain:
+        # biaya term = d * log2(n / (d + 1)) + d' * log2(n' / (d' + 1))
+        log_n, log_other = log2[n], log2[n_other]
+        delta = {}
+        for term, d in degrees.items():
+            d_other = other_degrees.get(term, 0)
+            before = d * (log_n - log2[d + 1]) + d_other * (log_other - log2[d_other + 1])
+            after = (d - 1) * (log_n - log2[d]) + (d_other + 1) * (log_other - log2[d_other + 2])
+            delta[term] = before - after
+        return sorted(((sum(map(delta.__getitem__, forward[doc_id])), doc_id) for doc_id in part), reverse=True)
+
+    def partition(docs):
+        if len(docs) <= leaf_size:
+            return docs
+        left, right = docs[:len(docs) // 2], docs[len(docs) // 2:]
+        for _ in range(iterations):
+            left_degrees = Counter(term for doc_id in left for term in forward[doc_id])
+            right_degrees = Counter(term for doc_id in right for term in forward[doc_id])
+            left_gains = move_gains(left, left_degrees, right_degrees, len(left), len(right))
+            right_gains = move_gains(right, right_degrees, left_degrees, len(right), len(left))
+            swapped = 0
+            for (left_gain, _), (right_gain, _) in zip(left_gains, right_gains):
+                if left_gain + right_gain <= 0:
+                    break
+                swapped += 1
+            if swapped == 0:
+                break
+            left = [doc_id for _, doc_id in right_gains[:swapped]] + [doc_id for _, doc_id in left_gains[swapped:]]
+            right = [doc_id for _, doc_id in left_gains[:swapped]] + [doc_id for _, doc_id in right_gains[swapped:]]
+        return partition(left) + partition(right)
+
+    return partition(list(initial) if initial is not None else list(range(1, n_docs + 1)))
+
+def compute_order(postings_lists, n_docs, method='bisection'):
+    if method == 'bisection':
+        return bisection_order(postings_lists, n_docs)
+    if method == 'minhash':
+        return minhash_order(postings_lists, n_docs)
+    raise ValueError("metode reordering {!r} tidak dikenal, pilih salah satu dari {}".format(method, METHODS))
+
+def new_doc_ids(order):
+    """Kebalikan dari order: list dengan new_ids[docID lama] = docID baru"""
+    new_ids = [0] * (len(order) + 1)
+    for new_id, old_id in enumerate(order, 1):
+        new_ids[old_id] = new_id
+    return new_ids
+
+def reassign_doc_ids(index_name, postings_encoding, path, new_ids):
+    """
+    Tulis ulang index index_name dengan docID baru (new_ids[docID lama]).
+    Postings list (dan tf list, jika ada) diurutkan ulang sesuai docID
+    barunya; index baru ditulis ke file sementara lalu menggantikan yang lama.
+    """
+    tmp_name = index_name + '_reordered'
+    with InvertedIndexReader(index_name, postings_encoding, path=path) as reader, \
+            InvertedIndexWriter(tmp_name, postings_encoding, path=path) as writer:
+        with_tf = bool(reader.tf_dict)
+        for term in reader.terms:
+            postings = [new_ids[doc_id] for doc_id in reader.get_postings_list(term)]
+            if with_tf:
+                pairs = sorted(zip(postings, reader.get_tf_list(term)))
+                writer.append(term, [doc_id for doc_id, _ in pairs], [tf for _, tf in pairs])
+            else:
+                postings.sort()
+                writer.append(term, postings)
+    for ext in ('.index', '.dict'):
+        os.replace(os.path.join(path, tmp_name + ext), os.path.join(path, index_name + ext))
+
+
+if __name__ == '__main__':
+
+    import tempfile
+
+    from compression import VBEPostings
+
+    # Dua kelompok dokumen dengan docID acak: kelompok pertama berbagi term
+    # 1..4, kelompok kedua berbagi term 5..8
+    n_docs = 64
+    group = set(random.Random(1).sample(range(1, n_docs + 1), n_docs // 2))
+    other = set(range(1, n_docs + 1)) - group
+    postings_lists = {term: sorted(group if term <= 4 else other) for term in range(1, 9)}
+    for method in METHODS:
+        order = compute_order(postings_lists, n_docs, method)
+        assert sorted(order) == list(range(1, n_docs + 1)), "order harus permutasi docID"
+        assert set(order[:n_docs // 2]) in (group, other), "{} harus mengelompokkan dokumen yang mirip".format(method)
+    try:
+        compute_order(postings_lists, n_docs, 'random')
+        assert False, "metode yang tidak dikenal harus ditolak"
+    except ValueError:
+        pass
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with InvertedIndexWriter('test', VBEPostings, path=tmp_dir) as index:
+            index.append(1, [1, 2, 4], [3, 1, 2])
+            index.append(5, [3, 4], [1, 7])
+        reassign_doc_ids('test', VBEPostings, tmp_dir, new_doc_ids([4, 3, 2, 1]))
+        with InvertedIndexReader('test', VBEPostings, path=tmp_dir) as reader:
+            assert reader.terms == [1, 5], "urutan term harus tetap"
+            assert reader.get_postings_list(1) == [1, 3, 4] and reader.get_tf_list(1) == [2, 1, 3], "reassign salah"
+            assert reader.get_postings_list(5) == [1, 2] and reader.get_tf_list(5) == [7, 1], "reassign salah"
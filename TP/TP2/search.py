@@ -25,19 +25,22 @@ for query in queries:
     print("Query  : ", query)
     print("Results:")
     res = BSBI_instance.boolean_retrieve(query)
-    print(len(res), "results found")
-    if len(res) > 0:
+    print(res.count(), "results found")
+    if res.count() > 0:
         print(res[0], res[-1])
     # for doc in BSBI_instance.boolean_retrieve(query):
     #     print(doc)
+    # Trace evaluasi per operand dan operator (df, bytes, waktu decode, ukuran input/output)
+    # from bsbi import format_explain
+    # print(format_explain(BSBI_instance.explain(query)[0]))
     print()
 
 for query in queries:
     print("Query  : ", query)
     print("Results:")
     res = BSBI_instance_simple8b.boolean_retrieve(query)
-    print(len(res), "results found")
-    if len(res) > 0:
+    print(res.count(), "results found")
+    if res.count() > 0:
         print(res[0], res[-1])
     # for doc in BSBI_instance_simple8b.boolean_retrieve(query):
     #     print(doc)
@@ -48,8 +51,8 @@ for query in queries:
     print("Query  : ", query)
     print("Results:")
     res = BSBI_instance_elias_gamma.boolean_retrieve(query)
-    print(len(res), "results found")
-    if len(res) > 0:
+    print(res.count(), "results found")
+    if res.count() > 0:
         print(res[0], res[-1])
     # for doc in BSBI_instance_simple8b.boolean_retrieve(query):
     #     print(doc)
@@ -0,0 +1,364 @@
+"""
+Format segment: satu file yang berisi seluruh index (postings, dictionary,
+term table, dan doc table), menggantikan pasangan .index + .dict beserta
+terms.dict dan docs.dict.
+
+Layout (versi 2, semua integer little-endian):
+
+    header   : MAGIC (8 byte) | versi (u32) | flags (u32)
+    POSTINGS : postings list dan tf list ter-encode, disalin apa adanya dari
+               index hasil merge
+    DICTIONARY : record fixed-width per termID (di-index langsung dengan
+               termID): posisi postings (u64), n_postings (u32), panjang
+               postings (u32), posisi tf (u64), panjang tf (u32)
+    TERMS    : count (u32) | offsets (u32 * (count + 1)) | termID terurut
+               berdasarkan string term (u32 * count) | blob UTF-8
+    DOCS     : doc table kolumnar (lihat doctable.py); pada versi 1 section
+               ini berformat sama seperti TERMS tanpa urutan terurut
+    META     : JSON (encoding, n_terms, n_docs, has_tf)
+    footer   : per section: kind (u32), offset (u64), length (u64), crc32 (u32)
+    trailer  : n_sections (u32) | crc32 footer (u32) | versi (u32) | MAGIC
+
+Saat dibuka, hanya trailer, footer, dan META yang dibaca; section lain
+diakses langsung lewat mmap dengan offset (O(1) untuk termID/docID, binary
+search untuk string term). Checksum section besar hanya diperiksa oleh
+verify(). File ditulis ke file sementara lalu di-rename, sehingga crash di
+tengah penulisan tidak meninggalkan segment yang setengah jadi. Segment
+versi 1 tetap bisa dibaca.
+"""
+import json
+import mmap
+import os
+import struct
+import zlib
+from collections.abc import Mapping
+
+from doctable import DocTable, doc_table_bytes
+
+MAGIC = b'IRSEGMNT'
+VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+FLAG_HAS_TF = 1
+
+HEADER = struct.Struct('<8sII')
+SECTION = struct.Struct('<IQQI')
+TRAILER = struct.Struct('<III8s')
+RECORD = struct.Struct('<QIIQI')
+U32 = struct.Struct('<I')
+
+POSTINGS, DICTIONARY, TERMS, DOCS, META = range(5)
+SECTION_NAMES = ['postings', 'dictionary', 'terms', 'docs', 'meta']
+
+COPY_BUFFER_SIZE = 1 << 20
+
+def segment_file_path(index_name, path):
+    return os.path.join(path, index_name + '.seg')
+
+class SegmentError(ValueError):
+    """File segment rusak, terpotong, atau versinya tidak dikenali"""
+
+class SegmentDictionary(Mapping):
+    """
+    Pengganti postings_dict (atau tf_dict jika tf=True) yang membaca record
+    DICTIONARY langsung dari mmap. Iterasi menghasilkan termID secara terurut,
+    sama seperti urutan terms di index hasil merge.
+    """
+    def __init__(self, buffer, offset, count, n_terms, tf=False):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+        self.n_terms = n_terms
+        self.tf = tf
+
+    def __record(self, term):
+        if not isinstance(term, int) or not 0 <= term < self.count:
+            return None
+        record = RECORD.unpack_from(self.buffer, self.offset + term * RECORD.size)
+        if record[1] == 0:
+            return None
+        return record
+
+    def __getitem__(self, term):
+        record = self.__record(term)
+        if record is None or (self.tf and record[4] == 0):
+            raise KeyError(term)
+        if self.tf:
+            return (record[3], record[4])
+        return record[:3]
+
+    def __contains__(self, term):
+        record = self.__record(term)
+        return record is not None and (not self.tf or record[4] > 0)
+
+    def __iter__(self):
+        for term in range(self.count):
+            if term in self:
+                yield term
+
+    def __len__(self):
+        return self.n_terms
+
+class SegmentStringTable:
+    """
+    Tabel string (term atau nama dokumen) di section TERMS/DOCS. Id ke string
+    O(1) lewat offsets; jika tabel menyimpan urutan terurut (TERMS), string ke
+    id dengan binary search. Antarmukanya sama seperti IdMap yang read-only:
+    table[id], table[string], string in table.str_to_id, len(table).
+    """
+    def __init__(self, buffer, offset, sorted_index):
+        self.buffer = buffer
+        (self.count,) = U32.unpack_from(buffer, offset)
+        self.offsets_start = offset + U32.size
+        self.sorted_start = self.offsets_start + 4 * (self.count + 1)
+        self.blob_start = self.sorted_start + (4 * self.count if sorted_index else 0)
+        self.sorted_index = sorted_index
+        self.str_to_id = self
+
+    def __len__(self):
+        return self.count
+
+    def string(self, i):
+        # id dimulai dari 1, seperti di IdMap
+        if not 1 <= i <= self.count:
+            raise IndexError(i)
+        start, end = struct.unpack_from('<II', self.buffer, self.offsets_start + 4 * (i - 1))
+        return str(self.buffer[self.blob_start + start:self.blob_start + end], 'utf-8')
+
+    def sorted_id(self, rank):
+        return U32.unpack_from(self.buffer, self.sorted_start + 4 * rank)[0]
+
+    def find(self, s):
+        """id dari string s, atau None"""
+        if not self.sorted_index:
+            raise TypeError("tabel ini tidak menyimpan index string -> id")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.string(self.sorted_id(mid)) < s:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self.string(self.sorted_id(lo)) == s:
+            return self.sorted_id(lo)
+        return None
+
+    def __contains__(self, s):
+        return isinstance(s, str) and self.find(s) is not None
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            i = self.find(key)
+            if i is None:
+                raise KeyError(key)
+            return i
+        return self.string(key)
+
+    def __iter__(self):
+        for i in range(1, self.count + 1):
+            yield self.string(i)
+
+class Segment:
+    """
+    File segment yang sudah dibuka: satu open, satu mmap, lalu trailer,
+    footer, dan META dibaca dan diverifikasi.
+
+    Attributes
+    ----------
+    postings_dict (SegmentDictionary)
+    tf_dict (SegmentDictionary): kosong jika index tidak menyimpan tf
+    term_map (SegmentStringTable): pengganti term_id_map
+    doc_table (DocTable): pengganti doc_id_map (SegmentStringTable untuk
+                          segment versi 1)
+    meta (dict)
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.file = open(file_path, 'rb')
+        try:
+            self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise SegmentError("segment kosong: {}".format(file_path))
+        try:
+            self.__read_footer()
+        except (SegmentError, struct.error):
+            self.close()
+            raise
+
+    def __read_footer(self):
+        size = len(self.buffer)
+        if size < HEADER.size + TRAILER.size:
+            raise SegmentError("segment terpotong: {}".format(self.file_path))
+        magic, self.version, self.flags = HEADER.unpack_from(self.buffer, 0)
+        n_sections, footer_crc, trailer_version, trailer_magic = TRAILER.unpack_from(self.buffer, size - TRAILER.size)
+        if magic != MAGIC or trailer_magic != MAGIC:
+            raise SegmentError("bukan file segment: {}".format(self.file_path))
+        if self.version not in SUPPORTED_VERSIONS or trailer_version != self.version:
+            raise SegmentError("versi segment {} tidak didukung".format(self.version))
+        footer_start = size - TRAILER.size - n_sections * SECTION.size
+        if footer_start < HEADER.size or zlib.crc32(self.buffer[footer_start:size - TRAILER.size]) != footer_crc:
+            raise SegmentError("footer segment rusak: {}".format(self.file_path))
+        self.sections = {}
+        for i in range(n_sections):
+            kind, offset, length, crc = SECTION.unpack_from(self.buffer, footer_start + i * SECTION.size)
+            if offset + length > footer_start:
+                raise SegmentError("section {} di luar file".format(SECTION_NAMES[kind]))
+            self.sections[kind] = (offset, length, crc)
+        self.verify_section(META)
+        offset, length, _ = self.sections[META]
+        self.meta = json.loads(str(self.buffer[offset:offset + length], 'utf-8'))
+
+        offset, length, _ = self.sections[DICTIONARY]
+        n_records = length // RECORD.size
+        self.postings_dict = SegmentDictionary(self.buffer, offset, n_records, self.meta['n_terms'])
+        self.tf_dict = (SegmentDictionary(self.buffer, offset, n_records, self.meta['n_terms'], tf=True)
+                        if self.flags & FLAG_HAS_TF else {})
+        self.term_map = SegmentStringTable(self.buffer, self.sections[TERMS][0], sorted_index=True)
+        if self.version == 1:
+            self.doc_table = SegmentStringTable(self.buffer, self.sections[DOCS][0], sorted_index=False)
+        else:
+            self.doc_table = DocTable(self.buffer, self.sections[DOCS][0])
+
+    def verify_section(self, kind):
+        offset, length, crc = self.sections[kind]
+        if zlib.crc32(self.buffer[offset:offset + length]) != crc:
+            raise SegmentError("checksum section {} tidak cocok".format(SECTION_NAMES[kind]))
+
+    def verify(self):
+        """Periksa checksum semua section (membaca seluruh file)"""
+        for kind in self.sections:
+            self.verify_section(kind)
+
+    def close(self):
+        try:
+            self.buffer.close()
+        except BufferError:
+            # Masih ada memoryview (misal postings_cursor) yang memakai mmap
+            pass
+        self.file.close()
+
+def string_table_bytes(strings, sorted_index):
+    """Serialisasi list of strings (id = posisi + 1) menjadi isi section TERMS (dan DOCS versi 1)"""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = [0]
+    for e in encoded:
+        offsets.append(offsets[-1] + len(e))
+    parts = [U32.pack(len(encoded)), struct.pack('<{}I'.format(len(offsets)), *offsets)]
+    if sorted_index:
+        order = sorted(range(len(strings)), key=strings.__getitem__)
+        parts.append(struct.pack('<{}I'.format(len(order)), *[i + 1 for i in order]))
+    parts.append(b''.join(encoded))
+    return b''.join(parts)
+
+def write_segment(file_path, reader, term_strings, doc_strings, doc_columns=None):
+    """
+    Tulis segment dari InvertedIndexReader yang sudah terbuka (index hasil
+    merge), list string term/dokumen (id = posisi + 1), dan kolom per dokumen
+    untuk doc table (lihat doc_table_bytes). Ditulis ke <file_path>.tmp,
+    di-fsync, lalu di-rename secara atomik.
+    """
+    tmp_path = file_path + '.tmp'
+    sections = []
+    has_tf = bool(reader.tf_dict)
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, FLAG_HAS_TF if has_tf else 0))
+
+        def write_section(kind, chunks):
+            offset, crc, length = f.tell(), 0, 0
+            for chunk in chunks:
+                f.write(chunk)
+                crc = zlib.crc32(chunk, crc)
+                length += len(chunk)
+            sections.append((kind, offset, length, crc))
+
+        def copy_postings():
+            reader.index_file.seek(0)
+            while True:
+                chunk = reader.index_file.read(COPY_BUFFER_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+        postings_start = f.tell()
+        write_section(POSTINGS, copy_postings())
+
+        n_records = max(reader.postings_dict, default=-1) + 1
+        records = bytearray(RECORD.size * n_records)
+        for term, (position, n_postings, length_in_bytes) in reader.postings_dict.items():
+            tf_position, tf_length = reader.tf_dict.get(term, (-postings_start, 0))
+            RECORD.pack_into(records, term * RECORD.size, postings_start + position, n_postings,
+                             length_in_bytes, postings_start + tf_position, tf_length)
+        write_section(DICTIONARY, [bytes(records)])
+        write_section(TERMS, [string_table_bytes(term_strings, sorted_index=True)])
+        write_section(DOCS, [doc_table_bytes(doc_strings, doc_columns)])
+        meta = {'encoding': reader.encoding_method.__name__, 'n_terms': len(reader.postings_dict),
+                'n_docs': len(doc_strings), 'has_tf': has_tf}
+        write_section(META, [json.dumps(meta).encode('utf-8')])
+
+        footer = b''.join(SECTION.pack(*section) for section in sections)
+        f.write(footer)
+        f.write(TRAILER.pack(len(sections), zlib.crc32(footer), VERSION, MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+    directory = os.open(os.path.dirname(os.path.abspath(file_path)), os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+if __name__ == '__main__':
+
+    import array
+    import tempfile
+
+    from compression import VBEPostings
+    from index import InvertedIndexReader, InvertedIndexWriter
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with InvertedIndexWriter('test', VBEPostings, path=tmp_dir) as index:
+            index.append(1, [2, 3, 4, 8, 10], [1, 3, 1, 2, 7])
+            index.append(3, [3, 4, 5], [2, 2, 1])
+        with InvertedIndexReader('test', VBEPostings, path=tmp_dir) as reader:
+            write_segment(segment_file_path('test', tmp_dir), reader, ['quantum', 'cosmolog', 'geodes'],
+                          ['0/a.txt', '0/b.txt', '1/c.txt', '1/d.txt', '2/e.txt', '2/f.txt', '3/g.txt',
+                           '3/h.txt', '4/i.txt', '4/j.txt'], {'length': array.array('I', range(10, 20))})
+        os.remove(os.path.join(tmp_dir, 'test.index'))
+        os.remove(os.path.join(tmp_dir, 'test.dict'))
+
+        segment = Segment(segment_file_path('test', tmp_dir))
+        segment.verify()
+        assert segment.term_map[1] == 'quantum' and segment.term_map['geodes'] == 3, "term table salah"
+        assert 'cosmolog' in segment.term_map.str_to_id and 'x' not in segment.term_map.str_to_id, "term table salah"
+        assert len(segment.term_map) == 3 and segment.doc_table[10] == '4/j.txt', "doc table salah"
+        assert segment.doc_table.column('length')[10] == 19, "kolom doc table salah"
+        assert list(segment.postings_dict) == [1, 3] and 2 not in segment.postings_dict, "dictionary salah"
+        assert segment.postings_dict[3][1:] == (3, len(VBEPostings.encode([3, 4, 5]))), "dictionary salah"
+        segment.close()
+
+        # InvertedIndexReader membuka segment jika pasangan .index/.dict tidak ada
+        with InvertedIndexReader('test', VBEPostings, path=tmp_dir) as reader:
+            assert reader.get_postings_list(1) == [2, 3, 4, 8, 10], "postings dari segment salah"
+            assert list(reader.postings_cursor(3)) == [3, 4, 5], "postings dari segment salah"
+            assert reader.get_tf_list(1) == [1, 3, 1, 2, 7], "tf dari segment salah"
+            assert list(reader) == [(1, [2, 3, 4, 8, 10]), (3, [3, 4, 5])], "iterasi segment salah"
+
+        # Segment yang rusak harus ditolak saat dibuka atau diverifikasi
+        with open(segment_file_path('test', tmp_dir), 'r+b') as f:
+            f.seek(HEADER.size)
+            f.write(b'\xff')
+        segment = Segment(segment_file_path('test', tmp_dir))
+        try:
+            segment.verify()
+            assert False, "checksum postings seharusnya tidak cocok"
+        except SegmentError:
+            pass
+        segment.close()
+        with open(segment_file_path('test', tmp_dir), 'r+b') as f:
+            f.truncate(os.path.getsize(segment_file_path('test', tmp_dir)) - 3)
+        try:
+            Segment(segment_file_path('test', tmp_dir))
+            assert False, "segment terpotong seharusnya ditolak"
+        except SegmentError:
+            pass
@@ -0,0 +1,316 @@
+"""
+Query server lokal untuk boolean retrieval, lewat HTTP (TCP atau Unix socket).
+
+Front end asyncio menerima banyak koneksi sekaligus dan memasukkan request ke
+antrian yang dibatasi (max_queue); jika antrian penuh, request langsung
+ditolak dengan 503 (backpressure). Beberapa dispatcher mengambil request dari
+antrian dalam bentuk batch dan mengirimkannya ke pool worker process. Setiap
+worker membuka index sekali (read-only, di-mmap) saat start dan mengevaluasi
+batch secara berurutan; query yang sama di dalam satu batch hanya dievaluasi
+sekali. Banyaknya worker menentukan banyaknya core yang terpakai.
+
+Dengan --snapshots, output_path adalah direktori snapshot (lihat
+snapshot.py). Setiap worker memeriksa CURRENT setiap --reload-interval detik,
+membuka dan me-warm snapshot baru di background, lalu berpindah ke snapshot
+itu tanpa restart; respons /search menyertakan generation snapshot-nya.
+
+Endpoint:
+    GET  /search?q=<query>&offset=0&limit=10[&did_you_mean=1]
+    POST /search   body JSON {"query": ..., "offset": 0, "limit": 10, "did_you_mean": false}
+    GET  /stats
+
+Respons /search berisi jumlah dokumen yang cocok (count) dan satu halaman
+nama dokumen (results).
+
+Contoh:
+    python server.py index_vb --workers 4 --port 8080
+    python server.py index_vb --unix /tmp/boolean_retrieval.sock
+    python server.py index_live --snapshots --reload-interval 1 --postings-cache-mb 64
+    curl 'http://127.0.0.1:8080/search?q=quantum+AND+geodesics&limit=5'
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+
+from compression import ENCODINGS
+from util import SearchResult
+
+MAX_LIMIT = 1000
+
+# QueryWorker milik worker process ini, dibuat oleh init_worker(...)
+worker = None
+
+class QueryWorker:
+    """
+    State sebuah worker process: BSBIIndex dengan term_id_map dan doc_id_map
+    yang sudah dimuat dan reader merged index yang tetap terbuka (di-mmap).
+    Untuk index yang di-shard, shard dibuka per query oleh BSBIIndex.
+    Jika snapshots=True, query dilayani oleh SnapshotSearcher yang berpindah
+    ke snapshot baru secara otomatis.
+    """
+    def __init__(self, output_path, postings_encoding, index_name, snapshots=False, reload_interval=1.0,
+                 postings_cache_bytes=0):
+        self.searcher = None
+        if snapshots:
+            from snapshot import SnapshotSearcher
+            self.searcher = SnapshotSearcher(output_path, postings_encoding, index_name, postings_cache_bytes)
+            self.searcher.watch(reload_interval)
+            return
+        from bsbi import BSBIIndex
+        # Request sudah diparalelkan antar worker, sehingga shard dievaluasi di process ini
+        self.index = BSBIIndex(None, output_path, postings_encoding, index_name, shard_workers=1)
+        self.index.load()
+        self.reader = None if self.index.shards else self.index.open_reader(use_mmap=True).__enter__()
+
+    def search(self, query, offset, limit, did_you_mean):
+        if self.searcher is not None:
+            return self.searcher.search(query, offset, limit, did_you_mean)
+        result = SearchResult(self.index.boolean_postings(query, self.reader, did_you_mean), self.index.doc_id_map)
+        return {'query': query, 'count': result.count(), 'offset': offset, 'limit': limit,
+                'results': result.page(offset, limit)}
+
+    def run_batch(self, requests):
+        """
+        Evaluasi satu batch request (dict dengan key query, offset, limit,
+        did_you_mean). Mengembalikan list (HTTP status, body) sejajar dengan
+        requests.
+        """
+        responses = []
+        evaluated = {}
+        for request in requests:
+            key = (request['query'], request['offset'], request['limit'], request['did_you_mean'])
+            if key not in evaluated:
+                try:
+                    evaluated[key] = (200, self.search(*key))
+                except (ValueError, IndexError, KeyError) as e:
+                    # Query yang tidak valid (misal kurung tidak seimbang)
+                    evaluated[key] = (400, {'query': request['query'], 'error': str(e) or 'Invalid query syntax.'})
+            responses.append(evaluated[key])
+        return responses
+
+def init_worker(output_path, encoding, index_name, snapshots=False, reload_interval=1.0, postings_cache_bytes=0):
+    global worker
+    worker = QueryWorker(output_path, ENCODINGS[encoding], index_name, snapshots, reload_interval,
+                         postings_cache_bytes)
+
+def run_batch(requests):
+    return worker.run_batch(requests)
+
+def ping():
+    return os.getpid()
+
+class QueryServer:
+    """
+    Front end asyncio dari query server.
+
+    Attributes
+    ----------
+    workers (int): banyaknya worker process (dan dispatcher)
+    max_batch (int): ukuran batch maksimum yang dikirim ke satu worker
+    batch_wait (float): waktu tunggu (detik) untuk mengumpulkan batch jika
+                    antrian belum cukup untuk satu batch penuh
+    queue (asyncio.Queue): antrian request yang dibatasi max_queue
+    snapshots (bool): output_path adalah direktori snapshot yang di-reload
+                    otomatis setiap reload_interval detik (lihat snapshot.py)
+    """
+    def __init__(self, output_path, encoding='vb', index_name='main_index', workers=None,
+                 max_batch=32, batch_wait=0.0, max_queue=1024, snapshots=False, reload_interval=1.0,
+                 postings_cache_bytes=0):
+        self.output_path = output_path
+        self.encoding = encoding
+        self.index_name = index_name
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.max_queue = max_queue
+        self.snapshots = snapshots
+        self.reload_interval = reload_interval
+        self.postings_cache_bytes = postings_cache_bytes
+        self.queue = None
+        self.pool = None
+        self.counters = {'requests': 0, 'rejected': 0, 'errors': 0, 'batches': 0, 'batched_requests': 0}
+        self.started = time.time()
+
+    async def start(self):
+        self.queue = asyncio.Queue(self.max_queue)
+        self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker,
+                                        initargs=(self.output_path, self.encoding, self.index_name, self.snapshots,
+                                                  self.reload_interval, self.postings_cache_bytes))
+        loop = asyncio.get_running_loop()
+        # Pastikan semua worker sudah membuka index sebelum menerima request
+        await asyncio.gather(*[loop.run_in_executor(self.pool, ping) for _ in range(self.workers)])
+        self.dispatchers = [asyncio.create_task(self.dispatch()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for dispatcher in self.dispatchers:
+            dispatcher.cancel()
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+    async def submit(self, request):
+        """Masukkan request ke antrian dan tunggu hasilnya; 503 jika antrian penuh"""
+        self.counters['requests'] += 1
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((request, future))
+        except asyncio.QueueFull:
+            self.counters['rejected'] += 1
+            return 503, {'error': 'Server overloaded, try again later.'}
+        return await future
+
+    async def dispatch(self):
+        """Ambil request dari antrian per batch dan evaluasi di worker process"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            if self.batch_wait > 0 and self.queue.qsize() < self.max_batch - 1:
+                await asyncio.sleep(self.batch_wait)
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            self.counters['batches'] += 1
+            self.counters['batched_requests'] += len(batch)
+            try:
+                responses = await loop.run_in_executor(self.pool, run_batch, [request for request, _ in batch])
+            except Exception as e:
+                self.counters['errors'] += len(batch)
+                responses = [(500, {'error': repr(e)})] * len(batch)
+            for (_, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response)
+
+    def stats(self):
+        stats = dict(self.counters)
+        stats['queued'] = self.queue.qsize()
+        stats['workers'] = self.workers
+        stats['mean_batch_size'] = self.counters['batched_requests'] / max(1, self.counters['batches'])
+        stats['uptime_s'] = time.time() - self.started
+        return stats
+
+    @staticmethod
+    def parse_int(params, name, default):
+        """Parameter bilangan bulat (int atau string angka); ValueError untuk tipe lain, misal null atau list"""
+        value = params.get(name, default)
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError("{} harus berupa bilangan bulat.".format(name))
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError("{} harus berupa bilangan bulat.".format(name))
+
+    @staticmethod
+    def parse_search_request(params):
+        """Validasi parameter /search menjadi dict request untuk worker"""
+        query = params.get('query', params.get('q'))
+        if not isinstance(query, str) or not query.strip():
+            raise ValueError("Parameter 'q' (atau 'query') wajib diisi.")
+        offset = QueryServer.parse_int(params, 'offset', 0)
+        limit = QueryServer.parse_int(params, 'limit', 10)
+        if offset < 0 or not 0 <= limit <= MAX_LIMIT:
+            raise ValueError("offset harus >= 0 dan limit di antara 0 dan {}.".format(MAX_LIMIT))
+        did_you_mean = params.get('did_you_mean', False)
+        if isinstance(did_you_mean, str):
+            did_you_mean = did_you_mean.lower() in ('1', 'true', 'yes')
+        return {'query': query, 'offset': offset, 'limit': limit, 'did_you_mean': bool(did_you_mean)}
+
+    async def route(self, method, target, body):
+        url = urllib.parse.urlsplit(target)
+        if url.path == '/stats' and method == 'GET':
+            return 200, self.stats()
+        if url.path != '/search':
+            return 404, {'error': 'Not found.'}
+        try:
+            if method == 'GET':
+                params = dict(urllib.parse.parse_qsl(url.query))
+            elif method == 'POST':
+                params = json.loads(body or b'{}')
+                if not isinstance(params, dict):
+                    raise ValueError("Body harus berupa JSON object.")
+            else:
+                return 405, {'error': 'Method not allowed.'}
+            request = self.parse_search_request(params)
+        except (TypeError, ValueError) as e:
+            return 400, {'error': str(e)}
+        return await self.submit(request)
+
+    async def handle_connection(self, reader, writer):
+        """Koneksi HTTP/1.1 (keep-alive didukung), satu request pada satu waktu"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                    body = await reader.readexactly(int(headers.get('content-length', 0)))
+                except ValueError:
+                    status, payload, keep_alive = 400, {'error': 'Bad request.'}, False
+                else:
+                    status, payload = await self.route(method, target, body)
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                data = json.dumps(payload).encode('utf-8')
+                writer.write("HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n"
+                             "Connection: {}\r\n\r\n".format(status, HTTP_REASONS.get(status, ''), len(data),
+                                                             'keep-alive' if keep_alive else 'close').encode('latin-1')
+                             + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self, host='127.0.0.1', port=8080, unix_path=None):
+        await self.start()
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+            print("Listening on unix:{} with {} workers".format(unix_path, self.workers))
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            print("Listening on http://{}:{} with {} workers".format(host, port, self.workers))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output_path', help='directory index, misal index_vb')
+    parser.add_argument('--encoding', choices=ENCODINGS, default='vb')
+    parser.add_argument('--index-name', default='main_index')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--unix', help='path Unix socket (menggantikan host/port)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--max-batch', type=int, default=32)
+    parser.add_argument('--batch-wait-ms', type=float, default=0.0)
+    parser.add_argument('--max-queue', type=int, default=1024)
+    parser.add_argument('--snapshots', action='store_true', help='output_path adalah direktori snapshot (CURRENT)')
+    parser.add_argument('--reload-interval', type=float, default=1.0, help='detik antar pemeriksaan CURRENT')
+    parser.add_argument('--postings-cache-mb', type=float, default=0, help='postings cache per worker (dengan --snapshots)')
+    args = parser.parse_args()
+
+    server = QueryServer(args.output_path, args.encoding, args.index_name, args.workers,
+                         args.max_batch, args.batch_wait_ms / 1000, args.max_queue, args.snapshots,
+                         args.reload_interval, int(args.postings_cache_mb * 1024 * 1024))
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
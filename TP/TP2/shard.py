@@ -0,0 +1,145 @@
+import contextlib
+import hashlib
+import math
+import os
+import pickle
+
+from index import InvertedIndexReader, InvertedIndexWriter
+
+class BloomFilter:
+    """
+    Bloom filter untuk himpunan termID. Dipakai untuk mengetahui bahwa sebuah
+    shard pasti tidak mengandung suatu term tanpa membuka index shard tersebut.
+    Posisi bit dihitung dengan double hashing dari satu digest blake2b.
+
+    Attributes
+    ----------
+    n_bits (int): ukuran bit array
+    n_hashes (int): banyaknya fungsi hash
+    bits (bytearray)
+    """
+    def __init__(self, n_items, false_positive_rate=0.01):
+        n_items = max(1, n_items)
+        self.n_bits = max(8, int(math.ceil(-n_items * math.log(false_positive_rate) / math.log(2) ** 2)))
+        self.n_hashes = max(1, int(round(self.n_bits / n_items * math.log(2))))
+        self.bits = bytearray((self.n_bits + 7) // 8)
+
+    def __positions(self, key):
+        digest = hashlib.blake2b(str(key).encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def add(self, key):
+        for position in self.__positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.__positions(key))
+
+class Shard:
+    """
+    Satu shard dari index yang dipartisi berdasarkan dokumen: index biasa
+    (output InvertedIndexWriter) bernama name yang hanya berisi docID di
+    [doc_id_start, doc_id_end), beserta Bloom filter dari term-termnya.
+    """
+    def __init__(self, name, doc_id_start, doc_id_end, bloom):
+        self.name = name
+        self.doc_id_start = doc_id_start
+        self.doc_id_end = doc_id_end
+        self.bloom = bloom
+
+    def __repr__(self):
+        return "Shard({!r}, docs [{}, {}))".format(self.name, self.doc_id_start, self.doc_id_end)
+
+def shards_file_path(index_name, path):
+    return os.path.join(path, index_name + '.shards')
+
+def save_shards(shards, index_name, path):
+    """Simpan manifest shard (termasuk Bloom filter setiap shard) ke <index_name>.shards"""
+    with open(shards_file_path(index_name, path), 'wb') as f:
+        pickle.dump(shards, f)
+
+def load_shards(index_name, path):
+    """List of Shard terurut berdasarkan docID, atau [] jika index tidak di-shard"""
+    try:
+        with open(shards_file_path(index_name, path), 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return []
+
+def build_shard(index_ids, shard_name, postings_encoding, path, doc_id_range, false_positive_rate=0.01):
+    """
+    Merge intermediate indices index_ids (yang docID-nya berada di
+    doc_id_range) menjadi satu shard. Berupa fungsi level modul supaya bisa
+    dijalankan di process pool.
+
+    Returns
+    -------
+    Shard
+    """
+    from bsbi import BSBIIndex
+    merger = BSBIIndex(None, path, postings_encoding, shard_name)
+    with InvertedIndexWriter(shard_name, postings_encoding, path=path) as shard_index:
+        with contextlib.ExitStack() as stack:
+            indices = [stack.enter_context(InvertedIndexReader(index_id, postings_encoding, path=path))
+                       for index_id in index_ids]
+            merger.merge_index(indices, shard_index)
+        bloom = BloomFilter(len(shard_index.terms), false_positive_rate)
+        for term in shard_index.terms:
+            bloom.add(term)
+    return Shard(shard_name, doc_id_range[0], doc_id_range[1], bloom)
+
+def might_match(tree, contains):
+    """
+    False jika hasil expression tree (dari util.postfix_to_tree) pasti kosong
+    pada shard yang term-termnya dicek dengan contains(term) (boleh false
+    positive, tidak boleh false negative).
+    """
+    if not isinstance(tree, tuple):
+        return contains(tree)
+    operator, children = tree[0], tree[1:]
+    if operator == 'AND':
+        return all(might_match(child, contains) for child in children)
+    if operator == 'OR':
+        return any(might_match(child, contains) for child in children)
+    # A DIFF B kosong jika A kosong
+    return might_match(children[0], contains)
+
+# BSBIIndex milik worker process ini, dibuat oleh init_shard_worker(...)
+shard_worker = None
+
+def init_shard_worker(output_path, postings_encoding, index_name):
+    global shard_worker
+    from bsbi import BSBIIndex
+    shard_worker = BSBIIndex(None, output_path, postings_encoding, index_name)
+    shard_worker.load()
+    shard_worker.shard_readers = {}
+
+def evaluate_on_shard(shard_name, postfix):
+    """Evaluasi query postfix pada satu shard di worker process; reader shard dibuka sekali per process"""
+    reader = shard_worker.shard_readers.get(shard_name)
+    if reader is None:
+        reader = InvertedIndexReader(shard_name, shard_worker.postings_encoding,
+                                     path=shard_worker.output_path, use_mmap=True).__enter__()
+        shard_worker.shard_readers[shard_name] = reader
+    return shard_worker.evaluate_postfix(postfix, reader)
+
+
+if __name__ == '__main__':
+
+    import random
+
+    bloom = BloomFilter(1000, 0.01)
+    for term in range(0, 2000, 2):
+        bloom.add(term)
+    assert all(term in bloom for term in range(0, 2000, 2)), "Bloom filter tidak boleh false negative"
+    false_positives = sum(term in bloom for term in range(1, 20001, 2))
+    assert false_positives < 0.03 * 10000, "false positive rate terlalu besar"
+
+    contains = {'a', 'b'}.__contains__
+    assert might_match(('AND', 'a', 'b'), contains), "might_match salah"
+    assert not might_match(('AND', 'a', 'c'), contains), "might_match salah"
+    assert might_match(('OR', 'c', ('AND', 'a', 'b')), contains), "might_match salah"
+    assert not might_match(('DIFF', 'c', 'a'), contains), "might_match salah"
+    assert might_match(('DIFF', 'a', 'c'), contains), "might_match salah"
@@ -0,0 +1,356 @@
+"""
+Snapshot index bernomor generasi untuk searcher yang berjalan lama, sehingga
+index bisa dibangun ulang tanpa me-restart searcher.
+
+Layout direktori root:
+
+    root/
+        CURRENT        nama snapshot yang aktif, misal "gen-000003"
+        gen-000002/    output_path sebuah BSBIIndex (semua file index)
+        gen-000003/
+
+Indexer membangun index di direktori snapshot baru (new_snapshot), lalu
+publish(...) mengganti isi CURRENT secara atomik (tulis file sementara,
+fsync, os.replace). Searcher tidak pernah melihat snapshot yang setengah
+jadi, dan snapshot lama tidak diubah sama sekali.
+
+SnapshotSearcher memegang snapshot yang aktif (BSBIIndex yang sudah
+di-load dan reader yang tetap terbuka). refresh() membuka snapshot baru di
+luar lock: memuat term/doc map, mengisi postings cache dengan term yang
+sedang populer di snapshot lama, dan menjalankan ulang query terakhir.
+Setelah itu snapshot aktif diganti dengan satu assignment. Query yang
+sedang berjalan tetap selesai di snapshot lama, yang baru ditutup setelah
+query terakhirnya selesai. watch(interval) menjalankan refresh() secara
+berkala di thread terpisah.
+
+Contoh:
+    path = new_snapshot('index_live')
+    BSBIIndex('arxiv_collections', path, VBEPostings).start_indexing()
+    publish('index_live', path)
+    prune('index_live', keep=2)
+"""
+import contextlib
+import os
+import shutil
+import threading
+import time
+from collections import deque
+
+from util import SearchResult
+
+CURRENT_FILE = 'CURRENT'
+SNAPSHOT_PREFIX = 'gen-'
+
+def snapshot_name(generation):
+    return '{}{:06d}'.format(SNAPSHOT_PREFIX, generation)
+
+def snapshot_generation(name):
+    """Generasi dari nama snapshot, atau None jika bukan nama snapshot"""
+    if name.startswith(SNAPSHOT_PREFIX) and name[len(SNAPSHOT_PREFIX):].isdigit():
+        return int(name[len(SNAPSHOT_PREFIX):])
+    return None
+
+def list_snapshots(root):
+    """Generasi semua direktori snapshot di root, terurut naik"""
+    if not os.path.isdir(root):
+        return []
+    return sorted(generation for generation in map(snapshot_generation, os.listdir(root))
+                  if generation is not None and os.path.isdir(os.path.join(root, snapshot_name(generation))))
+
+def current_snapshot(root):
+    """Generasi snapshot yang ditunjuk CURRENT, atau None jika belum ada yang di-publish"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), 'r') as f:
+            return snapshot_generation(f.read().strip())
+    except FileNotFoundError:
+        return None
+
+def new_snapshot(root):
+    """Buat direktori snapshot untuk generasi berikutnya dan kembalikan path-nya"""
+    os.makedirs(root, exist_ok=True)
+    generation = max(list_snapshots(root) + [current_snapshot(root) or 0]) + 1
+    path = os.path.join(root, snapshot_name(generation))
+    os.makedirs(path)
+    return path
+
+def publish(root, path):
+    """
+    Jadikan snapshot di path (hasil new_snapshot yang sudah selesai di-index)
+    sebagai snapshot aktif. File generation di snapshot diisi dengan nomor
+    generasinya, lalu CURRENT diganti secara atomik.
+
+    Returns
+    -------
+    int
+        generasi snapshot yang di-publish
+    """
+    name = os.path.basename(os.path.normpath(path))
+    generation = snapshot_generation(name)
+    if generation is None or os.path.abspath(os.path.dirname(os.path.normpath(path))) != os.path.abspath(root):
+        raise ValueError("{} bukan direktori snapshot di {}".format(path, root))
+    with open(os.path.join(path, 'generation'), 'w') as f:
+        f.write(str(generation))
+    temporary_path = os.path.join(root, CURRENT_FILE + '.tmp')
+    with open(temporary_path, 'w') as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_path, os.path.join(root, CURRENT_FILE))
+    return generation
+
+def prune(root, keep=2):
+    """
+    Hapus snapshot lama sehingga tersisa paling banyak keep snapshot terbaru;
+    snapshot yang ditunjuk CURRENT tidak pernah dihapus. Searcher di process
+    lain sebaiknya sempat berpindah dulu (lihat SnapshotSearcher.watch), jadi
+    keep minimal 2.
+
+    Returns
+    -------
+    List[int]
+        generasi yang dihapus
+    """
+    current = current_snapshot(root)
+    removed = [generation for generation in list_snapshots(root)[:-keep or None] if generation != current]
+    for generation in removed:
+        shutil.rmtree(os.path.join(root, snapshot_name(generation)))
+    return removed
+
+class Snapshot:
+    """
+    Satu snapshot yang sedang dibuka oleh SnapshotSearcher: BSBIIndex yang
+    sudah di-load, reader merged index (None untuk index yang di-shard), dan
+    banyaknya query yang sedang memakainya.
+    """
+    def __init__(self, generation, index, reader):
+        self.generation = generation
+        self.index = index
+        self.reader = reader
+        self.in_flight = 0
+        self.retired = False
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.__exit__(None, None, None)
+            self.reader = None
+        self.index.close()
+
+class SnapshotSearcher:
+    """
+    Searcher yang berpindah ke snapshot baru tanpa restart (lihat docstring
+    modul).
+
+    Attributes
+    ----------
+    root (str): direktori snapshot
+    postings_cache_bytes (int): jika > 0, setiap snapshot memakai postings
+                    cache sebesar ini, yang di-warm dari isi cache snapshot lama;
+                    diabaikan untuk snapshot yang di-shard
+    warm_terms (int): banyaknya term paling baru dipakai di postings cache lama
+                    yang dimuat ke snapshot baru sebelum swap
+    warm_queries (int): banyaknya query terakhir yang dijalankan ulang di
+                    snapshot baru sebelum swap
+    current (Snapshot): snapshot aktif
+    swaps, reload_errors (int): counter statistik
+    last_reload_s (float): waktu membuka dan warm-up snapshot terakhir
+    """
+    def __init__(self, root, postings_encoding, index_name='main_index', postings_cache_bytes=0,
+                 warm_terms=1000, warm_queries=100):
+        self.root = root
+        self.postings_encoding = postings_encoding
+        self.index_name = index_name
+        self.postings_cache_bytes = postings_cache_bytes
+        self.warm_terms = warm_terms
+        self.recent_queries = deque(maxlen=warm_queries)
+        self.lock = threading.Lock()
+        self.reload_lock = threading.Lock()
+        self.watcher = None
+        self.stop_watching = threading.Event()
+        self.swaps = 0
+        self.reload_errors = 0
+        self.last_error = None
+        self.last_reload_s = 0.0
+        generation = current_snapshot(root)
+        if generation is None:
+            raise FileNotFoundError("{} belum berisi snapshot yang di-publish".format(os.path.join(root, CURRENT_FILE)))
+        self.current = self.open_snapshot(generation)
+
+    def open_snapshot(self, generation, previous=None):
+        """Buka snapshot generation; jika previous diberikan, cache-nya di-warm dari snapshot itu"""
+        from bsbi import BSBIIndex
+        path = os.path.join(self.root, snapshot_name(generation))
+        index = BSBIIndex(None, path, self.postings_encoding, self.index_name, shard_workers=1)
+        index.load()
+        # Shard dibuka per query tanpa postings cache (lihat enable_postings_cache)
+        if self.postings_cache_bytes > 0 and not index.shards:
+            hot_terms = []
+            if previous is not None and previous.index.postings_cache is not None:
+                # Key postings cache adalah termID snapshot lama, yang belum tentu sama di snapshot baru
+                term_ids = list(previous.index.postings_cache.entries)[-self.warm_terms:]
+                hot_terms = [previous.index.term_id_map[term_id] for term_id in reversed(term_ids)]
+            index.enable_postings_cache(self.postings_cache_bytes, hot_terms=hot_terms)
+        reader = None if index.shards else index.open_reader(use_mmap=True).__enter__()
+        snapshot = Snapshot(generation, index, reader)
+        for query, did_you_mean in list(self.recent_queries):
+            try:
+                index.boolean_postings(query, reader, did_you_mean)
+            except (ValueError, IndexError, KeyError):
+                pass
+        return snapshot
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """Snapshot aktif untuk satu query; snapshot itu tidak ditutup sebelum query selesai"""
+        with self.lock:
+            snapshot = self.current
+            snapshot.in_flight += 1
+        try:
+            yield snapshot
+        finally:
+            with self.lock:
+                snapshot.in_flight -= 1
+                close = snapshot.retired and snapshot.in_flight == 0
+            if close:
+                snapshot.close()
+
+    def search(self, query, offset=0, limit=10, did_you_mean=False):
+        """
+        Evaluasi boolean query di snapshot aktif. Nama dokumen di-resolve
+        sebelum snapshot dilepas, karena doc table snapshot lama bisa ditutup
+        setelah swap.
+
+        Returns
+        -------
+        dict
+            query, count, offset, limit, results (nama dokumen), generation
+        """
+        with self.acquire() as snapshot:
+            result = SearchResult(snapshot.index.boolean_postings(query, snapshot.reader, did_you_mean),
+                                  snapshot.index.doc_id_map)
+            response = {'query': query, 'count': result.count(), 'offset': offset, 'limit': limit,
+                        'results': result.page(offset, limit), 'generation': snapshot.generation}
+        self.recent_queries.append((query, did_you_mean))
+        return response
+
+    def refresh(self):
+        """
+        Pindah ke snapshot yang ditunjuk CURRENT jika berbeda dengan snapshot
+        aktif. Snapshot baru dibuka dan di-warm tanpa memegang lock, sehingga
+        query tetap dilayani oleh snapshot lama selama proses ini.
+
+        Returns
+        -------
+        bool
+            True jika snapshot aktif berganti
+        """
+        with self.reload_lock:
+            generation = current_snapshot(self.root)
+            if generation is None or generation == self.current.generation:
+                return False
+            start = time.perf_counter()
+            snapshot = self.open_snapshot(generation, self.current)
+            with self.lock:
+                previous, self.current = self.current, snapshot
+                previous.retired = True
+                close = previous.in_flight == 0
+            if close:
+                previous.close()
+            self.swaps += 1
+            self.last_reload_s = time.perf_counter() - start
+            return True
+
+    def watch(self, interval=1.0):
+        """Jalankan refresh() setiap interval detik di thread daemon sampai close()"""
+        def run():
+            while not self.stop_watching.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    # Snapshot yang rusak tidak boleh menghentikan searcher; snapshot lama tetap dipakai
+                    self.reload_errors += 1
+                    self.last_error = repr(e)
+        self.watcher = threading.Thread(target=run, name='snapshot-watcher', daemon=True)
+        self.watcher.start()
+
+    def stats(self):
+        return {'generation': self.current.generation, 'swaps': self.swaps, 'reload_errors': self.reload_errors,
+                'last_error': self.last_error, 'last_reload_s': self.last_reload_s}
+
+    def close(self):
+        if self.watcher is not None:
+            self.stop_watching.set()
+            self.watcher.join()
+            self.watcher = None
+        with self.lock:
+            self.current.retired = True
+            close = self.current.in_flight == 0
+        if close:
+            self.current.close()
+
+
+if __name__ == '__main__':
+
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as root:
+        assert current_snapshot(root) is None and list_snapshots(root) == [], "root kosong salah"
+        first = new_snapshot(root)
+        second = new_snapshot(root)
+        assert [os.path.basename(first), os.path.basename(second)] == ['gen-000001', 'gen-000002'], "nama snapshot salah"
+        assert publish(root, second) == 2 and current_snapshot(root) == 2, "publish salah"
+        with open(os.path.join(second, 'generation')) as f:
+            assert f.read() == '2', "file generation snapshot salah"
+        assert not os.path.exists(os.path.join(root, CURRENT_FILE + '.tmp')), "file sementara tidak boleh tersisa"
+        assert os.path.basename(new_snapshot(root)) == 'gen-000003', "generasi berikutnya salah"
+        try:
+            publish(root, root)
+            assert False, "direktori selain snapshot tidak boleh di-publish"
+        except ValueError:
+            pass
+        # Snapshot 3 lebih baru tetapi belum di-publish; snapshot 2 (CURRENT) tidak boleh dihapus
+        assert prune(root, keep=1) == [1], "prune salah"
+        assert list_snapshots(root) == [2, 3], "prune tidak boleh menghapus CURRENT"
+
+        class FakeIndex:
+            def __init__(self):
+                self.closed = False
+            def close(self):
+                self.closed = True
+
+        # Query yang sedang berjalan tetap memakai snapshot lama sampai selesai
+        searcher = SnapshotSearcher.__new__(SnapshotSearcher)
+        searcher.lock = threading.Lock()
+        old, new = Snapshot(1, FakeIndex(), None), Snapshot(2, FakeIndex(), None)
+        searcher.current = old
+        with searcher.acquire() as snapshot:
+            with searcher.lock:
+                searcher.current, old.retired = new, True
+            assert snapshot is old and not old.index.closed, "snapshot lama ditutup saat masih dipakai"
+        assert old.index.closed and old.in_flight == 0, "snapshot lama harus ditutup setelah query terakhir"
+        with searcher.acquire() as snapshot:
+            assert snapshot is new, "query baru harus memakai snapshot baru"
+        assert not new.index.closed, "snapshot aktif tidak boleh ditutup"
+
+    # Pindah dari snapshot biasa ke snapshot yang di-shard dengan postings cache aktif
+    from bsbi import BSBIIndex
+    from compression import VBEPostings
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        collection = os.path.join(tmp_dir, 'collection')
+        for block in ['0', '1']:
+            os.makedirs(os.path.join(collection, block))
+            for i in range(3):
+                with open(os.path.join(collection, block, 'doc{}.txt'.format(i)), 'w') as f:
+                    f.write('quantum gravity signal {} {}'.format(block, i))
+        root = os.path.join(tmp_dir, 'live')
+        for n_shards in [1, 2]:
+            path = new_snapshot(root)
+            BSBIIndex(collection, path, VBEPostings, n_shards=n_shards, shard_workers=1, pipelined=True).start_indexing()
+            if n_shards == 1:
+                publish(root, path)
+                searcher = SnapshotSearcher(root, VBEPostings, postings_cache_bytes=1 << 20)
+                expected = searcher.search('quantum AND signal')
+        publish(root, path)
+        assert searcher.refresh() and searcher.current.generation == 2, "refresh ke snapshot yang di-shard gagal"
+        result = searcher.search('quantum AND signal')
+        assert result['count'] == expected['count'] == 6 and result['generation'] == 2, "hasil snapshot yang di-shard salah"
+        searcher.close()
@@ -0,0 +1,169 @@
+"""
+Sumber dokumen untuk BSBIIndex. Setiap sumber menghasilkan block-block
+dokumen lewat blocks(): iterable of (block_id, documents), dengan documents
+berupa iterable of (nama dokumen, text) yang dibaca secara streaming.
+
+    DirectorySource : layout lama, satu file per dokumen di sub-direktori
+                      per block (block = sub-direktori)
+    JsonlSource     : satu dokumen JSON per baris, boleh di-gzip (.gz)
+    TarSource       : satu dokumen per file di dalam arsip tar (boleh
+                      dikompresi: .tar.gz, .tar.bz2, .tar.xz)
+
+Untuk JsonlSource dan TarSource, batas block ditentukan oleh banyaknya
+dokumen (block_docs) dan/atau total ukuran text (block_bytes), bukan oleh
+direktori. Nama dokumen menjadi kunci doc_id_map, sehingga harus unik.
+
+Contoh:
+    source = JsonlSource('collection.jsonl.gz', id_field='pid', text_field='text',
+                         block_docs=100000)
+    BSBI_instance = BSBIIndex(None, 'index_msmarco', VBEPostings, source=source)
+"""
+import gzip
+import io
+import json
+import os
+import tarfile
+
+READ_BUFFER_SIZE = 1 << 20
+DEFAULT_BLOCK_BYTES = 64 << 20
+
+def open_buffered(path):
+    """File biner dengan buffer baca besar, di-decompress jika berakhiran .gz"""
+    if path.endswith('.gz'):
+        return io.BufferedReader(gzip.open(path, 'rb'), READ_BUFFER_SIZE)
+    return open(path, 'rb', buffering=READ_BUFFER_SIZE)
+
+def split_blocks(documents, block_docs=None, block_bytes=DEFAULT_BLOCK_BYTES):
+    """
+    Kelompokkan aliran (nama, text) menjadi block berisi paling banyak
+    block_docs dokumen dan (kira-kira) block_bytes karakter text. Setiap
+    block berisi paling sedikit satu dokumen; block_id adalah '0', '1', ...
+    """
+    documents = iter(documents)
+    document = next(documents, None)
+    block_id = 0
+    while document is not None:
+        block, size = [], 0
+        while document is not None and not (block and ((block_docs and len(block) >= block_docs) or
+                                                       (block_bytes and size >= block_bytes))):
+            block.append(document)
+            size += len(document[1])
+            document = next(documents, None)
+        yield str(block_id), block
+        block_id += 1
+
+class DirectorySource:
+    """
+    Layout koleksi lama: data_path/<block>/<file>, nama dokumen
+    "<block>/<file>". Block dan file diproses terurut berdasarkan nama.
+    """
+    def __init__(self, data_path):
+        self.data_path = data_path
+
+    def documents(self, block_path):
+        """(nama, text) untuk setiap file di sub-direktori block_path"""
+        block_dir = os.path.join(self.data_path, block_path)
+        with os.scandir(block_dir) as entries:
+            filenames = sorted(entry.name for entry in entries if entry.is_file())
+        for filename in filenames:
+            with open(os.path.join(block_dir, filename), 'r', encoding='utf-8', errors='ignore') as f:
+                text = f.read()
+            yield os.path.join(block_path, filename), text
+
+    def blocks(self):
+        with os.scandir(self.data_path) as entries:
+            block_paths = sorted(entry.name for entry in entries if entry.is_dir())
+        for block_path in block_paths:
+            yield block_path, self.documents(block_path)
+
+class JsonlSource:
+    """
+    File JSONL (atau direktori berisi file .jsonl/.jsonl.gz yang diproses
+    terurut). Nama dokumen diambil dari id_field; text dari text_field, atau
+    gabungan beberapa field (dipisah baris baru) jika text_field berupa list,
+    misal ['title', 'text']. Field yang tidak ada dianggap kosong.
+    """
+    def __init__(self, path, id_field='id', text_field='text', block_docs=None, block_bytes=DEFAULT_BLOCK_BYTES):
+        self.path = path
+        self.id_field = id_field
+        self.text_fields = [text_field] if isinstance(text_field, str) else list(text_field)
+        self.block_docs = block_docs
+        self.block_bytes = block_bytes
+
+    def files(self):
+        if not os.path.isdir(self.path):
+            return [self.path]
+        return [os.path.join(self.path, filename) for filename in sorted(os.listdir(self.path))
+                if filename.endswith(('.jsonl', '.jsonl.gz'))]
+
+    def __iter__(self):
+        for file_path in self.files():
+            with open_buffered(file_path) as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if self.id_field not in record:
+                        raise ValueError("{}:{}: field {!r} tidak ada".format(file_path, line_number, self.id_field))
+                    yield (str(record[self.id_field]),
+                           '\n'.join(str(record[field]) for field in self.text_fields if record.get(field) is not None))
+
+    def blocks(self):
+        return split_blocks(self, self.block_docs, self.block_bytes)
+
+class TarSource:
+    """
+    Arsip tar yang dibaca secara streaming (tanpa seek, sehingga bisa juga
+    dari .tar.gz); setiap file reguler adalah satu dokumen bernama sesuai
+    path-nya di dalam arsip.
+    """
+    def __init__(self, path, block_docs=None, block_bytes=DEFAULT_BLOCK_BYTES):
+        self.path = path
+        self.block_docs = block_docs
+        self.block_bytes = block_bytes
+
+    def __iter__(self):
+        # Buffer besar dipasang di file-nya; bufsize tarfile sendiri dibiarkan
+        # default karena stream tarfile menyalin buffer tersebut di setiap read
+        with open(self.path, 'rb', buffering=READ_BUFFER_SIZE) as f, tarfile.open(fileobj=f, mode='r|*') as archive:
+            for member in archive:
+                if member.isfile():
+                    text = archive.extractfile(member).read().decode('utf-8', errors='ignore')
+                    yield member.name, text
+
+    def blocks(self):
+        return split_blocks(self, self.block_docs, self.block_bytes)
+
+
+if __name__ == '__main__':
+
+    import tempfile
+
+    assert [(block_id, [name for name, _ in block]) for block_id, block in
+            split_blocks([('a', 'xx'), ('b', 'xxxx'), ('c', 'x'), ('d', 'x')], block_docs=3, block_bytes=6)] == \
+           [('0', ['a', 'b']), ('1', ['c', 'd'])], "pembagian block salah"
+    assert list(split_blocks([])) == [], "sumber kosong harus tanpa block"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        records = [{'pid': i, 'title': 'judul {}'.format(i), 'text': 'isi dokumen {}'.format(i)} for i in range(5)]
+        with gzip.open(os.path.join(tmp_dir, 'corpus.jsonl.gz'), 'wt') as f:
+            f.write('\n'.join(json.dumps(record) for record in records) + '\n\n')
+        source = JsonlSource(tmp_dir, id_field='pid', text_field=['title', 'text'], block_docs=2)
+        blocks = [(block_id, list(block)) for block_id, block in source.blocks()]
+        assert [len(block) for _, block in blocks] == [2, 2, 1], "block JSONL salah"
+        assert blocks[0][1][1] == ('1', 'judul 1\nisi dokumen 1'), "dokumen JSONL salah"
+
+        for block_path in ['0', '1']:
+            os.makedirs(os.path.join(tmp_dir, 'coll', block_path))
+            for name in ['b.txt', 'a.txt']:
+                with open(os.path.join(tmp_dir, 'coll', block_path, name), 'w') as f:
+                    f.write('dokumen ' + block_path + name)
+        directory = [(block_id, list(block)) for block_id, block in DirectorySource(os.path.join(tmp_dir, 'coll')).blocks()]
+        assert [name for _, block in directory for name, _ in block] == ['0/a.txt', '0/b.txt', '1/a.txt', '1/b.txt'], \
+               "urutan dokumen direktori salah"
+
+        with tarfile.open(os.path.join(tmp_dir, 'coll.tar.gz'), 'w:gz') as archive:
+            archive.add(os.path.join(tmp_dir, 'coll'), arcname='coll')
+        documents = sorted(TarSource(os.path.join(tmp_dir, 'coll.tar.gz')))
+        assert documents == [('coll/0/a.txt', 'dokumen 0a.txt'), ('coll/0/b.txt', 'dokumen 0b.txt'),
+                             ('coll/1/a.txt', 'dokumen 1a.txt'), ('coll/1/b.txt', 'dokumen 1b.txt')], "dokumen tar salah"
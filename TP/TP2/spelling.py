@@ -0,0 +1,251 @@
+import array
+import bisect
+import os
+import pickle
+import zlib
+
+from index import InvertedIndexReader
+
+def edit_distance(a, b, max_distance):
+    """
+    Optimal string alignment distance (Levenshtein + transposisi dua karakter
+    bersebelahan) antara a dan b. Hanya sel DP di dalam band |i - j| <=
+    max_distance yang dihitung, dan perhitungan berhenti lebih awal dengan
+    mengembalikan max_distance + 1 begitu jaraknya pasti melebihi max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    limit = max_distance + 1
+    before_previous_row = None
+    previous_row = [j if j <= max_distance else limit for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        row = [limit] * (len(b) + 1)
+        if i <= max_distance:
+            row[0] = i
+        row_min = row[0]
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before_previous_row[j - 2] + 1)
+            row[j] = min(value, limit)
+            row_min = min(row_min, row[j])
+        if row_min > max_distance:
+            return limit
+        before_previous_row, previous_row = previous_row, row
+    return previous_row[-1]
+
+def deletes(term, max_distance):
+    """
+    Semua string hasil menghapus 0 sampai max_distance karakter dari term,
+    sebagai Dictionary string -> banyaknya karakter minimum yang dihapus
+    """
+    result = {term: 0}
+    frontier = {term}
+    for n_deleted in range(1, max_distance + 1):
+        frontier = {s[:i] + s[i + 1:] for s in frontier for i in range(len(s))}
+        for variant in frontier:
+            result.setdefault(variant, n_deleted)
+    return result
+
+class SpellingCorrector:
+    """
+    Spelling correction untuk query terms dengan algoritma symmetric delete
+    (SymSpell). Setiap term di lexicon didaftarkan dengan semua variasi
+    delete-nya (sampai max_distance karakter); saat lookup, variasi delete
+    dari query term dicocokkan ke index tersebut sehingga kandidat didapat
+    tanpa menghitung edit distance ke setiap term di lexicon. Kandidat lalu
+    diverifikasi dengan edit_distance(...).
+
+    Index delete disimpan kompak sebagai satu sorted array('Q') berisi
+    (crc32(delete) << 32) | (banyak karakter yang dihapus << 30) | term_index.
+    Tabrakan crc32 hanya menambah kandidat yang kemudian gugur saat verifikasi.
+
+    Term diberi index sesuai urutan ranking (df menurun), sehingga lookup
+    bisa berjalan bertahap per edit distance d = 1, 2, ...: kandidat dengan
+    edit distance d hanya bisa berasal dari delete <= d karakter di kedua
+    sisi, dan kandidat diverifikasi dari index terkecil (df terbesar) sampai
+    k kandidat terkumpul. Untuk term pendek, yang bisa memiliki ribuan
+    kandidat, sebagian besar kandidat tidak perlu diverifikasi sama sekali.
+
+    Attributes
+    ----------
+    terms: List[str]
+        lexicon, terurut berdasarkan df menurun
+    df: array('L')
+        document frequency setiap term, sejajar dengan terms
+    term_index: Dictionary term -> index di terms
+    max_distance: int
+    delete_index: array('Q')
+    surface: Dictionary term -> bentuk asli (sebelum stemming) yang paling
+        sering muncul di koleksi, hanya untuk term yang berbeda dari bentuk
+        aslinya (lihat surface_forms)
+    """
+    def __init__(self, term_df, max_distance=2, surface=None):
+        """
+        Parameters
+        ----------
+        term_df: Dict[str, int]
+            lexicon beserta document frequency setiap term
+        max_distance: int
+            edit distance maksimum kandidat koreksi
+        surface: Dict[str, str], optional
+            bentuk asli setiap term (lihat atribut surface)
+        """
+        self.max_distance = max_distance
+        self.surface = {term: form for term, form in (surface or {}).items() if form != term and term in term_df}
+        self.terms = sorted(term_df, key=lambda term: (-term_df[term], term))
+        self.df = array.array('L', [term_df[term] for term in self.terms])
+        self.term_index = {term: i for i, term in enumerate(self.terms)}
+        entries = [(zlib.crc32(variant.encode('utf-8')) << 32) | (n_deleted << 30) | i
+                   for i, term in enumerate(self.terms)
+                   for variant, n_deleted in deletes(term, max_distance).items()]
+        entries.sort()
+        self.delete_index = array.array('Q', entries)
+
+    def candidates(self, term, k=5):
+        """
+        Kembalikan maksimum k kandidat koreksi untuk term dengan edit distance
+        <= max_distance, terurut berdasarkan edit distance, lalu df menurun.
+
+        Returns
+        -------
+        List[Tuple[str, int, int]]
+            list (term, edit distance, df)
+        """
+        result = []
+        ranges = {}
+        if term in self.term_index:
+            result.append((term, 0, self.df[self.term_index[term]]))
+        for distance in range(1, self.max_distance + 1):
+            if len(result) >= k:
+                break
+            # Index kecil = df besar, sehingga kandidat ditambahkan sesuai ranking
+            for i in sorted(self.__lookup(term, distance, ranges)):
+                if edit_distance(term, self.terms[i], distance) == distance:
+                    result.append((self.terms[i], distance, self.df[i]))
+                    if len(result) >= k:
+                        break
+        return result[:k]
+
+    def __lookup(self, term, max_distance, ranges):
+        """
+        Index term yang berbagi delete (<= max_distance di kedua sisi) dengan
+        term. ranges menyimpan range delete_index setiap variasi delete yang
+        sudah dicari, sehingga tahap berikutnya tidak perlu binary search lagi.
+        """
+        found = set()
+        for variant in deletes(term, max_distance):
+            if variant not in ranges:
+                key = zlib.crc32(variant.encode('utf-8')) << 32
+                start = bisect.bisect_left(self.delete_index, key)
+                ranges[variant] = (start, bisect.bisect_left(self.delete_index, key + (1 << 32), start))
+            start, end = ranges[variant]
+            found.update(entry & 0x3FFFFFFF for entry in self.delete_index[start:end]
+                         if (entry >> 30) & 0x3 <= max_distance)
+        return found
+
+    def correct(self, term):
+        """
+        Koreksi terbaik untuk term: term itu sendiri jika ada di lexicon,
+        kandidat teratas jika ada, atau None jika tidak ada kandidat.
+        """
+        if term in self.term_index:
+            return term
+        candidates = self.candidates(term, 1)
+        return candidates[0][0] if candidates else None
+
+    def surface_form(self, term):
+        """Bentuk asli term untuk ditampilkan ke user, misal 'gravity' untuk stem 'graviti'"""
+        # .spell dari versi lama belum memiliki surface
+        return getattr(self, 'surface', {}).get(term, term)
+
+    @staticmethod
+    def file_path(index_name, path):
+        return os.path.join(path, index_name + '.spell')
+
+    def save(self, index_name, path):
+        with open(SpellingCorrector.file_path(index_name, path), 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(index_name, path):
+        with open(SpellingCorrector.file_path(index_name, path), 'rb') as f:
+            return pickle.load(f)
+
+
+def surface_forms(surface_counts):
+    """
+    Bentuk asli yang paling sering muncul untuk setiap term, dari Counter
+    (term hasil stemming, bentuk asli) -> banyaknya kemunculan. Jika sama
+    sering, dipilih yang terkecil secara leksikografis.
+    """
+    best = {}
+    for (term, form), count in surface_counts.items():
+        if term not in best or (-count, form) < (-best[term][0], best[term][1]):
+            best[term] = (count, form)
+    return {term: form for term, (_, form) in best.items()}
+
+def build_spelling_corrector(index_name, postings_encoding, path, term_id_map, max_distance=2,
+                             source_indices=None, surface=None):
+    """
+    Membangun SpellingCorrector dari lexicon sebuah index, dengan document
+    frequency dari postings_dict, lalu menyimpannya ke <index_name>.spell.
+    Untuk index yang di-shard, document frequency dijumlahkan dari semua
+    index di source_indices. Jika surface (lihat surface_forms) tidak
+    diberikan, surface dari <index_name>.spell yang sudah ada dipakai ulang.
+    """
+    if surface is None and os.path.exists(SpellingCorrector.file_path(index_name, path)):
+        surface = getattr(SpellingCorrector.load(index_name, path), 'surface', None)
+    term_df = {}
+    for source_index in source_indices or [index_name]:
+        with InvertedIndexReader(source_index, postings_encoding, path=path) as reader:
+            for term_id, (_, n_postings, _) in reader.postings_dict.items():
+                term = term_id_map[term_id]
+                term_df[term] = term_df.get(term, 0) + n_postings
+    corrector = SpellingCorrector(term_df, max_distance, surface)
+    corrector.save(index_name, path)
+    return corrector
+
+
+if __name__ == '__main__':
+
+    assert edit_distance("quantum", "quantum", 2) == 0, "edit distance salah"
+    assert edit_distance("quantm", "quantum", 2) == 1, "edit distance salah"
+    assert edit_distance("qunatum", "quantum", 2) == 1, "edit distance salah"
+    assert edit_distance("kwantum", "quantum", 2) == 2, "edit distance salah"
+    assert edit_distance("abc", "xyz", 2) == 3, "edit distance salah"
+    assert edit_distance("ab", "abcdef", 2) == 3, "edit distance salah"
+
+    assert deletes("abc", 1) == {"abc": 0, "bc": 1, "ac": 1, "ab": 1}, "deletes salah"
+    assert deletes("aab", 2) == {"aab": 0, "ab": 1, "aa": 1, "a": 2, "b": 2}, "deletes salah"
+
+    corrector = SpellingCorrector({"quantum": 50, "quantiz": 20, "quark": 70, "continuum": 30,
+                                   "cosmolog": 40, "geodes": 10, "geode": 5}, max_distance=2)
+    assert corrector.candidates("quantm") == [("quantum", 1, 50), ("quantiz", 2, 20)], "kandidat salah"
+    assert corrector.candidates("geode") == [("geode", 0, 5), ("geodes", 1, 10)], "kandidat salah"
+    assert corrector.candidates("quatz") == [("quark", 2, 70), ("quantiz", 2, 20)], "kandidat salah"
+    assert corrector.candidates("xyz") == [], "kandidat salah"
+    assert corrector.correct("cosmolgo") == "cosmolog", "koreksi salah"
+    assert corrector.correct("quark") == "quark", "koreksi salah"
+    assert corrector.correct("zzzzzz") is None, "koreksi salah"
+
+    from collections import Counter
+    surface = surface_forms(Counter({("graviti", "gravity"): 5, ("graviti", "gravities"): 2, ("quantum", "quantum"): 3,
+                                     ("geode", "geodes"): 1, ("geode", "geode"): 1}))
+    assert surface == {"graviti": "gravity", "quantum": "quantum", "geode": "geode"}, "surface_forms salah"
+    corrector = SpellingCorrector({"graviti": 5, "quantum": 3, "geode": 2}, surface=surface)
+    assert corrector.surface == {"graviti": "gravity"}, "surface hanya untuk term yang berbeda dari bentuk aslinya"
+    assert corrector.correct("gravty") == "graviti" and corrector.surface_form("graviti") == "gravity", "surface form salah"
+    assert corrector.surface_form("quantum") == "quantum", "surface form salah"
+
+    import random
+    random.seed(3)
+    lexicon = {''.join(random.choices('abcd', k=random.randint(1, 7))): random.randint(1, 9) for _ in range(400)}
+    corrector = SpellingCorrector(lexicon)
+    for _ in range(50):
+        query = ''.join(random.choices('abcd', k=random.randint(1, 8)))
+        brute = sorted(((t, edit_distance(query, t, 2), lexicon[t]) for t in lexicon
+                        if edit_distance(query, t, 2) <= 2), key=lambda c: (c[1], -c[2], c[0]))
+        assert corrector.candidates(query, len(lexicon)) == brute, "kandidat tidak sama dengan brute force"
+        assert corrector.candidates(query, 3) == brute[:3], "kandidat tidak sama dengan brute force"
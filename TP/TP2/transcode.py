@@ -0,0 +1,230 @@
+"""
+Transcoding index ke encoding postings lain tanpa indexing ulang.
+
+Setiap index di direktori sumber (pasangan <nama>.index/.dict, termasuk
+intermediate index dan shard, serta segment <nama>.seg) dibaca dengan
+InvertedIndexReader dan ditulis ulang dengan encoding tujuan. Postings (dan
+tf) di-decode secara streaming lewat postings_cursor/tf_cursor lalu di-encode
+per chunk dengan append_stream, sehingga memorinya tidak bergantung pada
+postings list terpanjang. Index yang besar dibagi menjadi beberapa rentang
+termID yang seimbang menurut ukuran postings (merge.term_ranges); setiap
+rentang di-transcode di process pool menjadi file part, lalu part-part
+disambung dengan InvertedIndexWriter.append_index. File lain (terms.dict,
+docs.table/docs.dict, analyzer.bin, .scores, .qac, .spell, .shards, generation)
+tidak bergantung pada encoding dan disalin apa adanya.
+
+Contoh:
+    python transcode.py index_vb index_simple8b --from vb --to simple8b --workers 4
+"""
+import argparse
+import array
+import bisect
+import itertools
+import os
+import shutil
+import time
+
+from compression import ENCODINGS
+from index import InvertedIndexReader, InvertedIndexWriter, list_indices
+from merge import MIN_PART_BYTES, term_ranges
+from segment import Segment, segment_file_path, write_segment
+
+def transcode_part(index_name, src_path, src_encoding, part_name, dst_path, dst_encoding, term_range=(None, None)):
+    """
+    Tulis ulang term di term_range = (low, high) dari index index_name
+    (encoding src_encoding) sebagai index part_name dengan dst_encoding.
+    Berupa fungsi level modul supaya bisa dijalankan di process pool.
+    """
+    low, high = term_range
+    with InvertedIndexReader(index_name, src_encoding, path=src_path) as reader, \
+            InvertedIndexWriter(part_name, dst_encoding, path=dst_path) as writer:
+        terms = list(reader.terms)
+        start = 0 if low is None else bisect.bisect_left(terms, low)
+        end = len(terms) if high is None else bisect.bisect_left(terms, high)
+        with_tf = bool(reader.tf_dict)
+        for term in itertools.islice(terms, start, end):
+            if with_tf:
+                writer.append_stream(term, zip(reader.postings_cursor(term), reader.tf_cursor(term)), with_tf=True)
+            else:
+                writer.append_stream(term, reader.postings_cursor(term))
+    return part_name
+
+def transcode_jobs(index_name, src_path, src_encoding, dst_name, dst_path, dst_encoding, workers):
+    """Job transcode_part untuk satu index: satu job, atau satu job per rentang termID jika index-nya besar"""
+    index_file_path = os.path.join(src_path, index_name + '.index')
+    if not os.path.exists(index_file_path):
+        index_file_path = segment_file_path(index_name, src_path)
+    size = os.path.getsize(index_file_path)
+    n_parts = max(1, min(workers, size // MIN_PART_BYTES))
+    if n_parts == 1:
+        return [(index_name, src_path, src_encoding, dst_name, dst_path, dst_encoding, (None, None))]
+    with InvertedIndexReader(index_name, src_encoding, path=src_path) as reader:
+        ranges = term_ranges([reader], n_parts)
+    return [(index_name, src_path, src_encoding, '{}_part{}'.format(dst_name, k), dst_path, dst_encoding, term_range)
+            for k, term_range in enumerate(ranges)]
+
+def concatenate_parts(part_names, index_name, encoding, path):
+    """Sambung part-part (terurut berdasarkan rentang termID) menjadi index index_name, lalu hapus part-nya"""
+    with InvertedIndexWriter(index_name, encoding, path=path) as index:
+        for part_name in part_names:
+            with InvertedIndexReader(part_name, encoding, path=path) as part:
+                index.append_index(part)
+            os.remove(part.index_file_path)
+            os.remove(part.metadata_file_path)
+
+def transcode(src_path, dst_path, src_encoding, dst_encoding, workers=1):
+    """
+    Transcode semua index di src_path (encoding src_encoding) ke dst_path
+    dengan dst_encoding. dst_path dibuat jika belum ada dan tidak boleh sama
+    dengan src_path.
+
+    Returns
+    -------
+    dict
+        statistik: banyaknya index, total byte postings sebelum dan sesudah
+    """
+    if os.path.abspath(src_path) == os.path.abspath(dst_path):
+        raise ValueError("direktori tujuan harus berbeda dari direktori sumber")
+    os.makedirs(dst_path, exist_ok=True)
+    indices, segments = list_indices(src_path)
+    postings_files = {name + ext for name in indices for ext in ('.index', '.dict')} | {name + '.seg' for name in segments}
+
+    # Segment di-transcode lewat pasangan .index/.dict sementara di dst_path
+    targets = [(name, name) for name in indices] + [(name, name + '_transcoded') for name in segments]
+    jobs, parts = [], []
+    for name in segments:
+        segment = Segment(segment_file_path(name, src_path))
+        encoding = segment.meta['encoding']
+        segment.close()
+        if encoding != src_encoding.__name__:
+            raise ValueError("segment {} memakai {}, bukan {}".format(name, encoding, src_encoding.__name__))
+    for index_name, dst_name in targets:
+        index_jobs = transcode_jobs(index_name, src_path, src_encoding, dst_name, dst_path, dst_encoding, workers)
+        jobs += index_jobs
+        parts.append((dst_name, [job[3] for job in index_jobs]))
+    if workers > 1 and len(jobs) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(min(workers, len(jobs))) as pool:
+            list(pool.map(transcode_part, *zip(*jobs)))
+    else:
+        for job in jobs:
+            transcode_part(*job)
+    for dst_name, part_names in parts:
+        if part_names != [dst_name]:
+            concatenate_parts(part_names, dst_name, dst_encoding, dst_path)
+
+    for name in segments:
+        segment = Segment(segment_file_path(name, src_path))
+        try:
+            # Segment versi 1 menyimpan nama dokumen tanpa kolom
+            doc_columns = {column_name: array.array(column.typecode, column)
+                           for column_name, column in getattr(segment.doc_table, 'columns', {}).items()}
+            with InvertedIndexReader(name + '_transcoded', dst_encoding, path=dst_path) as reader:
+                write_segment(segment_file_path(name, dst_path), reader, list(segment.term_map),
+                              list(segment.doc_table), doc_columns)
+        finally:
+            segment.close()
+        os.remove(os.path.join(dst_path, name + '_transcoded.index'))
+        os.remove(os.path.join(dst_path, name + '_transcoded.dict'))
+
+    for filename in sorted(os.listdir(src_path)):
+        if filename not in postings_files and os.path.isfile(os.path.join(src_path, filename)):
+            shutil.copy2(os.path.join(src_path, filename), os.path.join(dst_path, filename))
+
+    def postings_bytes(path):
+        return sum(os.path.getsize(os.path.join(path, filename)) for filename in postings_files
+                   if filename.endswith(('.index', '.seg')))
+    return {'indices': len(indices) + len(segments), 'bytes_before': postings_bytes(src_path),
+            'bytes_after': postings_bytes(dst_path)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('src_path', help='direktori index sumber, misal index_vb')
+    parser.add_argument('dst_path', help='direktori index tujuan')
+    parser.add_argument('--from', dest='src_encoding', choices=ENCODINGS, default='vb')
+    parser.add_argument('--to', dest='dst_encoding', choices=ENCODINGS, required=True)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = transcode(args.src_path, args.dst_path, ENCODINGS[args.src_encoding], ENCODINGS[args.dst_encoding],
+                      args.workers)
+    print("{} index, {} -> {} byte postings, {:.1f} s".format(stats['indices'], stats['bytes_before'],
+                                                             stats['bytes_after'], time.perf_counter() - start))
+
+if __name__ == '__main__':
+
+    import random
+    import sys
+    import tempfile
+
+    # Dengan argumen: command line; tanpa argumen: self-test
+    if len(sys.argv) > 1:
+        main()
+
+    from bsbi import BSBIIndex
+    from compression import Simple8bPostings, VBEPostings
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        collection = os.path.join(tmp_dir, 'collection')
+        rng = random.Random(0)
+        words = ['quantum', 'gravity', 'signal', 'energy', 'theory', 'field', 'noise', 'wave', 'particle', 'string']
+        for block in ['0', '1', '2']:
+            os.makedirs(os.path.join(collection, block))
+            for i in range(40):
+                with open(os.path.join(collection, block, 'doc{}.txt'.format(i)), 'w') as f:
+                    f.write(' '.join(rng.choice(words[:rng.randint(2, len(words))]) for _ in range(50)))
+
+        def build(name, encoding, segment):
+            path = os.path.join(tmp_dir, name)
+            os.makedirs(path)
+            BSBIIndex(collection, path, encoding, with_tf=True, segment=segment).start_indexing()
+            return path
+
+        def postings_files(path):
+            indices, segments = list_indices(path)
+            contents = {}
+            for filename in [name + ext for name in indices for ext in ('.index', '.dict')] + [name + '.seg' for name in segments]:
+                with open(os.path.join(path, filename), 'rb') as f:
+                    contents[filename] = f.read()
+            return contents
+
+        queries = ['quantum', 'signal AND theory', 'gravity OR string', '(energy OR wave) DIFF particle']
+
+        def results(path, encoding):
+            index = BSBIIndex(None, path, encoding)
+            index.load()
+            retrieved = [list(index.boolean_retrieve(query)) for query in queries] + \
+                        [index.retrieve_bm25(query, k=5) for query in ['quantum gravity', 'string theory noise']]
+            index.close()
+            return retrieved
+
+        default_part_bytes = MIN_PART_BYTES
+        for segment in [False, True]:
+            suffix = '_seg' if segment else ''
+            src_path = build('vb' + suffix, VBEPostings, segment)
+            direct_path = build('simple8b' + suffix, Simple8bPostings, segment)
+            expected_files = postings_files(direct_path)
+            expected_results = results(src_path, VBEPostings)
+            assert results(direct_path, Simple8bPostings) == expected_results, "index Simple8b langsung salah"
+            # Tanpa split, lalu dengan MIN_PART_BYTES kecil sehingga setiap index dibagi per rentang termID
+            # dan part-nya disambung dengan append_index
+            for workers, min_part_bytes in [(1, default_part_bytes), (3, 64)]:
+                MIN_PART_BYTES = min_part_bytes
+                dst_path = os.path.join(tmp_dir, 'transcoded{}_{}'.format(suffix, workers))
+                if not segment and workers > 1:
+                    assert len(transcode_jobs('main_index', src_path, VBEPostings, 'main_index', dst_path,
+                                              Simple8bPostings, workers)) == 3, "index harus dibagi menjadi 3 part"
+                stats = transcode(src_path, dst_path, VBEPostings, Simple8bPostings, workers)
+                assert stats['indices'] == len(expected_files) // (1 if segment else 2), "banyaknya index salah"
+                assert postings_files(dst_path) == expected_files, \
+                    "hasil transcode harus sama persis dengan index Simple8b langsung ({}, {} worker)".format(suffix, workers)
+                assert not [filename for filename in os.listdir(dst_path) if '_part' in filename or '_transcoded' in filename], \
+                    "file sementara tidak boleh tersisa"
+                assert results(dst_path, Simple8bPostings) == expected_results, "hasil query setelah transcode salah"
+        MIN_PART_BYTES = default_part_bytes
+        try:
+            transcode(src_path, src_path, VBEPostings, Simple8bPostings)
+            assert False, "direktori tujuan yang sama dengan sumber harus ditolak"
+        except ValueError:
+            pass
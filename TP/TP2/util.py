@@ -1,3 +1,6 @@
+import heapq
+import math
+
 class IdMap:
     """
     Ingat kembali di kuliah, bahwa secara praktis, sebuah dokumen dan
@@ -59,6 +62,60 @@ class IdMap:
         """
         return self.__get_id(key) if isinstance(key, str) else self.__get_str(key)
 
+class SearchResult:
+    """
+    Hasil boolean retrieval yang lazy: yang disimpan hanya list of docIDs
+    (terurut), dan nama dokumen baru di-resolve lewat doc_id_map untuk
+    elemen yang benar-benar dipakai. count() tidak me-resolve nama sama
+    sekali, page(offset, limit) hanya me-resolve satu halaman, dan iterasi
+    me-resolve satu per satu.
+
+    Untuk kompatibilitas dengan kode lama yang menganggap hasilnya list of
+    nama dokumen, len(...), indexing/slicing, dan perbandingan dengan list
+    juga didukung.
+
+    Attributes
+    ----------
+    doc_ids: List[int]
+        docID hasil query, terurut
+    doc_id_map: IdMap
+    explain: dict
+        Rencana dan trace evaluasi query jika diminta (lihat
+        BSBIIndex.explain), None jika tidak
+    """
+    def __init__(self, doc_ids, doc_id_map, explain=None):
+        self.doc_ids = doc_ids
+        self.doc_id_map = doc_id_map
+        self.explain = explain
+
+    def count(self):
+        """Banyaknya dokumen hasil query"""
+        return len(self.doc_ids)
+
+    def page(self, offset=0, limit=10):
+        """Nama dokumen ke-offset sampai ke-(offset + limit - 1)"""
+        return [self.doc_id_map[doc_id] for doc_id in self.doc_ids[offset:offset + limit]]
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def __iter__(self):
+        for doc_id in self.doc_ids:
+            yield self.doc_id_map[doc_id]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.doc_id_map[doc_id] for doc_id in self.doc_ids[key]]
+        return self.doc_id_map[self.doc_ids[key]]
+
+    def __eq__(self, other):
+        if isinstance(other, (SearchResult, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return "SearchResult(count={}, first={})".format(self.count(), self.page(0, 3))
+
 class QueryParser:
     """
     Class untuk melakukan parsing query untuk boolean search
@@ -186,6 +243,57 @@ class QueryParser:
         
         return output
 
+    def expression_tree(self):
+        """
+        Mengubah query menjadi expression tree yang sudah dikanonisasi (lihat
+        canonicalize_tree), sehingga query yang ekuivalen secara sintaks
+        seperti "b AND (a AND c)" dan "c AND b AND a" menghasilkan tree yang sama.
+
+        Returns
+        -------
+        str atau Tuple
+            term (str) untuk operand, atau tuple (operator, child, ...)
+        """
+        return canonicalize_tree(postfix_to_tree(self.infix_to_postfix()))
+
+def postfix_to_tree(postfix):
+    """
+    Mengubah ekspresi postfix menjadi expression tree berbentuk nested tuple
+    (operator, operand1, operand2). Contoh: ["A", "B", "AND"] --> ("AND", "A", "B")
+    """
+    stack = []
+    for token in postfix:
+        if token in ['AND', 'OR', 'DIFF']:
+            operand2 = stack.pop()
+            operand1 = stack.pop()
+            stack.append((token, operand1, operand2))
+        else:
+            stack.append(token)
+    return stack.pop() if stack else None
+
+def canonicalize_tree(tree):
+    """
+    Kanonisasi expression tree: AND dan OR bersifat asosiatif, komutatif, dan
+    idempoten, sehingga AND/OR yang bersarang diratakan menjadi satu node
+    n-ary, child-nya diurutkan dan duplikatnya dibuang. DIFF tidak diubah
+    karena urutan operand-nya berpengaruh.
+    """
+    if not isinstance(tree, tuple):
+        return tree
+    operator = tree[0]
+    children = [canonicalize_tree(child) for child in tree[1:]]
+    if operator == 'DIFF':
+        return (operator, *children)
+    flattened = set()
+    for child in children:
+        if isinstance(child, tuple) and child[0] == operator:
+            flattened.update(child[1:])
+        else:
+            flattened.add(child)
+    if len(flattened) == 1:
+        return flattened.pop()
+    return (operator, *sorted(flattened, key=repr))
+
 def sort_intersect_list(list_A, list_B):
     """
     Intersects two (ascending) sorted lists and returns the sorted result
@@ -260,6 +368,49 @@ def sort_union_list(list_A, list_B):
     
     return result
 
+def sort_union_list_with_tf(list_A, tf_A, list_B, tf_B):
+    """
+    Sama seperti sort_union_list, tetapi sekaligus menggabungkan tf list yang
+    sejajar dengan masing-masing postings list. Jika sebuah docID muncul di
+    kedua list, tf-nya dijumlahkan.
+
+    Parameters
+    ----------
+    list_A, list_B: List[int]
+        Dua buah sorted postings list yang akan di-union.
+    tf_A, tf_B: List[int]
+        Term frequency yang sejajar dengan list_A dan list_B.
+
+    Returns
+    -------
+    Tuple[List[int], List[int]]
+        union yang sudah terurut beserta tf list-nya
+    """
+    result, result_tf = [], []
+    i, j = 0, 0
+
+    while i < len(list_A) and j < len(list_B):
+        if list_A[i] == list_B[j]:
+            result.append(list_A[i])
+            result_tf.append(tf_A[i] + tf_B[j])
+            i += 1
+            j += 1
+        elif list_A[i] < list_B[j]:
+            result.append(list_A[i])
+            result_tf.append(tf_A[i])
+            i += 1
+        else:
+            result.append(list_B[j])
+            result_tf.append(tf_B[j])
+            j += 1
+
+    result.extend(list_A[i:])
+    result_tf.extend(tf_A[i:])
+    result.extend(list_B[j:])
+    result_tf.extend(tf_B[j:])
+
+    return result, result_tf
+
 def sort_diff_list(list_A, list_B):
     """
     Melakukan difference dua (ascending) sorted lists dan mengembalikan hasilnya
@@ -296,6 +447,67 @@ def sort_diff_list(list_A, list_B):
     
     return result
 
+def intersect_iter(iter_A, iter_B):
+    """
+    Versi streaming dari sort_intersect_list: kedua input adalah iterator
+    docID yang terurut (misal dari Postings.decode_iter), dan hasilnya juga
+    dihasilkan satu per satu sehingga tidak ada list utuh yang dibentuk.
+    """
+    iter_A, iter_B = iter(iter_A), iter(iter_B)
+    a = next(iter_A, None)
+    b = next(iter_B, None)
+    while a is not None and b is not None:
+        if a == b:
+            yield a
+            a = next(iter_A, None)
+            b = next(iter_B, None)
+        elif a < b:
+            a = next(iter_A, None)
+        else:
+            b = next(iter_B, None)
+
+def union_iter(*iterators):
+    """Versi streaming dari sort_union_list untuk sejumlah iterator docID yang terurut"""
+    prev = None
+    for doc_id in heapq.merge(*iterators):
+        if doc_id != prev:
+            yield doc_id
+            prev = doc_id
+
+def union_with_tf_iter(*iterators):
+    """
+    Versi streaming dari sort_union_list_with_tf: setiap iterator menghasilkan
+    pasangan (docID, tf) terurut berdasarkan docID; tf dari docID yang sama
+    dijumlahkan.
+    """
+    current, current_tf = None, 0
+    for doc_id, tf in heapq.merge(*iterators, key=lambda pair: pair[0]):
+        if doc_id == current:
+            current_tf += tf
+        else:
+            if current is not None:
+                yield current, current_tf
+            current, current_tf = doc_id, tf
+    if current is not None:
+        yield current, current_tf
+
+def diff_iter(iter_A, iter_B):
+    """Versi streaming dari sort_diff_list"""
+    iter_B = iter(iter_B)
+    b = next(iter_B, None)
+    for a in iter_A:
+        while b is not None and b < a:
+            b = next(iter_B, None)
+        if a != b:
+            yield a
+
+def percentile(samples, p):
+    """Nilai persentil ke-p (0..100) dari samples dengan metode nearest-rank"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
 if __name__ == '__main__':
 
     """
@@ -315,6 +527,21 @@ if __name__ == '__main__':
             "/collection/1/data53.txt"]
     doc_id_map = IdMap()
     assert [doc_id_map[docname] for docname in docs] == [1, 2, 3], "docs_id salah"
+
+    class CountingIdMap:
+        def __init__(self, id_map):
+            self.id_map, self.lookups = id_map, 0
+        def __getitem__(self, key):
+            self.lookups += 1
+            return self.id_map[key]
+
+    counting_map = CountingIdMap(doc_id_map)
+    result = SearchResult([1, 2, 3], counting_map)
+    assert result.count() == 3 and len(result) == 3 and counting_map.lookups == 0, "count() tidak boleh me-resolve nama"
+    assert result.page(1, 1) == ["/collection/0/data10.txt"] and counting_map.lookups == 1, "page() salah"
+    assert next(iter(result)) == docs[0] and counting_map.lookups == 2, "iterasi harus lazy"
+    assert result[-1] == docs[-1] and result[:2] == docs[:2], "indexing salah"
+    assert result == docs and docs == result and SearchResult([], doc_id_map) == [], "perbandingan dengan list salah"
     
     assert sort_intersect_list([2, 3, 4], [3, 4]) == [3, 4], "sorted_intersect salah"
     assert sort_intersect_list([5, 6], [2, 5, 8]) == [5], "sorted_intersect salah"
@@ -324,10 +551,19 @@ if __name__ == '__main__':
     assert sort_union_list([5, 6], [2, 5, 8]) == [2, 5, 6, 8], "sorted_union salah"
     assert sort_union_list([], []) == [], "sorted_union salah"
 
+    assert sort_union_list_with_tf([2, 3, 4], [1, 2, 3], [3, 4], [5, 1]) == ([2, 3, 4], [1, 7, 4]), "sorted_union_with_tf salah"
+    assert sort_union_list_with_tf([5, 6], [2, 2], [2, 5, 8], [1, 1, 1]) == ([2, 5, 6, 8], [1, 3, 2, 1]), "sorted_union_with_tf salah"
+    assert sort_union_list_with_tf([], [], [], []) == ([], []), "sorted_union_with_tf salah"
+
     assert sort_diff_list([2, 3, 4], [3, 4]) == [2], "sorted_diff salah"
     assert sort_diff_list([5, 6], [2, 5, 8]) == [6], "sorted_diff salah"
     assert sort_diff_list([], []) == [], "sorted_diff salah"
 
+    samples = list(range(100, 0, -1))
+    assert [percentile(samples, p) for p in (50, 95, 99, 100)] == [50, 95, 99, 100], "percentile salah"
+    assert percentile(list(range(1, 11)), 50) == 5 and percentile([7], 99) == 7, "percentile salah"
+    assert percentile([1, 2, 3], 0) == 1 and percentile([], 50) == 0.0, "percentile salah"
+
     from porter2stemmer import Porter2Stemmer
     qp = QueryParser("((term1 AND term2) OR term3) DIFF (term6 AND (term4 OR term5) DIFF (term7 OR term8))", 
                      Porter2Stemmer(), set())
@@ -337,8 +573,28 @@ if __name__ == '__main__':
     assert qp.infix_to_postfix() == ['term1', 'term2', 'AND', 'term3', 'OR', 'term6', 'term4', 
                                      'term5', 'OR', 'AND', 'term7', 'term8', 'OR', 'DIFF', 'DIFF'], "postfix salah"
     
+    assert qp.expression_tree() == ('DIFF', ('OR', 'term3', ('AND', 'term1', 'term2')),
+                                    ('DIFF', ('AND', 'term6', ('OR', 'term4', 'term5')),
+                                     ('OR', 'term7', 'term8'))), "expression tree salah"
+    assert QueryParser("b AND (a AND c)", Porter2Stemmer(), set()).expression_tree() == \
+           QueryParser("c AND b AND a", Porter2Stemmer(), set()).expression_tree() == ('AND', 'a', 'b', 'c'), "kanonisasi salah"
+    assert QueryParser("(a OR a) AND b", Porter2Stemmer(), set()).expression_tree() == ('AND', 'a', 'b'), "kanonisasi salah"
+
     qp1 = QueryParser("term1 OR ((term2 AND term3) DIFF (term4 OR term5))", Porter2Stemmer(), set())
     assert qp1.token_list == ['term1', 'OR', '(', '(', 'term2', 'AND', 'term3', ')', 'DIFF', 
                               '(', 'term4', 'OR', 'term5', ')', ')'], "parsing to list salah"
     assert qp1.infix_to_postfix() == ['term1', 'term2', 'term3', 'AND', 'term4', 'term5', 'OR', 
                                       'DIFF', 'OR'], "postfix salah"
+
+    assert list(intersect_iter(iter([1, 2, 5, 8]), iter([2, 3, 8, 9]))) == [2, 8], "intersect_iter salah"
+    assert list(union_iter(iter([1, 5]), iter([2, 5, 9]), iter([]))) == [1, 2, 5, 9], "union_iter salah"
+    assert list(diff_iter(iter([1, 2, 5, 8]), iter([2, 3, 8]))) == [1, 5], "diff_iter salah"
+    assert list(union_with_tf_iter(iter([(1, 2), (4, 1)]), iter([(4, 3), (6, 1)]))) == [(1, 2), (4, 4), (6, 1)], "union_with_tf_iter salah"
+    import random
+    random.seed(0)
+    for _ in range(100):
+        A = sorted(random.sample(range(1, 60), random.randint(0, 30)))
+        B = sorted(random.sample(range(1, 60), random.randint(0, 30)))
+        assert list(intersect_iter(A, B)) == sort_intersect_list(A, B), "intersect_iter salah"
+        assert list(union_iter(A, B)) == sort_union_list(A, B), "union_iter salah"
+        assert list(diff_iter(A, B)) == sort_diff_list(A, B), "diff_iter salah"
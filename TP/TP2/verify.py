@@ -0,0 +1,349 @@
+"""
+Verifikasi index, pengganti cek round-trip (decode setelah encode) yang dulu
+dijalankan di setiap encode. Encode saat indexing dan merge berjalan tanpa
+cek; kebenaran index diperiksa terpisah dengan verify_index(...) atau lewat
+command line.
+
+Untuk setiap index di direktori (pasangan <nama>.index/.dict, termasuk
+intermediate index dan shard, serta segment <nama>.seg):
+
+    struktur  : terms terurut naik dan sama dengan key postings_dict, setiap
+                df >= 1, posisi dan panjang setiap postings/tf list berada di
+                dalam file dan tidak saling tumpang tindih (semua term)
+    postings  : untuk term yang masuk sampel (sample_rate), postings list
+                di-decode, banyaknya sama dengan df di postings_dict, docID
+                terurut naik di [1, banyaknya dokumen], decode_iter konsisten
+                dengan decode, dan decode(encode(postings)) kembali sama
+                (round trip codec); tf list (prefix sum) naik dan sepanjang df
+    checksum  : untuk .index/.dict, crc32 postings list (dan tf list) setiap
+                term dibandingkan dengan checksum_dict yang dicatat writer
+                di .dict (semua term, tanpa decode); untuk segment, crc32
+                setiap section dibandingkan dengan checksum di footer-nya
+
+Sampel ditentukan dari hash termID, sehingga sama di semua process dan di
+setiap kali verifikasi dengan seed yang sama. Index yang besar dibagi menjadi
+rentang termID (merge.term_ranges) yang diverifikasi paralel di process pool.
+
+Contoh:
+    python verify.py index_vb --encoding vb --sample-rate 0.1 --workers 4
+"""
+import argparse
+import bisect
+import itertools
+import os
+import pickle
+import sys
+import zlib
+
+from compression import ENCODINGS
+from doctable import DocTableFile, doc_table_file_path
+from index import InvertedIndexReader, list_indices
+from merge import MIN_PART_BYTES, term_ranges
+from segment import SECTION_NAMES, Segment, SegmentError, segment_file_path
+
+# Banyaknya error yang dicatat per index
+MAX_ERRORS = 100
+CHECKSUM_BUFFER_SIZE = 1 << 20
+
+def sampled(term, sample_rate, seed=0):
+    """True jika term masuk sampel (hash multiplikatif dari termID)"""
+    if sample_rate >= 1:
+        return True
+    return ((term + seed) * 2654435761) % (1 << 32) < sample_rate * (1 << 32)
+
+def file_crc32(file_path):
+    crc = 0
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(CHECKSUM_BUFFER_SIZE)
+            if not chunk:
+                return crc
+            crc = zlib.crc32(chunk, crc)
+
+def document_count(path):
+    """Banyaknya dokumen menurut docs.table atau docs.dict, atau None jika keduanya tidak ada"""
+    if os.path.exists(doc_table_file_path(path)):
+        doc_table = DocTableFile(doc_table_file_path(path))
+        n_docs = len(doc_table)
+        doc_table.close()
+        return n_docs
+    if os.path.exists(os.path.join(path, 'docs.dict')):
+        with open(os.path.join(path, 'docs.dict'), 'rb') as f:
+            return len(pickle.load(f))
+    return None
+
+def check_structure(reader, file_size):
+    """Error struktur dictionary index yang sudah dibuka (semua term, tanpa decode)"""
+    errors = []
+    terms = list(reader.terms)
+    if any(previous >= term for previous, term in zip(terms, terms[1:])):
+        errors.append("terms tidak terurut naik")
+    if len(terms) != len(reader.postings_dict) or any(term not in reader.postings_dict for term in terms):
+        errors.append("terms tidak sama dengan key postings_dict")
+    extents = []
+    for term, (position, n_postings, length_in_bytes) in reader.postings_dict.items():
+        if n_postings < 1:
+            errors.append("term {}: df {}".format(term, n_postings))
+        if position < 0 or length_in_bytes < 0 or position + length_in_bytes > file_size:
+            errors.append("term {}: postings [{}, {}) di luar file ({} byte)".format(
+                term, position, position + length_in_bytes, file_size))
+        extents.append((position, length_in_bytes, term, 'postings'))
+    for term, (position, length_in_bytes) in reader.tf_dict.items():
+        if term not in reader.postings_dict:
+            errors.append("term {}: ada di tf_dict tetapi tidak di postings_dict".format(term))
+        if position < 0 or length_in_bytes < 0 or position + length_in_bytes > file_size:
+            errors.append("term {}: tf [{}, {}) di luar file ({} byte)".format(
+                term, position, position + length_in_bytes, file_size))
+        extents.append((position, length_in_bytes, term, 'tf'))
+    extents.sort()
+    for (position, length_in_bytes, term, kind), (next_position, _, next_term, next_kind) in zip(extents, extents[1:]):
+        if position + length_in_bytes > next_position:
+            errors.append("term {} ({}) tumpang tindih dengan term {} ({})".format(term, kind, next_term, next_kind))
+    return errors[:MAX_ERRORS]
+
+def verify_range(index_name, path, encoding, term_range, sample_rate, seed, n_docs):
+    """
+    Verifikasi checksum semua term dan postings (dan tf) list term sampel di
+    term_range = (low, high) dari satu index. Berupa fungsi level modul
+    supaya bisa dijalankan di process pool.
+
+    Returns
+    -------
+    dict
+        sampled_terms, postings, checksums (banyaknya term yang checksum-nya
+        dibandingkan), errors
+    """
+    low, high = term_range
+    errors = []
+    n_terms, n_postings_checked, n_checksums = 0, 0, 0
+    with InvertedIndexReader(index_name, encoding, path=path) as reader:
+        terms = list(reader.terms)
+        start = 0 if low is None else bisect.bisect_left(terms, low)
+        end = len(terms) if high is None else bisect.bisect_left(terms, high)
+        for term in itertools.islice(terms, start, end):
+            if len(errors) >= MAX_ERRORS:
+                break
+            position, n_postings, length_in_bytes = reader.postings_dict[term]
+            if reader.checksum_dict:
+                n_checksums += 1
+                checksum = zlib.crc32(reader.read_encoded(position, length_in_bytes))
+                if term in reader.tf_dict:
+                    checksum = zlib.crc32(reader.read_encoded(*reader.tf_dict[term]), checksum)
+                if term not in reader.checksum_dict:
+                    errors.append("term {}: tidak ada di checksum_dict".format(term))
+                elif checksum != reader.checksum_dict[term]:
+                    errors.append("term {}: checksum {:08x}, tersimpan {:08x}".format(
+                        term, checksum, reader.checksum_dict[term]))
+            if not sampled(term, sample_rate, seed):
+                continue
+            n_terms += 1
+            encoded = bytes(reader.read_encoded(position, length_in_bytes))
+            try:
+                postings = encoding.decode(encoded)
+            except Exception as e:
+                errors.append("term {}: decode gagal ({!r})".format(term, e))
+                continue
+            n_postings_checked += len(postings)
+            if len(postings) != n_postings:
+                errors.append("term {}: {} postings, df di postings_dict {}".format(term, len(postings), n_postings))
+            if (postings and postings[0] < 1) or any(previous >= doc_id for previous, doc_id in zip(postings, postings[1:])):
+                errors.append("term {}: docID tidak terurut naik".format(term))
+            if n_docs is not None and postings and postings[-1] > n_docs:
+                errors.append("term {}: docID {} melebihi banyaknya dokumen ({})".format(term, postings[-1], n_docs))
+            if list(encoding.decode_iter(encoded)) != postings:
+                errors.append("term {}: decode_iter tidak sama dengan decode".format(term))
+            if encoding.decode(encoding.encode(postings)) != postings:
+                errors.append("term {}: round trip encode/decode gagal".format(term))
+            if term in reader.tf_dict:
+                tf_position, tf_length = reader.tf_dict[term]
+                try:
+                    cumulative_tf = encoding.decode(bytes(reader.read_encoded(tf_position, tf_length)))
+                except Exception as e:
+                    errors.append("term {}: decode tf gagal ({!r})".format(term, e))
+                    continue
+                if len(cumulative_tf) != n_postings:
+                    errors.append("term {}: {} tf, df di postings_dict {}".format(term, len(cumulative_tf), n_postings))
+                if (cumulative_tf and cumulative_tf[0] < 1) or \
+                        any(previous >= total for previous, total in zip(cumulative_tf, cumulative_tf[1:])):
+                    errors.append("term {}: ada tf < 1".format(term))
+    return {'sampled_terms': n_terms, 'postings': n_postings_checked, 'checksums': n_checksums, 'errors': errors}
+
+def verify_index(path, encoding, sample_rate=1.0, workers=1, seed=0):
+    """
+    Verifikasi semua index di direktori path yang di-encode dengan encoding.
+
+    Returns
+    -------
+    dict
+        nama index -> {'terms', 'sampled_terms', 'postings', 'checksums',
+        'sections' (nama section -> crc32), 'errors' (list of str)}; index
+        valid jika errors-nya kosong
+    """
+    indices, segments = list_indices(path)
+    n_docs = document_count(path)
+    report = {}
+    jobs = []
+    for name in indices + segments:
+        errors = []
+        index_n_docs = n_docs
+        if name in segments:
+            file_path = segment_file_path(name, path)
+            try:
+                segment = Segment(file_path)
+            except SegmentError as e:
+                report[name] = {'terms': 0, 'sampled_terms': 0, 'postings': 0, 'checksums': 0, 'sections': {},
+                                'errors': [str(e)]}
+                continue
+            try:
+                sections = {SECTION_NAMES[kind]: crc for kind, (_, _, crc) in segment.sections.items()}
+                segment.verify()
+            except SegmentError as e:
+                errors.append(str(e))
+            finally:
+                segment.close()
+            if segment.meta['encoding'] != encoding.__name__:
+                errors.append("segment memakai {}, bukan {}".format(segment.meta['encoding'], encoding.__name__))
+            index_n_docs = segment.meta['n_docs']
+        else:
+            file_path = os.path.join(path, name + '.index')
+            sections = {'postings': file_crc32(file_path), 'dictionary': file_crc32(os.path.join(path, name + '.dict'))}
+        file_size = os.path.getsize(file_path)
+        with InvertedIndexReader(name, encoding, path=path) as reader:
+            errors += check_structure(reader, file_size)
+            n_terms = len(reader.postings_dict)
+            n_parts = max(1, min(workers, file_size // MIN_PART_BYTES))
+            ranges = term_ranges([reader], n_parts) if n_parts > 1 else [(None, None)]
+        report[name] = {'terms': n_terms, 'sampled_terms': 0, 'postings': 0, 'checksums': 0, 'sections': sections,
+                        'errors': errors}
+        jobs += [(name, path, encoding, term_range, sample_rate, seed, index_n_docs) for term_range in ranges]
+
+    if workers > 1 and len(jobs) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(min(workers, len(jobs))) as pool:
+            results = list(pool.map(verify_range, *zip(*jobs)))
+    else:
+        results = [verify_range(*job) for job in jobs]
+    for job, result in zip(jobs, results):
+        index_report = report[job[0]]
+        index_report['sampled_terms'] += result['sampled_terms']
+        index_report['postings'] += result['postings']
+        index_report['checksums'] += result['checksums']
+        index_report['errors'] = (index_report['errors'] + result['errors'])[:MAX_ERRORS]
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='direktori index, misal index_vb')
+    parser.add_argument('--encoding', choices=ENCODINGS, default='vb')
+    parser.add_argument('--sample-rate', type=float, default=1.0, help='fraksi term yang postings list-nya di-decode')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    report = verify_index(args.path, ENCODINGS[args.encoding], args.sample_rate, args.workers, args.seed)
+    n_errors = 0
+    for name, index_report in report.items():
+        print("{}: {}/{} term, {} postings, {} checksum, {}, {}".format(
+            name, index_report['sampled_terms'], index_report['terms'], index_report['postings'], index_report['checksums'],
+            ' '.join('{}={:08x}'.format(section, crc) for section, crc in index_report['sections'].items()),
+            'OK' if not index_report['errors'] else '{} error'.format(len(index_report['errors']))))
+        for error in index_report['errors']:
+            print("    " + error)
+        n_errors += len(index_report['errors'])
+    sys.exit(1 if n_errors else 0)
+
+if __name__ == '__main__':
+
+    # Dengan argumen: command line; tanpa argumen: self-test
+    if len(sys.argv) > 1:
+        main()
+
+    import random
+    import shutil
+    import tempfile
+    from bsbi import BSBIIndex
+    from compression import EliasGammaPostings, VBEPostings
+
+    def errors_of(report):
+        return {name: index_report['errors'] for name, index_report in report.items() if index_report['errors']}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        collection = os.path.join(tmp_dir, 'collection')
+        rng = random.Random(0)
+        words = ['quantum', 'gravity', 'signal', 'energy', 'theory', 'field', 'noise', 'wave']
+        for block in ['0', '1']:
+            os.makedirs(os.path.join(collection, block))
+            for i in range(20):
+                with open(os.path.join(collection, block, 'doc{}.txt'.format(i)), 'w') as f:
+                    f.write(' '.join(rng.choice(words) for _ in range(30)))
+        original = os.path.join(tmp_dir, 'index')
+        segment_original = os.path.join(tmp_dir, 'index_seg')
+        for path, segment in [(original, False), (segment_original, True)]:
+            os.makedirs(path)
+            BSBIIndex(collection, path, VBEPostings, with_tf=True, segment=segment).start_indexing()
+
+        def corrupted_copy(source):
+            path = os.path.join(tmp_dir, 'copy')
+            shutil.rmtree(path, ignore_errors=True)
+            shutil.copytree(source, path)
+            return path
+
+        report = verify_index(original, VBEPostings)
+        assert set(report) == {'intermediate_index_0', 'intermediate_index_1', 'main_index'}, "daftar index salah"
+        assert not errors_of(report), "index yang benar dilaporkan rusak"
+        assert all(index_report['checksums'] == index_report['terms'] > 0 for index_report in report.values()), \
+            "checksum harus diperiksa untuk semua term"
+        assert report['main_index']['sampled_terms'] == report['main_index']['terms'], "sample_rate=1 harus memeriksa semua term"
+        assert errors_of(verify_index(original, VBEPostings, sample_rate=0.5, workers=2)) == {}, "verifikasi paralel salah"
+        assert not errors_of(verify_index(segment_original, VBEPostings)), "segment yang benar dilaporkan rusak"
+
+        # Satu byte di postings list berubah: terdeteksi oleh checksum meskipun term-nya tidak masuk sampel
+        path = corrupted_copy(original)
+        with InvertedIndexReader('main_index', VBEPostings, path=path) as reader:
+            position = reader.postings_dict[reader.terms[0]][0]
+        with open(os.path.join(path, 'main_index.index'), 'r+b') as f:
+            f.seek(position)
+            byte = f.read(1)[0]
+            f.seek(position)
+            f.write(bytes([byte ^ 0x01]))
+        errors = errors_of(verify_index(path, VBEPostings, sample_rate=0))
+        assert list(errors) == ['main_index'] and 'checksum' in errors['main_index'][0], "byte yang berubah tidak terdeteksi"
+
+        # df di postings_dict tidak sesuai dengan postings list
+        path = corrupted_copy(original)
+        metadata_file_path = os.path.join(path, 'main_index.dict')
+        with open(metadata_file_path, 'rb') as f:
+            metadata = pickle.load(f)
+        term = metadata[1][0]
+        position, n_postings, length_in_bytes = metadata[0][term]
+        metadata[0][term] = (position, n_postings + 1, length_in_bytes)
+        with open(metadata_file_path, 'wb') as f:
+            pickle.dump(metadata, f)
+        errors = errors_of(verify_index(path, VBEPostings))
+        assert list(errors) == ['main_index'] and any('df' in error for error in errors['main_index']), "df salah tidak terdeteksi"
+
+        # File index terpotong: postings list term terakhir berada di luar file
+        path = corrupted_copy(original)
+        file_path = os.path.join(path, 'main_index.index')
+        with open(file_path, 'r+b') as f:
+            f.truncate(os.path.getsize(file_path) - 1)
+        errors = errors_of(verify_index(path, VBEPostings, sample_rate=0))
+        assert list(errors) == ['main_index'] and any('di luar file' in error for error in errors['main_index']), \
+            "file terpotong tidak terdeteksi"
+
+        # Satu bit di segment berubah: checksum section di footer tidak cocok
+        path = corrupted_copy(segment_original)
+        file_path = segment_file_path('main_index', path)
+        with open(file_path, 'r+b') as f:
+            f.seek(0)
+            byte = f.read(1)[0]
+            f.seek(0)
+            f.write(bytes([byte ^ 0x80]))
+        errors = errors_of(verify_index(path, VBEPostings, sample_rate=0))
+        assert list(errors) == ['main_index'], "bit yang berubah di segment tidak terdeteksi"
+
+        # Codec yang salah
+        errors = errors_of(verify_index(segment_original, EliasGammaPostings, sample_rate=0))
+        assert any('bukan EliasGammaPostings' in error for error in errors['main_index']), "codec segment yang salah tidak terdeteksi"
+        errors = errors_of(verify_index(original, EliasGammaPostings))
+        assert set(errors) == set(report), "codec yang salah tidak terdeteksi"
@@ -0,0 +1,312 @@
+import array
+import bisect
+import heapq
+import math
+import os
+import pickle
+
+from index import InvertedIndexReader
+
+# Sentinel docID untuk cursor yang sudah habis
+END_OF_LIST = float('inf')
+
+# Toleransi pembulatan floating point ketika membandingkan upper bound dengan
+# threshold; upper bound dianggap "tidak mungkin masuk top-k" hanya jika
+# selisihnya lebih dari ini, sehingga hasil tetap identik dengan exhaustive.
+EPSILON = 1e-9
+
+class ScoreIndex:
+    """
+    Metadata scoring BM25 yang dihitung sekali saat indexing dan disimpan
+    di samping inverted index (file <index_name>.scores via pickle).
+
+    Attributes
+    ----------
+    k1, b (float): parameter BM25
+    block_size (int): banyaknya postings dalam satu block (Block-Max WAND)
+    n_docs (int): banyaknya dokumen di koleksi
+    avg_doc_length (float): rata-rata panjang dokumen (dalam tokens)
+    doc_norm: array('d') yang di-index dengan docID, berisi
+              k1 * (1 - b + b * |d| / avgdl); bagian BM25 yang hanya
+              bergantung pada dokumen
+    max_score: Dictionary termID -> skor BM25 maksimum term tersebut
+    block_last: Dictionary termID -> array('L') docID terakhir di setiap block
+    block_max: Dictionary termID -> array('d') skor maksimum di setiap block
+    """
+    def __init__(self, k1=1.2, b=0.75, block_size=64):
+        self.k1 = k1
+        self.b = b
+        self.block_size = block_size
+        self.n_docs = 0
+        self.avg_doc_length = 0.0
+        self.doc_norm = array.array('d')
+        self.max_score = {}
+        self.block_last = {}
+        self.block_max = {}
+
+    @staticmethod
+    def file_path(index_name, path):
+        return os.path.join(path, index_name + '.scores')
+
+    def save(self, index_name, path):
+        with open(ScoreIndex.file_path(index_name, path), 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(index_name, path):
+        with open(ScoreIndex.file_path(index_name, path), 'rb') as f:
+            return pickle.load(f)
+
+    def idf(self, df):
+        """IDF versi BM25 (selalu positif)"""
+        return math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def term_score(self, idf, tf, doc_id):
+        """Kontribusi skor BM25 sebuah term dengan frekuensi tf di dokumen doc_id"""
+        return idf * tf * (self.k1 + 1) / (tf + self.doc_norm[doc_id])
+
+
+def build_score_index(index_name, postings_encoding, path, k1=1.2, b=0.75, block_size=64):
+    """
+    Membangun ScoreIndex dari inverted index yang menyimpan term frequency.
+    Dilakukan dua kali scan terhadap index: scan pertama menghitung panjang
+    setiap dokumen (jumlah tf), scan kedua menghitung skor maksimum per term
+    dan per block of postings.
+
+    Returns
+    -------
+    ScoreIndex
+        metadata yang juga sudah disimpan ke <index_name>.scores
+    """
+    scores = ScoreIndex(k1, b, block_size)
+    with InvertedIndexReader(index_name, postings_encoding, path=path) as reader:
+        if reader.terms and not reader.tf_dict:
+            raise ValueError("Index tidak menyimpan term frequency, bangun ulang dengan with_tf=True.")
+
+        doc_length = {}
+        for term in reader.terms:
+            postings = reader.get_postings_list(term)
+            for doc_id, tf in zip(postings, reader.get_tf_list(term)):
+                doc_length[doc_id] = doc_length.get(doc_id, 0) + tf
+
+        scores.n_docs = len(doc_length)
+        scores.avg_doc_length = sum(doc_length.values()) / max(1, len(doc_length))
+        max_doc_id = max(doc_length, default=0)
+        avgdl = scores.avg_doc_length or 1.0
+        scores.doc_norm = array.array('d', [k1 * (1 - b + b * doc_length.get(doc_id, 0) / avgdl)
+                                            for doc_id in range(max_doc_id + 1)])
+
+        for term in reader.terms:
+            postings = reader.get_postings_list(term)
+            tf_list = reader.get_tf_list(term)
+            idf = scores.idf(len(postings))
+            block_last = array.array('L')
+            block_max = array.array('d')
+            for start in range(0, len(postings), block_size):
+                end = min(start + block_size, len(postings))
+                block_last.append(postings[end - 1])
+                block_max.append(max(scores.term_score(idf, tf_list[i], postings[i])
+                                     for i in range(start, end)))
+            scores.block_last[term] = block_last
+            scores.block_max[term] = block_max
+            scores.max_score[term] = max(block_max, default=0.0)
+
+    scores.save(index_name, path)
+    return scores
+
+
+class TermCursor:
+    """
+    Cursor di atas postings list sebuah term, dengan operasi next() dan
+    next_geq(doc_id) serta akses "shallow" ke block-max tanpa memindahkan cursor.
+    """
+    def __init__(self, order, postings, tf_list, idf, max_score, block_last, block_max):
+        self.order = order
+        self.postings = postings
+        self.tf_list = tf_list
+        self.idf = idf
+        self.max_score = max_score
+        self.block_last = block_last
+        self.block_max = block_max
+        self.position = 0
+
+    @property
+    def doc(self):
+        if self.position < len(self.postings):
+            return self.postings[self.position]
+        return END_OF_LIST
+
+    def next(self):
+        self.position += 1
+
+    def next_geq(self, doc_id):
+        """Majukan cursor ke posting pertama dengan docID >= doc_id"""
+        if self.doc < doc_id:
+            self.position = bisect.bisect_left(self.postings, doc_id, self.position + 1)
+
+    def block_of(self, doc_id):
+        """Index block yang mungkin mengandung doc_id (len(block) jika tidak ada)"""
+        return bisect.bisect_left(self.block_last, doc_id)
+
+    def block_max_of(self, doc_id):
+        block = self.block_of(doc_id)
+        return self.block_max[block] if block < len(self.block_max) else 0.0
+
+    def block_last_of(self, doc_id):
+        block = self.block_of(doc_id)
+        return self.block_last[block] if block < len(self.block_last) else END_OF_LIST
+
+
+class WANDRetriever:
+    """
+    Top-k retrieval dengan skor BM25 untuk query disjunctive (OR) di atas
+    sebuah InvertedIndexReader yang menyimpan term frequency.
+
+    Tiga metode tersedia dan menghasilkan top-k yang identik:
+        - 'exhaustive' : term-at-a-time, semua postings di-score
+        - 'wand'       : WAND (Broder et al.), memakai skor maksimum per term
+        - 'bmw'        : Block-Max WAND (Ding & Suel), memakai skor maksimum per block
+
+    Urutan hasil: skor menurun, docID menaik jika skornya sama.
+    """
+    METHODS = ('exhaustive', 'wand', 'bmw')
+
+    def __init__(self, reader, score_index):
+        self.reader = reader
+        self.scores = score_index
+
+    def retrieve(self, term_ids, k=10, method='bmw'):
+        """
+        Parameters
+        ----------
+        term_ids: List[int]
+            termID dari query; duplikat dan termID yang tidak ada diabaikan.
+        k: int
+            banyaknya dokumen yang dikembalikan
+        method: str
+            salah satu dari WANDRetriever.METHODS
+
+        Returns
+        -------
+        Tuple[List[Tuple[float, int]], Dict]
+            list (skor, docID) terurut dan statistik pruning: total postings
+            dari term query, banyak postings yang di-score dan yang di-skip.
+        """
+        if method not in self.METHODS:
+            raise ValueError("Unknown method: {}".format(method))
+        cursors = self.__open_cursors(term_ids)
+        total = sum(len(cursor.postings) for cursor in cursors)
+        if k <= 0 or not cursors:
+            top_k, scored = [], 0
+        elif method == 'exhaustive':
+            top_k, scored = self.__exhaustive(cursors, k)
+        else:
+            top_k, scored = self.__wand(cursors, k, block_max=(method == 'bmw'))
+        stats = {'postings': total, 'scored': scored, 'skipped': total - scored,
+                 'pruning_rate': (total - scored) / total if total else 0.0}
+        return top_k, stats
+
+    def __open_cursors(self, term_ids):
+        cursors = []
+        for term in sorted(set(term_ids)):
+            if term not in self.reader.postings_dict:
+                continue
+            postings = self.reader.get_postings_list(term)
+            cursors.append(TermCursor(len(cursors), postings, self.reader.get_tf_list(term),
+                                      self.scores.idf(len(postings)), self.scores.max_score[term],
+                                      self.scores.block_last[term], self.scores.block_max[term]))
+        return cursors
+
+    def __exhaustive(self, cursors, k):
+        accumulators = {}
+        scored = 0
+        for cursor in cursors:
+            for doc_id, tf in zip(cursor.postings, cursor.tf_list):
+                accumulators[doc_id] = accumulators.get(doc_id, 0.0) + \
+                    self.scores.term_score(cursor.idf, tf, doc_id)
+            scored += len(cursor.postings)
+        top_k = heapq.nlargest(k, accumulators.items(), key=lambda item: (item[1], -item[0]))
+        return [(score, doc_id) for doc_id, score in top_k], scored
+
+    def __wand(self, cursors, k, block_max):
+        # min-heap berisi (skor, -docID): heap[0] adalah kandidat terlemah
+        heap = []
+        scored = 0
+        cursors = list(cursors)
+        while cursors:
+            cursors.sort(key=lambda cursor: cursor.doc)
+            threshold = heap[0][0] if len(heap) == k else -math.inf
+
+            # Cari pivot: term pertama yang membuat jumlah upper bound melewati threshold
+            upper_bound = 0.0
+            pivot = None
+            for i, cursor in enumerate(cursors):
+                upper_bound += cursor.max_score
+                if upper_bound + EPSILON > threshold:
+                    pivot = i
+                    break
+            if pivot is None:
+                break
+            pivot_doc = cursors[pivot].doc
+            while pivot + 1 < len(cursors) and cursors[pivot + 1].doc == pivot_doc:
+                pivot += 1
+
+            if block_max:
+                block_upper_bound = sum(cursor.block_max_of(pivot_doc) for cursor in cursors[:pivot + 1])
+                if block_upper_bound + EPSILON <= threshold:
+                    # Semua dokumen sebelum akhir block terpendek tidak mungkin masuk top-k
+                    next_doc = min(cursor.block_last_of(pivot_doc) for cursor in cursors[:pivot + 1]) + 1
+                    if pivot + 1 < len(cursors):
+                        next_doc = min(next_doc, cursors[pivot + 1].doc)
+                    for cursor in cursors[:pivot + 1]:
+                        cursor.next_geq(next_doc)
+                    cursors = [cursor for cursor in cursors if cursor.doc != END_OF_LIST]
+                    continue
+
+            if cursors[0].doc == pivot_doc:
+                matched = sorted(cursors[:pivot + 1], key=lambda cursor: cursor.order)
+                score = 0.0
+                for cursor in matched:
+                    score += self.scores.term_score(cursor.idf, cursor.tf_list[cursor.position], pivot_doc)
+                    cursor.next()
+                scored += len(matched)
+                if len(heap) < k:
+                    heapq.heappush(heap, (score, -pivot_doc))
+                elif (score, -pivot_doc) > heap[0]:
+                    heapq.heapreplace(heap, (score, -pivot_doc))
+            else:
+                for cursor in cursors[:pivot]:
+                    cursor.next_geq(pivot_doc)
+            cursors = [cursor for cursor in cursors if cursor.doc != END_OF_LIST]
+
+        top_k = sorted(heap, reverse=True)
+        return [(score, -neg_doc_id) for score, neg_doc_id in top_k], scored
+
+
+if __name__ == '__main__':
+
+    import random
+    import tempfile
+
+    from index import InvertedIndexWriter
+    from compression import VBEPostings
+
+    random.seed(42)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with InvertedIndexWriter('test', VBEPostings, path=tmp_dir) as index:
+            for term in range(1, 31):
+                postings = sorted(random.sample(range(1, 2001), random.randint(1, 1500)))
+                index.append(term, postings, [random.randint(1, 5) for _ in postings])
+
+        score_index = build_score_index('test', VBEPostings, tmp_dir, block_size=32)
+        with InvertedIndexReader('test', VBEPostings, path=tmp_dir) as reader:
+            retriever = WANDRetriever(reader, score_index)
+            for _ in range(20):
+                query = random.sample(range(1, 35), random.randint(1, 8))
+                k = random.choice([1, 5, 10, 50])
+                expected, stats = retriever.retrieve(query, k, 'exhaustive')
+                assert stats['skipped'] == 0, "exhaustive tidak boleh skip"
+                for method in ['wand', 'bmw']:
+                    result, stats = retriever.retrieve(query, k, method)
+                    assert result == expected, "hasil {} berbeda dengan exhaustive".format(method)
+                    assert stats['scored'] + stats['skipped'] == stats['postings'], "statistik salah"
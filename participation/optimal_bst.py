@@ -1,64 +1,294 @@
-
 """
 Sumber: https://www.geeksforgeeks.org/optimal-binary-search-tree-dp-24/
+
+Versi di sini sudah disesuaikan agar bisa dipakai untuk vocabulary sungguhan:
+    - DP O(n^2) dengan optimasi Knuth (root[i][j-1] <= root[i][j] <= root[i+1][j])
+      dan prefix sums, tabel disimpan flat per diagonal dengan array
+    - konstruksi tree secara iteratif (tidak terkena recursion limit)
+    - output flat berbasis array dengan layout BFS (Eytzinger), dipakai sebagai
+      struktur lookup term yang diberi bobot frekuensi (misal dari query log)
 """
-def sum_freq(freq, i, j):
-    return sum(freq[i:j+1])
+import array
+import bisect
+from collections import deque
+
+def prefix_sums(freq):
+    """prefix[i] = freq[0] + ... + freq[i - 1]"""
+    prefix = [0]
+    for f in freq:
+        prefix.append(prefix[-1] + f)
+    return prefix
+
+class RootTable:
+    """
+    Tabel root hasil DP. root[i, j] adalah index root dari optimal BST untuk
+    keys[i..j] (inklusif). Disimpan flat per diagonal (panjang interval),
+    sehingga hanya butuh (n + 1)(n + 2) / 2 entri.
+    """
+    def __init__(self, offset, roots):
+        self.offset = offset
+        self.roots = roots
+
+    def __getitem__(self, ij):
+        i, j = ij
+        return self.roots[self.offset[j - i + 1] + i]
 
 def optimalSearchTree(keys, freq):
+    """
+    DP optimal BST dengan optimasi Knuth. Interval dihitung dalam bentuk
+    half-open [i, j): cost[i, j] = W(i, j) + min_{lo <= r <= hi} cost[i, r] + cost[r + 1, j]
+    dengan lo = root[i, j - 1] dan hi = root[i + 1, j]. Total kandidat root
+    yang dicoba per diagonal telescoping menjadi O(n), sehingga total O(n^2).
+
+    Returns
+    -------
+    Tuple[int, RootTable]
+        cost optimal (sum freq[k] * depth(k), depth root = 1) dan tabel root
+    """
     n = len(keys)
+    prefix = prefix_sums(freq)
 
-    # Create 2D table to store results of subproblems
-    dp = [[0] * n for _ in range(n)]
-    root = [[0] * n for _ in range(n)]  # Stores root of optimal BST
+    # index flat untuk interval [i, i + length) adalah offset[length] + i
+    offset = [0] * (n + 2)
+    for length in range(1, n + 2):
+        offset[length] = offset[length - 1] + (n + 2 - length)
+    typecode = 'q' if all(isinstance(f, int) for f in freq) else 'd'
+    cost = array.array(typecode, [0]) * offset[n + 1]
+    roots = array.array('l', [0]) * offset[n + 1]
 
-    # For single key, cost is frequency of the key
     for i in range(n):
-        dp[i][i] = freq[i]
-        root[i][i] = i  # Single element is the root
+        cost[offset[1] + i] = freq[i]
+        roots[offset[1] + i] = i
+
+    for length in range(2, n + 1):
+        base, previous = offset[length], offset[length - 1]
+        for i in range(n - length + 1):
+            j = i + length
+            best_cost, best_root = None, None
+            for r in range(roots[previous + i], roots[previous + i + 1] + 1):
+                c = cost[offset[r - i] + i] + cost[offset[j - r - 1] + r + 1]
+                if best_cost is None or c < best_cost:
+                    best_cost, best_root = c, r
+            cost[base + i] = best_cost + prefix[j] - prefix[i]
+            roots[base + i] = best_root
 
-    # Consider chains of length 2, 3, ... n
-    for l in range(2, n + 1):
-        for i in range(n - l + 1):
-            j = i + l - 1
-            dp[i][j] = float('inf')
-            fsum = sum_freq(freq, i, j)
+    return cost[offset[n]], RootTable(offset, roots)
 
-            # Try making each key in range [i..j] root
-            for r in range(i, j + 1):
-                c = ((dp[i][r - 1] if r > i else 0) +
-                     (dp[r + 1][j] if r < j else 0) +
-                     fsum)
+def weight_balanced_roots(freq):
+    """
+    Aproksimasi optimal BST (aturan bisection Mehlhorn) untuk n yang terlalu
+    besar bagi DP O(n^2): root dari keys[i..j] adalah key yang membuat bobot
+    subtree kiri dan kanan paling seimbang. Cost hasilnya terbatas oleh
+    entropy bobot + 2, dan setiap root dicari dengan binary search.
 
-                if c < dp[i][j]:
-                    dp[i][j] = c
-                    root[i][j] = r  # Store root
+    Returns
+    -------
+    function (i, j) -> root
+    """
+    prefix = prefix_sums(freq)
+    # middle[r] naik monoton; root ideal adalah r dengan middle[r] paling dekat
+    # ke prefix[i] + prefix[j + 1]
+    middle = [prefix[r] + prefix[r + 1] for r in range(len(freq))]
 
-    return dp[0][n - 1], root
+    def choose_root(i, j):
+        if prefix[j + 1] == prefix[i]:
+            return (i + j) // 2
+        target = prefix[i] + prefix[j + 1]
+        r = bisect.bisect_left(middle, target, i, j)
+        if r > i and target - middle[r - 1] <= middle[r] - target:
+            r -= 1
+        return r
+
+    return choose_root
 
 def construct_tree(root, keys, i, j):
-    if i > j:
-        return None
-    r = root[i][j]
-    return {
-        "key": keys[r],
-        "left": construct_tree(root, keys, i, r - 1),
-        "right": construct_tree(root, keys, r + 1, j)
-    }
+    """
+    Membangun tree berbentuk nested dict dari tabel root secara iteratif.
+    root bisa berupa RootTable (root[i, j]) atau function (i, j) -> root.
+    """
+    choose_root = root if callable(root) else (lambda lo, hi: root[lo, hi])
+    holder = {"left": None}
+    stack = [(i, j, holder, "left")]
+    while stack:
+        lo, hi, parent, side = stack.pop()
+        if lo > hi:
+            continue
+        r = choose_root(lo, hi)
+        node = {"key": keys[r], "left": None, "right": None}
+        parent[side] = node
+        stack.append((r + 1, hi, node, "right"))
+        stack.append((lo, r - 1, node, "left"))
+    return holder["left"]
 
 def print_tree(tree, level=0, prefix=""):
-    if tree is not None:
-        print(" " * (4 * level) + prefix + str(tree["key"]))
-        if tree["left"] or tree["right"]:
-            print_tree(tree["left"], level + 1, "L--- ")
-            print_tree(tree["right"], level + 1, "R--- ")
+    stack = [(tree, level, prefix)]
+    while stack:
+        node, level, prefix = stack.pop()
+        if node is None:
+            continue
+        print(" " * (4 * level) + prefix + str(node["key"]))
+        if node["left"] or node["right"]:
+            stack.append((node["right"], level + 1, "R--- "))
+            stack.append((node["left"], level + 1, "L--- "))
+
+class FlatBST:
+    """
+    BST yang di-flatten ke array dengan layout BFS (Eytzinger): node 0 adalah
+    root, lalu node-node level berikutnya. Karena optimal BST tidak harus
+    lengkap, anak kiri/kanan disimpan eksplisit di array left/right (-1 jika
+    tidak ada), bukan dihitung dengan 2k + 1 / 2k + 2. Key yang sering
+    dicari berada dekat root sehingga berada di awal array.
+
+    Attributes
+    ----------
+    keys: List
+        key dalam urutan BFS
+    positions: array('l')
+        posisi key di list keys aslinya (yang terurut)
+    left, right: array('l')
+        index node anak kiri/kanan
+    """
+    def __init__(self, keys, root):
+        """
+        Parameters
+        ----------
+        keys: List
+            key yang sudah terurut
+        root: RootTable atau function (i, j) -> root
+        """
+        choose_root = root if callable(root) else (lambda lo, hi: root[lo, hi])
+        self.keys = []
+        self.positions = array.array('l')
+        self.left = array.array('l')
+        self.right = array.array('l')
+        queue = deque([(0, len(keys) - 1, None, None)])
+        while queue:
+            lo, hi, parent, children = queue.popleft()
+            if lo > hi:
+                continue
+            r = choose_root(lo, hi)
+            node = len(self.keys)
+            if parent is not None:
+                children[parent] = node
+            self.keys.append(keys[r])
+            self.positions.append(r)
+            self.left.append(-1)
+            self.right.append(-1)
+            queue.append((lo, r - 1, node, self.left))
+            queue.append((r + 1, hi, node, self.right))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def find(self, key):
+        """
+        Cari key di tree.
+
+        Returns
+        -------
+        Tuple[int, int]
+            (posisi key di list keys yang terurut atau -1, banyaknya probe)
+        """
+        node, probes = (0 if self.keys else -1), 0
+        while node != -1:
+            probes += 1
+            node_key = self.keys[node]
+            if key == node_key:
+                return self.positions[node], probes
+            node = self.left[node] if key < node_key else self.right[node]
+        return -1, probes
+
+    def depths(self):
+        """Kedalaman (root = 1) setiap key, di-index dengan posisi di keys terurut"""
+        depth = array.array('l', [0] * len(self.keys))
+        node_depth = array.array('l', [0] * len(self.keys))
+        for node in range(len(self.keys)):
+            node_depth[node] = node_depth[node] or 1
+            depth[self.positions[node]] = node_depth[node]
+            for child in (self.left[node], self.right[node]):
+                if child != -1:
+                    node_depth[child] = node_depth[node] + 1
+        return depth
+
+    def cost(self, freq):
+        """sum freq[k] * depth(k); sama dengan cost dari optimalSearchTree untuk tree optimal"""
+        return sum(f * d for f, d in zip(freq, self.depths()))
+
+def build_lookup_tree(keys, freq, exact_limit=2000):
+    """
+    Membangun FlatBST sebagai struktur lookup term yang diberi bobot freq
+    (misal frekuensi term di query log). keys harus terurut.
+
+    Key dengan freq 0 tidak mempengaruhi cost, sehingga optimal BST cukup
+    dihitung (dengan DP O(n^2)) atas key yang freq-nya > 0 saja; key lainnya
+    digantung sebagai subtree seimbang di celah-celah di antaranya tanpa
+    mengubah kedalaman key yang berbobot. Untuk query log, banyaknya term yang
+    pernah dicari jauh lebih kecil dari ukuran lexicon. Jika key berbobot
+    lebih dari exact_limit, dipakai aproksimasi weight_balanced_roots(...).
+    """
+    hot = [k for k, f in enumerate(freq) if f > 0]
+    if len(hot) > exact_limit:
+        return FlatBST(keys, weight_balanced_roots(freq))
+
+    _, hot_root = optimalSearchTree(hot, [freq[k] for k in hot])
+
+    def choose_root(i, j):
+        a = bisect.bisect_left(hot, i)
+        b = bisect.bisect_right(hot, j) - 1
+        if a > b:
+            return (i + j) // 2
+        return hot[hot_root[a, b]]
+
+    return FlatBST(keys, choose_root)
+
+
+if __name__ == "__main__":
+
+    import random
+    import time
+
+    keys = ["aku", "cari", "nasi", "uduk"]
+    freq = [10, 5, 20, 15]
+
+    cost, root = optimalSearchTree(keys, freq)
+    tree = construct_tree(root, keys, 0, len(keys) - 1)
+
+    print_tree(tree)
+    print(cost)
 
+    def cubic_reference(freq):
+        n = len(freq)
+        dp = [[0] * (n + 1) for _ in range(n + 1)]
+        for length in range(1, n + 1):
+            for i in range(n - length + 1):
+                j = i + length
+                dp[i][j] = sum(freq[i:j]) + min(dp[i][r] + dp[r + 1][j] for r in range(i, j))
+        return dp[0][n]
 
-keys = ["aku", "cari", "nasi", "uduk"]
-freq = [10, 5, 20, 15]
+    random.seed(0)
+    for n in [1, 2, 3, 10, 40]:
+        freq = [random.randint(0, 50) for _ in range(n)]
+        keys = list(range(n))
+        cost, root = optimalSearchTree(keys, freq)
+        assert cost == cubic_reference(freq), "cost DP Knuth salah"
+        flat = FlatBST(keys, root)
+        assert flat.cost(freq) == cost, "tree tidak sesuai dengan cost"
+        assert all(flat.find(k)[0] == k for k in keys), "lookup salah"
+        assert flat.find(-1)[0] == -1 and flat.find(n)[0] == -1, "lookup key yang tidak ada salah"
 
-cost, root = optimalSearchTree(keys, freq)
-tree = construct_tree(root, keys, 0, len(keys) - 1)
+        freq = [random.choice([0, 0, 0, random.randint(1, 50)]) for _ in range(n)]
+        flat = build_lookup_tree(keys, freq)
+        assert flat.cost(freq) == optimalSearchTree(keys, freq)[0], "tree dari key berbobot tidak optimal"
+        assert all(flat.find(k)[0] == k for k in keys), "lookup salah"
 
-print_tree(tree)
-print(cost)
\ No newline at end of file
+    # Bobot Zipf-like seperti frekuensi term di query log: sebagian besar term
+    # tidak pernah dicari
+    for n in [2000, 10000, 100000]:
+        keys = sorted("term{:06d}".format(i) for i in range(n))
+        freq = [int(1000 / (random.randrange(n) + 1)) for _ in range(n)]
+        start = time.time()
+        flat = build_lookup_tree(keys, freq)
+        elapsed = time.time() - start
+        total = sum(freq)
+        print("n = {:6d} ({:4d} berbobot): build {:.2f} s, expected probes {:.2f} (balanced BST ~{})".format(
+              n, sum(f > 0 for f in freq), elapsed, flat.cost(freq) / total, n.bit_length()))